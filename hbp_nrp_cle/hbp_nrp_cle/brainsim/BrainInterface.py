@@ -74,6 +74,9 @@ class IBrainDevice(object):  # pragma: no cover
     Device to connect to brain simulation
     """
 
+    # The names of the settable properties that make up the state of the device
+    state_properties = ()
+
     def connect(self, neurons):
         """
         Connects the brain device to the specified neuron population.
@@ -113,6 +116,22 @@ class IBrainDevice(object):  # pragma: no cover
         """
         raise NotImplementedError("This method was not implemented in the concrete implementation")
 
+    def get_state(self):
+        """
+        Gets a snapshot of the activation state and the state properties of this device
+
+        :return: A dictionary of the state values
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
 
 class IDeviceGroup(IBrainDevice):  # pragma: no cover
     """
@@ -137,6 +156,8 @@ class IFixedSpikeGenerator(IBrainDevice):  # pragma: no cover
     Represents a communication object that generates spikes on a fixed rate
     """
 
+    state_properties = ('rate',)
+
     @property
     def rate(self):  # -> float:
         """
@@ -159,6 +180,8 @@ class IPoissonSpikeGenerator(IBrainDevice):  # pragma: no cover
     Represents a spike generator based on a Poisson Distribution
     """
 
+    state_properties = ('rate',)
+
     @property
     def rate(self):  # -> float:
         """
@@ -193,6 +216,8 @@ class IDCSource(IBrainDevice):  # pragma: no cover
     Represents a current generator which generates direct current
     """
 
+    state_properties = ('amplitude',)
+
     @property
     def amplitude(self):  # -> list:
         """
@@ -215,6 +240,8 @@ class IACSource(IBrainDevice):  # pragma: no cover
     Represents a current generator which generates alternating current
     """
 
+    state_properties = ('amplitude',)
+
     @property
     def amplitude(self):  # -> list:
         """
@@ -237,6 +264,8 @@ class INCSource(IBrainDevice):  # pragma: no cover
     Represents a current generator which generates noisy current
     """
 
+    state_properties = ('mean',)
+
     @property
     def mean(self):  # -> list:
         """
@@ -325,6 +354,8 @@ class IRawSignal(IBrainDevice):  # pragma no cover
     equivalent as the semantics of the device depend on the semantics of the neural simulator.
     """
 
+    state_properties = ('value',)
+
     @property
     def value(self):
         """
@@ -436,6 +467,12 @@ class IBrainCommunicationAdapter(object):  # pragma: no cover
         """
         raise NotImplementedError("This method was not implemented in the concrete implementation")
 
+    def flush_buffers(self):  # -> None:
+        """
+        Applies the values written to buffered spike generators since the last flush
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
     def shutdown(self):
         """
         Shuts down the brain communication adapter
@@ -527,3 +564,21 @@ class IBrainControlAdapter(object):  # pragma: no cover
         Resets the neuronal simulator
         """
         raise NotImplementedError("This method was not implemented in the concrete implementation")
+
+    def get_state(self):
+        """
+        Gets a snapshot of the state variables of all neurons, if the simulator supports it
+
+        :return: An opaque snapshot, or None if the simulator does not support snapshots
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
+    def set_state(self, state):
+        """
+        Restores the state variables of the neurons from a snapshot taken with get_state and
+        discards the spikes in flight. Synaptic weights and the time of the simulator are not
+        part of the snapshot.
+
+        :param state: The snapshot
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
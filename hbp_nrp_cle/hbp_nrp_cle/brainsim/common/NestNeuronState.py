@@ -0,0 +1,86 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Support methods to take and restore snapshots of the neuron state variables in NEST
+"""
+
+__author__ = "Georg Hinkel"
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_nest_neuron_state(nest, gids):
+    """
+    Gets the current values of the recordable state variables of the given neurons
+
+    :param nest: The NEST module
+    :param gids: The global identifiers of the neurons
+    :return: A dictionary mapping each global identifier to a dictionary of state values
+    """
+    gids = sorted(set(long(gid) for gid in gids))
+    state = {}
+    if not gids:
+        return state
+    for gid, status in zip(gids, nest.GetStatus(gids)):
+        recordables = [str(variable) for variable in status.get('recordables', ())]
+        state[gid] = dict((variable, status[variable]) for variable in recordables
+                          if variable in status)
+    return state
+
+
+def set_nest_neuron_state(nest, state):
+    """
+    Restores the state variables of the neurons from a snapshot taken with get_nest_neuron_state.
+    The spikes in flight, the input buffered for the neurons and the events of recording devices
+    belong to the time after the snapshot, so the dynamic state of the network is reset first.
+    NEST cannot rewind its clock, the simulation time of the kernel keeps advancing.
+
+    :param nest: The NEST module
+    :param state: The snapshot
+    """
+    reset_network = getattr(nest, 'ResetNetwork', None)
+    if reset_network is not None:
+        reset_network()
+    else:
+        logger.warn("The spikes in flight could not be discarded")
+    gids = sorted(state)
+    if not gids:
+        return
+    try:
+        nest.SetStatus(gids, [state[gid] for gid in gids])
+    # pylint: disable=broad-except
+    except Exception:
+        # some models report read-only variables as recordables, restore variable by variable
+        skipped = set()
+        for gid in gids:
+            for variable, value in state[gid].iteritems():
+                try:
+                    nest.SetStatus([gid], {variable: value})
+                except Exception:
+                    skipped.add(variable)
+        if skipped:
+            logger.warn("Could not restore the neuron state variables %s",
+                        ", ".join(sorted(skipped)))
@@ -28,7 +28,8 @@ implementations of the brain simulator adapter.
 
 import logging
 from hbp_nrp_cle.brainsim.BrainInterface \
-    import IBrainCommunicationAdapter, ICustomDevice
+    import IBrainCommunicationAdapter, ICustomDevice, IBrainDevice
+from hbp_nrp_cle.brainsim.common.devices import BufferedDevice
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +50,25 @@ class AbstractCommunicationAdapter(IBrainCommunicationAdapter):
         self.__refreshable_devices = []
         self.__finalizable_devices = []
         self.__is_initialized = False
+        self.__double_buffered = False
+
+    @property
+    def double_buffered(self):
+        """
+        Gets a value indicating whether the accesses to spike generators are buffered, i.e.
+        values written by transfer functions are only applied when the buffers are flushed
+        """
+        return self.__double_buffered
+
+    @double_buffered.setter
+    def double_buffered(self, value):
+        """
+        Sets whether the accesses to spike generators are buffered. This only affects devices
+        registered afterwards.
+
+        :param value: True to enable buffering, otherwise False
+        """
+        self.__double_buffered = bool(value)
 
     def _get_device_type(self, device_type):  # pragma: no cover
         """
@@ -115,6 +135,8 @@ class AbstractCommunicationAdapter(IBrainCommunicationAdapter):
         :return: A communication object or a group of objects
         """
         device = self.__register_device(populations, spike_generator_type, **params)
+        if self.__double_buffered and isinstance(device, IBrainDevice):
+            device = BufferedDevice(device)
         self.__generator_devices.append(device)
         return device
 
@@ -174,7 +196,8 @@ class AbstractCommunicationAdapter(IBrainCommunicationAdapter):
 
     def refresh_buffers(self, t):
         """
-        Refreshes all detector buffers
+        Refreshes all detector buffers. Afterwards, the transfer functions triggered by detector
+        devices that observed activity are run.
 
         :param t: The simulation time in milliseconds
         """
@@ -182,6 +205,18 @@ class AbstractCommunicationAdapter(IBrainCommunicationAdapter):
             detector.refresh(t)
         for detector in self.__finalizable_devices:
             detector.finalize_refresh(t)
+        for detector in self.__detector_devices:
+            if hasattr(detector, "dispatch_triggers"):
+                detector.dispatch_triggers(t)
+
+    def flush_buffers(self):
+        """
+        Applies the values transfer functions have written to buffered spike generators since
+        the last flush. Must not be called while the neuronal simulation is running.
+        """
+        for generator in self.__generator_devices:
+            if isinstance(generator, BufferedDevice):
+                generator.flush()
 
     @property
     def detector_devices(self):
@@ -28,6 +28,7 @@ default implementations.
 __author__ = "Sebastian Krach"
 
 from .__DeviceGroup import DeviceGroup
+from .__BrainDeviceTrigger import BrainDeviceTrigger
 from collections import OrderedDict
 from hbp_nrp_cle.tf_framework import resolve_brain_variable
 from hbp_nrp_cle.brainsim.BrainInterface import IBrainDevice
@@ -57,6 +58,8 @@ class AbstractBrainDevice(IBrainDevice):
         #   the parameters on construction.
     }
 
+    __trigger = None
+
     def __init__(self, **params):
         super(AbstractBrainDevice, self).__init__()
 
@@ -100,6 +103,31 @@ class AbstractBrainDevice(IBrainDevice):
         """
         return self
 
+    def get_state(self):
+        """
+        Gets a snapshot of the activation state and the state properties of this device
+
+        :return: A dictionary of the state values
+        """
+        state = {'active': self.active}
+        for name in self.state_properties:
+            state[name] = getattr(self, name)
+        return state
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        if state['active']:
+            self.active = True
+        for name in self.state_properties:
+            if name in state:
+                setattr(self, name, state[name])
+        if not state['active']:
+            self.active = False
+
     def get_parameters(self, *params):
         """
         This method allows to retrieve a dictionary containing device configuration parameters.
@@ -220,3 +248,48 @@ class AbstractBrainDevice(IBrainDevice):
         To be implemented by subclasses
         """
         pass
+
+    def __get_trigger(self):
+        """
+        Gets the trigger of this device, creating it if necessary
+        """
+        if self.__trigger is None:
+            self.__trigger = BrainDeviceTrigger()
+        return self.__trigger
+
+    def configure_trigger(self, threshold=None, epsilon=0.0):
+        """
+        Configures when the device triggers transfer functions
+
+        :param threshold: The rate threshold of population rate devices
+        :param epsilon: The minimum change of rates and voltages that triggers
+        """
+        self.__get_trigger().configure(threshold, epsilon)
+
+    def register_tf_trigger(self, tf):
+        """
+        Registers to trigger the provided TF when the device observes activity. Only spike
+        recorders, population rates and leaky integrators support triggers.
+
+        :param tf: The transfer function
+        """
+        if not BrainDeviceTrigger.supports(self):
+            raise AttributeError("{0} does not support triggers".format(type(self).__name__))
+        self.__get_trigger().register(tf)
+
+    def triggered(self):
+        """
+        Checks whether the current values of the device satisfy its trigger condition
+
+        :return: True, if the device triggers
+        """
+        return self.__get_trigger().fired(self)
+
+    def dispatch_triggers(self, t):
+        """
+        Runs the triggered transfer functions if the device observed activity in the last step
+
+        :param t: The simulation time
+        """
+        if self.__trigger is not None:
+            self.__trigger.dispatch(self, t)
@@ -0,0 +1,193 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains the trigger that lets detector devices run transfer functions when the
+simulated neurons show activity
+"""
+
+__author__ = 'GeorgHinkel'
+
+from hbp_nrp_cle.brainsim.BrainInterface import ISpikeRecorder, IPopulationRate, \
+    ILeakyIntegratorAlpha, ILeakyIntegratorExp
+from hbp_nrp_cle.tf_framework._TransferFunctionManager import TransferFunctionManager
+from hbp_nrp_cle.tf_framework import TFRunningException
+import logging
+import numpy
+
+logger = logging.getLogger(__name__)
+
+TRIGGERING_DEVICE_TYPES = (ISpikeRecorder, IPopulationRate, ILeakyIntegratorAlpha,
+                           ILeakyIntegratorExp)
+
+
+class BrainDeviceTrigger(object):
+    """
+    Decides after every refresh of the brain buffers whether a detector device triggers its
+    transfer functions:
+
+    - a spike recorder triggers when it recorded new spikes,
+    - a population rate triggers when the rate crosses the threshold, or changes by more than
+      epsilon if no threshold is set,
+    - a leaky integrator triggers when the voltage changed by more than epsilon since the last
+      time it triggered.
+    """
+
+    def __init__(self, threshold=None, epsilon=0.0):
+        """
+        Creates a new trigger
+
+        :param threshold: The rate threshold of population rate devices
+        :param epsilon: The minimum change of rates and voltages that triggers
+        """
+        self.__threshold = threshold
+        self.__epsilon = epsilon
+        self.__reference = None
+        self.__tfs = []
+
+    @staticmethod
+    def supports(device):
+        """
+        Gets a value indicating whether the given device can trigger transfer functions
+
+        :param device: The brain device
+        """
+        return isinstance(device, TRIGGERING_DEVICE_TYPES)
+
+    @property
+    def threshold(self):
+        """
+        Gets the rate threshold of population rate devices
+        """
+        return self.__threshold
+
+    @property
+    def epsilon(self):
+        """
+        Gets the minimum change of rates and voltages that triggers
+        """
+        return self.__epsilon
+
+    @property
+    def tfs(self):
+        """
+        Gets the transfer functions registered to this trigger
+        """
+        return self.__tfs
+
+    def configure(self, threshold=None, epsilon=0.0):
+        """
+        Changes the trigger condition
+
+        :param threshold: The rate threshold of population rate devices
+        :param epsilon: The minimum change of rates and voltages that triggers
+        """
+        self.__threshold = threshold
+        self.__epsilon = epsilon
+        self.__reference = None
+
+    def register(self, tf):
+        """
+        Registers the given transfer function to be run when the trigger fires
+
+        :param tf: The transfer function
+        """
+        if tf not in self.__tfs:
+            self.__tfs.append(tf)
+
+    def unregister(self, tf):
+        """
+        Removes the given transfer function from this trigger
+
+        :param tf: The transfer function
+        """
+        if tf in self.__tfs:
+            self.__tfs.remove(tf)
+
+    def reset(self):
+        """
+        Forgets the values observed so far
+        """
+        self.__reference = None
+
+    def fired(self, device):
+        """
+        Checks whether the given device triggers, based on its current values
+
+        :param device: The brain device, it must be supported
+        :return: True, if the transfer functions should run
+        """
+        if isinstance(device, ISpikeRecorder):
+            return bool(device.spiked)
+        if isinstance(device, IPopulationRate):
+            return self.__rate_fired(device.rate)
+        return self.__changed(device.voltage)
+
+    def __rate_fired(self, rate):
+        """
+        Checks whether the rate crossed the threshold since the last check
+
+        :param rate: The current rate
+        """
+        if self.__threshold is None:
+            return self.__changed(rate)
+        previous, self.__reference = self.__reference, rate
+        if previous is None:
+            return rate >= self.__threshold
+        return (previous < self.__threshold) != (rate < self.__threshold)
+
+    def __changed(self, value):
+        """
+        Checks whether the value changed by more than epsilon since the trigger last fired
+
+        :param value: The current value, a number or an array
+        """
+        value = numpy.array(value, dtype=float)
+        reference = self.__reference
+        if reference is not None and reference.shape == value.shape and \
+                not numpy.any(numpy.abs(value - reference) > self.__epsilon):
+            return False
+        self.__reference = value
+        return True
+
+    def dispatch(self, device, t):
+        """
+        Runs the registered transfer functions if the given device triggers
+
+        :param device: The brain device
+        :param t: The simulation time
+        """
+        if self.__tfs and self.fired(device):
+            self.run(t)
+
+    def run(self, t):
+        """
+        Runs the registered transfer functions
+
+        :param t: The simulation time
+        """
+        for tf in list(self.__tfs):
+            try:
+                TransferFunctionManager.run_triggered_tf(tf, t)
+            except TFRunningException:
+                logger.error("Triggered transfer function %s failed", tf.name)
@@ -0,0 +1,285 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains a proxy that buffers the accesses of transfer functions to a brain device,
+such that they do not interfere with a neuronal simulation running in another thread
+"""
+
+__author__ = 'GeorgHinkel'
+
+from hbp_nrp_cle.brainsim.BrainInterface import IBrainDevice
+from .__DeviceGroup import DeviceGroup
+import logging
+import threading
+import numpy
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedDevice(IBrainDevice):
+    """
+    Buffers the accesses to a brain device or device group. Writes are recorded and only applied
+    to the device when the buffer is flushed. Reads of the state properties of the device return
+    the last written value or the value at the last flush. Therefore, transfer functions may
+    access the device while the neuronal simulation is running, as long as the buffer is only
+    flushed in between simulation steps.
+    """
+
+    def __init__(self, device, parent=None, index=None):
+        """
+        Creates a new buffer for the given device
+
+        :param device: The brain device or device group
+        :param parent: The buffer of the device group the device has been selected from, if any
+        :param index: The index or slice the device has been selected with
+        """
+        # use this form since __setattr__ is overridden
+        self.__dict__['_BufferedDevice__device'] = device
+        self.__dict__['_BufferedDevice__parent'] = parent
+        self.__dict__['_BufferedDevice__index'] = index
+        self.__dict__['_BufferedDevice__root'] = self if parent is None else parent.__root
+        self.__dict__['_BufferedDevice__properties'] = frozenset(_state_properties(device))
+        self.__dict__['_BufferedDevice__writes'] = {}
+        self.__dict__['_BufferedDevice__selections'] = {}
+        self.__dict__['_BufferedDevice__snapshot'] = {}
+        if parent is None:
+            self.__dict__['_BufferedDevice__operations'] = []
+            self.__dict__['_BufferedDevice__lock'] = threading.Lock()
+            self.__take_snapshot()
+
+    @property
+    def device(self):
+        """
+        Gets the buffered brain device or device group
+        """
+        return self.__device
+
+    @property
+    def state_properties(self):
+        """
+        Gets the names of the state properties of the buffered device
+        """
+        return tuple(self.__properties)
+
+    @property
+    def pending(self):
+        """
+        Gets the number of operations that wait for the next flush
+        """
+        return len(self.__root.__operations)
+
+    def __getattr__(self, name):
+        # only called for attributes not defined by the buffer itself
+        if name.startswith('_BufferedDevice__'):
+            raise AttributeError(name)
+        if name in self.__properties:
+            return self.__read(name)
+        return getattr(self.__device, name)
+
+    def __setattr__(self, name, value):
+        if name == 'spec':
+            self.__dict__['spec'] = value
+            return
+        root = self.__root
+        with root.__lock:
+            root.__operations.append((setattr, (self.__device, name, value)))
+            self.__writes[name] = value
+            if name in self.__properties and self.__parent is not None:
+                self.__parent.__write_through(name, self.__index, value)
+
+    def __getitem__(self, index):
+        key = _selection_key(index)
+        with self.__root.__lock:
+            selection = self.__selections.get(key)
+            if selection is None:
+                selection = BufferedDevice(self.__device[index], self, index)
+                self.__selections[key] = selection
+        return selection
+
+    def __len__(self):
+        return len(self.__device)
+
+    def __read(self, name):
+        """
+        Reads the value of a state property as transfer functions see it
+
+        :param name: The name of the state property
+        """
+        writes = self.__writes
+        if name in writes:
+            return writes[name]
+        parent = self.__parent
+        if parent is None:
+            snapshot = self.__snapshot
+            return snapshot[name] if name in snapshot else getattr(self.__device, name)
+        value = parent.__read(name)
+        if hasattr(value, '__getitem__'):
+            return numpy.asarray(value)[self.__index]
+        return value
+
+    def __write_through(self, name, index, value):
+        """
+        Updates the value of a state property of a device group after a selection of the group
+        has been written
+
+        :param name: The name of the state property
+        :param index: The index or slice of the selection
+        :param value: The value written to the selection
+        """
+        values = numpy.array(numpy.broadcast_to(self.__read(name), (len(self.__device),)))
+        values[index] = value
+        self.__writes[name] = values
+        if self.__parent is not None:
+            self.__parent.__write_through(name, self.__index, values)
+
+    def __take_snapshot(self):
+        """
+        Reads the state properties of the device, such that transfer functions can read them
+        without accessing the simulator
+        """
+        snapshot = {}
+        for name in self.__properties:
+            try:
+                snapshot[name] = getattr(self.__device, name)
+            # pylint: disable=broad-except
+            except Exception:
+                logger.debug("State property %s of %s cannot be buffered", name, self.__device)
+        self.__dict__['_BufferedDevice__snapshot'] = snapshot
+
+    def __discard(self):
+        """
+        Discards all operations that have not been applied yet
+        """
+        with self.__lock:
+            del self.__operations[:]
+            self.__writes.clear()
+            self.__selections.clear()
+
+    def flush(self):
+        """
+        Applies the buffered operations to the device in the order they were recorded. Must not
+        be called while the neuronal simulation is running.
+        """
+        with self.__lock:
+            operations = self.__operations
+            if not operations:
+                return
+            self.__dict__['_BufferedDevice__operations'] = []
+        for function, args in operations:
+            try:
+                function(*args)
+            # pylint: disable=broad-except
+            except Exception:
+                logger.exception("Cannot apply a buffered operation to %s", self.__device)
+        self.__take_snapshot()
+        with self.__lock:
+            # operations recorded in the meantime keep their values visible until the next flush
+            if not self.__operations:
+                self.__writes.clear()
+                self.__selections.clear()
+
+    def inject_spikes(self):
+        """
+        Injects a spike to the connected population once the buffer is flushed
+        """
+        root = self.__root
+        with root.__lock:
+            root.__operations.append((self.__device.inject_spikes, ()))
+
+    @property
+    def active(self):
+        """
+        Returns the activation state of the device
+        """
+        writes = self.__writes
+        return writes['active'] if 'active' in writes else self.__device.active
+
+    def connect(self, neurons):
+        """
+        Connects the buffered device to the specified neuron population
+
+        :param neurons: the neurons of the brain to which the device will connect
+        """
+        self.__device.connect(neurons)
+
+    def reset(self, transfer_function_manager):
+        """
+        Resets the buffered device and discards the operations not applied yet
+
+        :param transfer_function_manager: The transfer function manager the device belongs to
+        :return: The reset adapter
+        """
+        self.__root.__discard()
+        self.__dict__['_BufferedDevice__device'] = self.__device.reset(transfer_function_manager)
+        self.__root.__take_snapshot()
+        return self
+
+    def _disconnect(self):
+        """
+        Discards the operations not applied yet and disconnects the buffered device
+        """
+        self.__root.__discard()
+        self.__device._disconnect()  # pylint: disable=protected-access
+
+    def get_state(self):
+        """
+        Gets a snapshot of the state of the buffered device
+
+        :return: A dictionary of the state values
+        """
+        return self.__device.get_state()
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state and discards the operations not applied yet
+
+        :param state: The snapshot
+        """
+        self.__root.__discard()
+        self.__device.set_state(state)
+        self.__root.__take_snapshot()
+
+
+def _state_properties(device):
+    """
+    Gets the names of the state properties of a brain device or device group
+
+    :param device: The brain device or device group
+    """
+    if isinstance(device, DeviceGroup):
+        return device.device_type.state_properties
+    return getattr(device, 'state_properties', ())
+
+
+def _selection_key(index):
+    """
+    Gets a hashable key for an index or slice into a device group
+
+    :param index: The index, slice or index array
+    """
+    if isinstance(index, slice):
+        return slice, index.start, index.stop, index.step
+    if isinstance(index, numpy.ndarray):
+        return numpy.ndarray, tuple(index.tolist())
+    return index
@@ -27,6 +27,7 @@ moduleauthor: probst@fzi.de
 '''
 
 from hbp_nrp_cle.brainsim.BrainInterface import IDeviceGroup
+from .__BrainDeviceTrigger import BrainDeviceTrigger
 import numpy
 
 __author__ = 'DimitriProbst, Sebastian Krach'
@@ -47,6 +48,7 @@ class DeviceGroup(IDeviceGroup):
         self.__dict__['_spec'] = None
         self.__dict__['device_type'] = cls
         self.__dict__['devices'] = devices
+        self.__dict__['_trigger'] = None
 
     @classmethod
     def create_new_device_group(cls, populations, nested_device_type, params):
@@ -157,6 +159,42 @@ class DeviceGroup(IDeviceGroup):
             if hasattr(device, 'finalize_refresh'):
                 device.finalize_refresh(t)
 
+    def configure_trigger(self, threshold=None, epsilon=0.0):
+        """
+        Configures when the devices of the group trigger transfer functions
+
+        :param threshold: The rate threshold of population rate devices
+        :param epsilon: The minimum change of rates and voltages that triggers
+        """
+        for device in self.devices:
+            device.configure_trigger(threshold, epsilon)
+
+    def register_tf_trigger(self, tf):
+        """
+        Registers to trigger the provided TF when any device of the group observes activity
+
+        :param tf: The transfer function
+        """
+        if not all(BrainDeviceTrigger.supports(device) for device in self.devices):
+            raise AttributeError("{0} does not support triggers".format(self.device_type.__name__))
+        if self._trigger is None:
+            self._trigger = BrainDeviceTrigger()
+        self._trigger.register(tf)
+
+    def dispatch_triggers(self, t):
+        """
+        Runs the triggered transfer functions once if any device of the group observed activity
+        in the last step
+
+        :param t: The simulation time
+        """
+        trigger = self._trigger
+        if trigger is not None and trigger.tfs:
+            # every device has to update the values it compares against
+            fired = [device.triggered() for device in self.devices]
+            if any(fired):
+                trigger.run(t)
+
     @property
     def active(self):
         """
@@ -229,6 +267,23 @@ class DeviceGroup(IDeviceGroup):
             return self
         return type(self)(self.device_type, reset_devices)
 
+    def get_state(self):
+        """
+        Gets a snapshot of the state of all nested devices
+
+        :return: A list with the state of every nested device
+        """
+        return [device.get_state() for device in self.devices]
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The list of states of the nested devices
+        """
+        for device, device_state in zip(self.devices, state):
+            device.set_state(device_state)
+
     @classmethod
     def _create_device_config(cls, params, index):
         """
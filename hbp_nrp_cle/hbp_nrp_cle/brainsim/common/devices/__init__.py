@@ -6,3 +6,5 @@ __author__ = "Sebastian Krach"
 
 from .__DeviceGroup import DeviceGroup
 from .__AbstractBrainDevice import AbstractBrainDevice
+from .__BrainDeviceTrigger import BrainDeviceTrigger
+from .__BufferedDevice import BufferedDevice
@@ -204,6 +204,23 @@ class NengoControlAdapter(IBrainControlAdapter):
         self._nengo_simulation_state.reset_simulator()
         logger.info("neuronal simulator reset")
 
+    # pylint: disable=no-self-use
+    def get_state(self):
+        """
+        Gets a snapshot of the neuron state, which is not supported for Nengo
+
+        :return: None
+        """
+        return None
+
+    def set_state(self, state):
+        """
+        Restores the neuron state, which is not supported for Nengo
+
+        :param state: The snapshot
+        """
+        pass
+
     # pylint: disable=no-self-use
     def get_Timeout(self):  # pragma: no cover
         """
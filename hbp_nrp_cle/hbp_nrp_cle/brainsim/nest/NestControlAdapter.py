@@ -27,6 +27,8 @@ Implementation of NestControlAdapter
 
 from hbp_nrp_cle.brainsim import IBrainControlAdapter
 from hbp_nrp_cle.brainsim.common import PythonBrainLoader as BrainLoader
+from hbp_nrp_cle.brainsim.common.NestNeuronState import get_nest_neuron_state, \
+    set_nest_neuron_state
 from hbp_nrp_cle.brainsim.nest import NestPopulationInfo
 import hbp_nrp_cle.brainsim as brainsim
 from hbp_nrp_cle.cle.CLEInterface import BrainRuntimeException
@@ -246,6 +248,23 @@ class NestControlAdapter(IBrainControlAdapter):
         """
         logger.info("neuronal simulator reset")
 
+    def get_state(self):
+        """
+        Gets a snapshot of the state variables of all neurons in the populations of the brain
+
+        :return: A dictionary mapping global neuron identifiers to their state values
+        """
+        gids = [gid for population in self.get_populations() for gid in population.gids]
+        return get_nest_neuron_state(self._sim, gids)
+
+    def set_state(self, state):
+        """
+        Restores the state variables of the neurons from a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        set_nest_neuron_state(self._sim, state)
+
     @staticmethod
     def populations_using_json_slice(populations):
         """
@@ -28,6 +28,8 @@ moduleauthor: probst@fzi.de
 
 from hbp_nrp_cle.brainsim import IBrainControlAdapter
 from hbp_nrp_cle.brainsim.common import PythonBrainLoader as BrainLoader
+from hbp_nrp_cle.brainsim.common.NestNeuronState import get_nest_neuron_state, \
+    set_nest_neuron_state
 from hbp_nrp_cle.brainsim.pynn import PyNNPopulationInfo
 from hbp_nrp_cle.brainsim.pynn.PyNNInfo import is_population
 import hbp_nrp_cle.brainsim as brainsim
@@ -249,6 +251,30 @@ class PyNNControlAdapter(IBrainControlAdapter):
         """
         logger.info("neuronal simulator reset")
 
+    def get_state(self):
+        """
+        Gets a snapshot of the state variables of all neurons in the populations of the brain.
+        PyNN has no API to read the current state variables, so snapshots are only supported
+        if the simulator backend is NEST.
+
+        :return: A dictionary mapping global neuron identifiers to their state values, or None
+        if the simulator backend is not supported
+        """
+        nest = getattr(self._sim, 'nest', None)
+        if nest is None:
+            return None
+        gids = [gid for population in self.get_populations() for gid in population.gids]
+        return get_nest_neuron_state(nest, gids)
+
+    def set_state(self, state):
+        """
+        Restores the state variables of the neurons from a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        if state is not None:
+            set_nest_neuron_state(self._sim.nest, state)
+
     @staticmethod
     def populations_using_json_slice(populations):
         """
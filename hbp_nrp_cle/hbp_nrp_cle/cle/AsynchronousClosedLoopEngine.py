@@ -0,0 +1,249 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Implementation of a loosely-coupled closed loop engine.
+"""
+
+__author__ = 'GeorgHinkel'
+
+import hbp_nrp_cle as cle
+from hbp_nrp_cle.cle.DeterministicClosedLoopEngine import DeterministicClosedLoopEngine
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from hbp_nrp_cle.cle.CLEInterface import ForcedStopException
+
+logger = logging.getLogger('hbp_nrp_cle')
+
+
+# pylint: disable=R0902
+# the attributes are reasonable in this case
+class AsynchronousClosedLoopEngine(DeterministicClosedLoopEngine):
+    """
+    Implementation of the closed loop engine in which the brain and the world simulation run
+    freely and only meet every few steps or when they drift too far apart.
+
+    Each call to run_step runs a synchronization window of sync_interval steps. Within a window,
+    the world simulation is stepped on a worker thread while the brain simulation and the
+    transfer functions run on the CLE thread, the TFs working on the latest available device and
+    topic values. Neither simulation may get ahead of the other by more than max_drift of
+    simulation time. At the end of the window, both simulations are at the same time again.
+
+    Multi-rate schedules and adaptive macro-steps are not supported by this engine.
+    """
+
+    # default number of steps after which the simulations meet
+    DEFAULT_SYNC_INTERVAL = 10
+    # default maximum drift between the simulations in seconds
+    DEFAULT_MAX_DRIFT = 0.1
+
+    def __init__(self,
+                 robot_control_adapter,
+                 robot_comm_adapter,
+                 brain_control_adapter,
+                 brain_comm_adapter,
+                 transfer_function_manager,
+                 external_module_array,
+                 dt,
+                 sync_interval=DEFAULT_SYNC_INTERVAL,
+                 max_drift=DEFAULT_MAX_DRIFT):
+        """
+        Create an instance of the cle.
+
+        :param robot_control_adapter: an instance of IRobotContolAdapter
+        :param robot_comm_adapter: an instance of IRobotCommunicationAdapter
+        :param brain_control_adapter: an instance of IBrainContolAdapter
+        :param brain_comm_adapter: an instance of IBrainCommunicationAdapter
+        :param transfer_function_manager: an instance of ITransferFunctionManager
+        :param external_module_array: an instance of ExternalModuleManager
+        :param dt: The CLE time step in seconds
+        :param sync_interval: The number of steps after which the simulations meet
+        :param max_drift: The maximum simulation time in seconds one simulation may be ahead of
+         the other, it is rounded down to a whole number of steps but at least one step
+        """
+        super(AsynchronousClosedLoopEngine, self).__init__(robot_control_adapter,
+                                                           robot_comm_adapter,
+                                                           brain_control_adapter,
+                                                           brain_comm_adapter,
+                                                           transfer_function_manager,
+                                                           external_module_array,
+                                                           dt)
+        if sync_interval < 1:
+            raise ValueError("The synchronization interval must be at least one step")
+        self.sync_interval = sync_interval
+        self.max_drift = max_drift
+
+        self.__robot_executor = ThreadPoolExecutor(max_workers=1)
+        self.__condition = threading.Condition()
+        # progress of both simulations within the current window, in steps
+        self.__brain_steps = 0
+        self.__robot_steps = 0
+        self.__abort_window = False
+
+        self.drift = 0.0
+        self.max_observed_drift = 0.0
+        self.drift_waits = 0
+        self.synchronizations = 0
+
+    def __max_drift_steps(self, timestep):
+        """
+        Gets the maximum drift in steps
+
+        :param timestep: The CLE time step in seconds
+        """
+        return max(1, int(self.max_drift / timestep + 1e-9))
+
+    def __wait_for(self, predicate):
+        """
+        Waits until the given predicate holds or the window is aborted.
+        Must be called while holding the condition.
+
+        :param predicate: A function without parameters
+        :return: True, if the predicate holds, False if the window has been aborted
+        """
+        if not predicate() and not self.__abort_window:
+            self.drift_waits += 1
+            while not predicate() and not self.__abort_window:
+                self.__condition.wait()
+        return not self.__abort_window
+
+    def __run_robot(self, steps, timestep):
+        """
+        Steps the world simulation through a window. To be executed in a separate thread.
+
+        :param steps: The number of steps in the window
+        :param timestep: The CLE time step in seconds
+        """
+        max_drift = self.__max_drift_steps(timestep)
+        condition = self.__condition
+        try:
+            for step in xrange(steps):
+                with condition:
+                    if not self.__wait_for(lambda s=step: s + 1 - self.__brain_steps <= max_drift):
+                        return
+                self.rca_future = f = self.rca.run_step_async(timestep)
+                f.result()
+                self._rca_elapsed_time += f.end - f.start
+                with condition:
+                    self.__robot_steps = step + 1
+                    condition.notify_all()
+        except ForcedStopException:
+            logger.warn("Simulation was brutally stopped.")
+        finally:
+            # any other exception is raised on the CLE thread when the window ends
+            with condition:
+                if self.__robot_steps < steps:
+                    self.__abort_window = True
+                    condition.notify_all()
+
+    def run_step(self, timestep):
+        """
+        Runs both simulations for a synchronization window, i.e. sync_interval time steps.
+
+        :param timestep: The CLE time step in seconds
+        :return: Updated simulation time, otherwise -1
+        """
+        steps = self.sync_interval
+        if self._tick_horizon is not None:
+            steps = max(1, min(steps, self._tick_horizon - self._tick))
+        max_drift = self.__max_drift_steps(timestep)
+        condition = self.__condition
+
+        self.__brain_steps = 0
+        self.__robot_steps = 0
+        self.__abort_window = False
+        robot_future = self.__robot_executor.submit(self.__run_robot, steps, timestep)
+        try:
+            for step in xrange(steps):
+                clk = cle.clock
+                step_start = time.time()
+                with condition:
+                    if not self.__wait_for(lambda s=step: s + 1 - self.__robot_steps <= max_drift):
+                        break
+                start = time.time()
+
+                # brain simulation
+                logger.debug("Run step: Brain simulation")
+                self.bca.run_step(timestep * 1000.0)
+                brain_refresh_start = time.time()
+                self.bcm.refresh_buffers(clk)
+                robot_refresh_start = time.time()
+                self.rcm.refresh_buffers(clk)
+                tf_start = time.time()
+                self._bca_elapsed_time += robot_refresh_start - start
+
+                with condition:
+                    self.__brain_steps = step + 1
+                    condition.notify_all()
+                    self.drift = (self.__brain_steps - self.__robot_steps) * timestep
+                self.max_observed_drift = max(self.max_observed_drift, abs(self.drift))
+
+                # transfer functions on the latest available values
+                logger.debug("Run step: Transfer functions")
+                self.tfm.run_tfs(clk)
+
+                ema_start = time.time()
+                self.ema.run_step()
+                step_end = time.time()
+
+                self.step_timings.record((start - step_start,
+                                          brain_refresh_start - start,
+                                          robot_refresh_start - brain_refresh_start,
+                                          tf_start - robot_refresh_start,
+                                          ema_start - tf_start,
+                                          step_end - ema_start,
+                                          step_end - step_start))
+                self._tick += 1
+                cle.clock += timestep
+        finally:
+            with condition:
+                if self.__brain_steps < steps:
+                    self.__abort_window = True
+                    condition.notify_all()
+            # the simulations meet at the end of the window
+            logger.debug("Run_step: waiting on Control thread")
+            robot_future.result()
+        self.synchronizations += 1
+        self.drift = 0.0
+
+        logger.debug("Run_step: done !")
+        return cle.clock
+
+    def reset(self):
+        """
+        Reset the orchestrated simulations (stops them before resetting).
+        """
+        super(AsynchronousClosedLoopEngine, self).reset()
+        self.drift = 0.0
+        self.max_observed_drift = 0.0
+        self.drift_waits = 0
+        self.synchronizations = 0
+
+    def shutdown(self):
+        """
+        Shuts down both simulations and the world simulation worker.
+        """
+        super(AsynchronousClosedLoopEngine, self).shutdown()
+        self.__robot_executor.shutdown(wait=True)
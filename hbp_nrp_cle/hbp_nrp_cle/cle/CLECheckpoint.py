@@ -0,0 +1,80 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains the snapshot of a closed loop engine used to restore it to a known point
+"""
+
+__author__ = 'GeorgHinkel'
+
+import cPickle as pickle
+
+
+class CLECheckpoint(object):
+    """
+    Represents a snapshot of the closed loop engine. It holds the simulation time, the state of
+    the transfer functions (their local and global data, CSV recorder buffers and brain device
+    states) and, if the brain simulator supports it, the state variables of the neurons.
+
+    The snapshot does not contain the world simulation, synaptic weights, the spikes in flight
+    or the time of the brain simulator, which cannot be rewound. After a restore, the brain
+    simulator therefore runs ahead of the CLE clock by the time simulated since the checkpoint,
+    and spike times reported by brain devices are shifted by the same amount.
+    """
+
+    def __init__(self, clock, tick, transfer_functions, brain):
+        """
+        Creates a new checkpoint
+
+        :param clock: The simulation time in seconds
+        :param tick: The number of CLE steps run so far
+        :param transfer_functions: The snapshot of the transfer function manager
+        :param brain: The snapshot of the neuron state, or None if not supported
+        """
+        self.clock = clock
+        self.tick = tick
+        self.transfer_functions = transfer_functions
+        self.brain = brain
+
+    def save(self, filename):
+        """
+        Saves the checkpoint to the given file
+
+        :param filename: The path of the file
+        """
+        with open(filename, 'wb') as checkpoint_file:
+            pickle.dump(self, checkpoint_file, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filename):
+        """
+        Loads a checkpoint saved with save
+
+        :param filename: The path of the file
+        :return: The checkpoint
+        """
+        with open(filename, 'rb') as checkpoint_file:
+            checkpoint = pickle.load(checkpoint_file)
+        if not isinstance(checkpoint, CLECheckpoint):
+            raise ValueError("The file {0} does not contain a CLE checkpoint".format(filename))
+        return checkpoint
@@ -29,9 +29,10 @@ __author__ = 'Georg Hinkel'
 
 import hbp_nrp_cle as cle
 from hbp_nrp_cle.cle.DeterministicClosedLoopEngine import DeterministicClosedLoopEngine
+from hbp_nrp_cle.cle.MultiRateSchedule import MultiRateSchedule
 import time
 import logging
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from hbp_nrp_cle.cle.CLEInterface import ForcedStopException
 
 logger = logging.getLogger('hbp_nrp_cle')
@@ -42,7 +43,16 @@ logger = logging.getLogger('hbp_nrp_cle')
 class ClosedLoopEngine(DeterministicClosedLoopEngine):
     """
     Implementation of the closed loop engine that runs Transfer Functions, brain
-    simulation and world simulation all in parallel for best effort performance
+    simulation and world simulation all in parallel for best effort performance.
+
+    The engine is pipelined: while the brain and the world simulation compute a step, the
+    Transfer Functions run on a worker thread on the state at the beginning of that step.
+    Therefore, the data TFs read is at most one step old and the data they write takes effect
+    one step later than with the DeterministicClosedLoopEngine. Device and topic buffers are
+    only refreshed at step boundaries, when no TF is running, so that the TFs always work on a
+    consistent snapshot. Values the TFs write to spike generators are buffered as well and only
+    applied to the neuronal simulator on the CLE thread at the end of the step, since the
+    neuronal simulator must not be accessed while it simulates.
     """
 
     def __init__(self,
@@ -51,6 +61,7 @@ class ClosedLoopEngine(DeterministicClosedLoopEngine):
                  brain_control_adapter,
                  brain_comm_adapter,
                  transfer_function_manager,
+                 external_module_array,
                  dt):
         """
         Create an instance of the cle.
@@ -60,15 +71,19 @@ class ClosedLoopEngine(DeterministicClosedLoopEngine):
         :param brain_control_adapter: an instance of IBrainContolAdapter
         :param brain_comm_adapter: an instance of IBrainCommunicationAdapter
         :param transfer_function_manager: an instance of ITransferFunctionManager
+        :param external_module_array: an instance of ExternalModuleManager
         :param dt: The CLE time step in seconds
         """
         super(ClosedLoopEngine, self).__init__(robot_control_adapter, robot_comm_adapter,
                                                brain_control_adapter, brain_comm_adapter,
-                                               transfer_function_manager, dt)
+                                               transfer_function_manager, external_module_array,
+                                               dt)
 
-        self.__tf_thread = None
-        self.__tf_start_event = threading.Event()
-        self.__tf_done_event = threading.Event()
+        # topic values received during a step must not be visible to the TFs of that step
+        self.rcm.double_buffered = True
+        # the TFs must not access the brain devices while the brain simulation runs
+        self.bcm.double_buffered = True
+        self.__tf_executor = ThreadPoolExecutor(max_workers=1)
 
     def run_step(self, timestep):
         """
@@ -78,60 +93,81 @@ class ClosedLoopEngine(DeterministicClosedLoopEngine):
         :return: Updated simulation time, otherwise -1
         """
         clk = cle.clock
+        tick = self._tick
+        schedule = self.schedule
+        step_start = time.time()
 
-        self.__tf_start_event.set()
+        # transfer functions on the state at the beginning of this step
+        tf_future = None
+        if schedule.is_due(MultiRateSchedule.TRANSFER_FUNCTIONS, tick):
+            logger.debug("Run step: Transfer functions")
+            tf_future = self.__tf_executor.submit(self.tfm.run_tfs, clk)
 
         # robot simulation
-        logger.debug("Run step: Robot simulation.")
-        self.rca_future = self.rca.run_step_async(timestep)
-        self.rcm.refresh_buffers(clk)
+        robot_due = schedule.is_due(MultiRateSchedule.ROBOT, tick)
+        if robot_due:
+            logger.debug("Run step: Robot simulation.")
+            self.rca_future = self.rca.run_step_async(
+                timestep * schedule.period(MultiRateSchedule.ROBOT))
 
         # brain simulation
-        logger.debug("Run step: Brain simulation")
+        brain_due = schedule.is_due(MultiRateSchedule.BRAIN, tick)
         start = time.time()
-        self.bca.run_step(timestep * 1000.0)
-        self.bcm.refresh_buffers(clk)
-        self._bca_elapsed_time += time.time() - start
-
-        # update clock
-        cle.clock += timestep
+        if brain_due:
+            logger.debug("Run step: Brain simulation")
+            self.bca.run_step(timestep * schedule.period(MultiRateSchedule.BRAIN) * 1000.0)
+        robot_wait_start = time.time()
+        self._bca_elapsed_time += robot_wait_start - start
 
         # wait for all thread to finish
-        logger.debug("Run_step: waiting on Control thread")
-        try:
-            f = self.rca_future
-            f.result()
-            self._rca_elapsed_time += f.end - f.start
-        except ForcedStopException:
-            logger.warn("Simulation was brutally stopped.")
+        if robot_due:
+            logger.debug("Run_step: waiting on Control thread")
+            try:
+                f = self.rca_future
+                f.result()
+                self._rca_elapsed_time += f.end - f.start
+            except ForcedStopException:
+                logger.warn("Simulation was brutally stopped.")
+
+        tf_wait_start = time.time()
+        if tf_future is not None:
+            logger.debug("Run_step: waiting on Transfer functions")
+            tf_future.result()
+
+        # no TF is running anymore, so the buffers can be swapped safely
+        robot_refresh_start = time.time()
+        if robot_due:
+            self.rcm.refresh_buffers(clk)
+        brain_refresh_start = time.time()
+        # values the TFs wrote to brain devices take effect in the next brain step
+        self.bcm.flush_buffers()
+        if brain_due:
+            self.bcm.refresh_buffers(clk)
+
+        ema_start = time.time()
+        if schedule.is_due(MultiRateSchedule.EXTERNAL_MODULES, tick):
+            self.ema.run_step()
+        step_end = time.time()
+
+        # the TF phase only accounts for the time the CLE thread was blocked by the TFs
+        self.step_timings.record((tf_wait_start - robot_wait_start,
+                                  robot_wait_start - start,
+                                  ema_start - brain_refresh_start,
+                                  brain_refresh_start - robot_refresh_start,
+                                  robot_refresh_start - tf_wait_start,
+                                  step_end - ema_start,
+                                  step_end - step_start))
 
-        self.__tf_done_event.wait()
-        self.__tf_done_event.clear()
+        # update clock
+        self._tick = tick + 1
+        cle.clock += timestep
 
         logger.debug("Run_step: done !")
         return cle.clock
 
-    def __run_tfs(self):
-        """
-        Runs the Transfer Functions. To be executed in a separate thread
-        """
-        clk = cle.clock
-        while not self.stopped_flag.isSet():
-            self.__tf_start_event.wait()
-            self.__tf_start_event.clear()
-            try:
-                # transfer functions
-                logger.debug("Run step: Transfer functions")
-                self.tfm.run_robot_to_neuron(clk)
-                self.tfm.run_neuron_to_robot(clk)
-            finally:
-                self.__tf_done_event.set()
-
-    def start(self):
+    def shutdown(self):
         """
-        Starts the orchestrated simulations
+        Shuts down both simulations and the Transfer Function worker.
         """
-        if super(ClosedLoopEngine, self).start():
-            self.__tf_thread = threading.Thread(target=self.__run_tfs)
-            self.__tf_thread.setDaemon(True)
-            self.__tf_thread.start()
+        super(ClosedLoopEngine, self).shutdown()
+        self.__tf_executor.shutdown(wait=True)
@@ -36,6 +36,10 @@ from hbp_nrp_cle.cle.CLEInterface import IClosedLoopControl, ForcedStopException
 from hbp_nrp_cle.cle.CLEInterface import BrainTimeoutException
 
 from hbp_nrp_cle.cle.__helper import get_tf_elapsed_times
+from hbp_nrp_cle.cle.StepTimingRecorder import StepTimingRecorder
+from hbp_nrp_cle.cle.RealTimePacer import RealTimePacer
+from hbp_nrp_cle.cle.MultiRateSchedule import MultiRateSchedule
+from hbp_nrp_cle.cle.CLECheckpoint import CLECheckpoint
 from hbp_nrp_cle.robotsim.GazeboHelper import GazeboHelper
 import hbp_nrp_cle as cle
 
@@ -109,6 +113,17 @@ class DeterministicClosedLoopEngine(IClosedLoopControl):
 
         self._rca_elapsed_time = 0.0
         self._bca_elapsed_time = 0.0
+        self.step_timings = StepTimingRecorder()
+        # by default, the simulation runs as fast as possible
+        self.pacer = RealTimePacer()
+        # by default, all components are stepped on every tick
+        self.schedule = MultiRateSchedule()
+        self._tick = 0
+        # maximum number of steps merged into a single macro-step when no TF or external module
+        # is due, 1 disables adaptive macro-stepping (ignored by the pipelined ClosedLoopEngine)
+        self.max_macro_steps = 1
+        # tick index that macro-steps must not go beyond, None if unbounded
+        self._tick_horizon = None
         self.__network_file = None
         self.__network_configuration = None
 
@@ -204,43 +219,152 @@ class DeterministicClosedLoopEngine(IClosedLoopControl):
         :return: Updated simulation time, otherwise -1
         """
         clk = cle.clock
+        tick = self._tick
+        schedule = self.schedule
+        step_start = robot_refresh_start = start = brain_refresh_start = time.time()
+
+        ticks, tf_clk = 1, clk
+        if self.max_macro_steps > 1:
+            ticks, tf_clk = self._plan_macro_step(timestep)
 
         # robot simulation
-        logger.debug("Run step: Robot simulation.")
-        self.rca_future = self.rca.run_step_async(timestep)
-        self.rcm.refresh_buffers(clk)
+        robot_due = schedule.is_due(MultiRateSchedule.ROBOT, tick)
+        if robot_due:
+            logger.debug("Run step: Robot simulation.")
+            self.rca_future = self.rca.run_step_async(
+                timestep * ticks * schedule.period(MultiRateSchedule.ROBOT))
+            robot_refresh_start = time.time()
+            self.rcm.refresh_buffers(clk)
+            start = brain_refresh_start = time.time()
 
         # brain simulation
-        logger.debug("Run step: Brain simulation")
-        start = time.time()
-        self.bca.run_step(timestep * 1000.0)
-        self.bcm.refresh_buffers(clk)
-        self._bca_elapsed_time += time.time() - start
+        if schedule.is_due(MultiRateSchedule.BRAIN, tick):
+            logger.debug("Run step: Brain simulation")
+            self.bca.run_step(
+                timestep * ticks * schedule.period(MultiRateSchedule.BRAIN) * 1000.0)
+            brain_refresh_start = time.time()
+            self.bcm.refresh_buffers(clk)
+        robot_wait_start = time.time()
+        self._bca_elapsed_time += robot_wait_start - start
 
         # wait for all thread to finish
-        logger.debug("Run_step: waiting on Control thread")
-        try:
-            f = self.rca_future
-            f.result()
-            self._rca_elapsed_time += f.end - f.start
-        except ForcedStopException:
-            logger.warn("Simulation was brutally stopped.")
+        if robot_due:
+            logger.debug("Run_step: waiting on Control thread")
+            try:
+                f = self.rca_future
+                f.result()
+                self._rca_elapsed_time += f.end - f.start
+            except ForcedStopException:
+                logger.warn("Simulation was brutally stopped.")
 
         # transfer functions
-        logger.debug("Run step: Transfer functions")
-
-        # self.tfm.run_robot_to_neuron(clk)
-        # self.tfm.run_neuron_to_robot(clk)
-        self.tfm.run_tfs(clk)
-
-        self.ema.run_step()
+        tick += ticks - 1
+        tf_start = time.time()
+        if schedule.is_due(MultiRateSchedule.TRANSFER_FUNCTIONS, tick):
+            logger.debug("Run step: Transfer functions")
+
+            # self.tfm.run_robot_to_neuron(clk)
+            # self.tfm.run_neuron_to_robot(clk)
+            self.tfm.run_tfs(tf_clk)
+
+        ema_start = time.time()
+        if schedule.is_due(MultiRateSchedule.EXTERNAL_MODULES, tick):
+            self.ema.run_step()
+        step_end = time.time()
+
+        self.step_timings.record((tf_start - robot_wait_start,
+                                  brain_refresh_start - start,
+                                  robot_wait_start - brain_refresh_start,
+                                  start - robot_refresh_start,
+                                  ema_start - tf_start,
+                                  step_end - ema_start,
+                                  step_end - step_start))
 
         # update clock
-        cle.clock += timestep
+        self._tick = tick + 1
+        cle.clock = tf_clk + timestep
 
         logger.debug("Run_step: done !")
         return cle.clock
 
+    def _plan_macro_step(self, timestep):
+        """
+        Determines how many of the upcoming steps can be merged into a single macro-step. Steps
+        can be merged as long as neither a TF nor an external module is due, the TFs of the last
+        merged step run with the same simulation time as without merging. TFs that are only
+        triggered by devices or topics do not prevent merging, they run when their triggers fire.
+
+        :param timestep: The CLE time step in seconds
+        :return: A tuple with the number of merged steps and the simulation time of the last one
+        """
+        schedule = self.schedule
+        tf_clk = cle.clock
+        if schedule.period(MultiRateSchedule.BRAIN) != 1 or \
+                schedule.period(MultiRateSchedule.ROBOT) != 1:
+            return 1, tf_clk
+        tick = self._tick
+        max_ticks = self.max_macro_steps
+        if self._tick_horizon is not None:
+            max_ticks = min(max_ticks, self._tick_horizon - tick)
+        next_tf_time = self.tfm.next_run_time()
+        has_modules = len(self.ema.module_names) > 0
+        ticks = 1
+        while ticks < max_ticks:
+            if schedule.is_due(MultiRateSchedule.TRANSFER_FUNCTIONS, tick) and \
+                    next_tf_time <= tf_clk:
+                break
+            if has_modules and schedule.is_due(MultiRateSchedule.EXTERNAL_MODULES, tick):
+                break
+            # accumulate the clock exactly like single steps do
+            tf_clk += timestep
+            tick += 1
+            ticks += 1
+        return ticks, tf_clk
+
+    def run_steps(self, steps):
+        """
+        Runs the given number of CLE steps synchronously on the calling thread. This is meant
+        for headless batch runs, the simulation loop must not be started.
+
+        :param steps: The number of steps to run
+        :return: A dictionary summarizing the run, containing the number of 'steps', the
+         'simulation_time' at the end of the run, the wall clock 'real_time' of the run, the
+         step timing statistics of the run as 'phases' and the names of the
+         'flawed_transfer_functions'
+        """
+        if self.running:
+            raise Exception("Cannot run steps synchronously while the simulation loop is running")
+        timestep = self.timestep
+        run_step = self.run_step
+        start = time.time()
+        calls = 0
+        self._tick_horizon = self._tick + steps
+        try:
+            while self._tick < self._tick_horizon:
+                run_step(timestep)
+                calls += 1
+        finally:
+            self._tick_horizon = None
+        real_time = time.time() - start
+        self.elapsed_time += real_time
+        return {
+            'steps': steps,
+            'simulation_time': cle.clock,
+            'real_time': real_time,
+            'phases': self.step_timings.statistics(calls),
+            'flawed_transfer_functions': [tf.name for tf in self.tfm.flawed]
+        }
+
+    def run_for(self, sim_seconds):
+        """
+        Runs the simulation synchronously on the calling thread for the given simulation time,
+        rounded to a whole number of CLE steps.
+
+        :param sim_seconds: The simulation time to run in seconds
+        :return: A dictionary summarizing the run, see run_steps
+        """
+        return self.run_steps(int(round(sim_seconds / self.timestep)))
+
     def shutdown(self):
         """
         Shuts down both simulations.
@@ -281,8 +405,11 @@ class DeterministicClosedLoopEngine(IClosedLoopControl):
                 self.stop_flag.clear()
                 self.stopped_flag.clear()
                 self.start_time = time.time()
+                self.pacer.start()
                 while not self.stop_flag.isSet():
-                    self.run_step(self.timestep)
+                    clk = cle.clock
+                    # a macro-step may advance the clock by several time steps
+                    self.pacer.wait(self.run_step(self.timestep) - clk, self.stop_flag)
                 self.__start_future.set_result(None)
             finally:
                 logger.info("Simulation loop ended")
@@ -335,6 +462,9 @@ class DeterministicClosedLoopEngine(IClosedLoopControl):
         self.elapsed_time = 0.0
         self._rca_elapsed_time = 0.0
         self._bca_elapsed_time = 0.0
+        self.step_timings.reset()
+        self.pacer.reset()
+        self._tick = 0
         logger.info("CLE reset")
 
     def reset_world(self, sdf_world_string=""):
@@ -370,6 +500,42 @@ class DeterministicClosedLoopEngine(IClosedLoopControl):
             self.load_brain(self.__network_file, *self.__network_configuration)
         logger.info("CLE Brain reset")
 
+    def checkpoint(self, filename=None):
+        """
+        Takes a snapshot of the simulation time, the transfer function state and, if the brain
+        simulator supports it, the neuron state variables. Restoring the snapshot is much faster
+        than reloading the brain, but it does not restore the world simulation, synaptic weights
+        or the time of the brain simulator, see CLECheckpoint.
+
+        :param filename: If specified, the checkpoint is also saved to this file
+        :return: The checkpoint
+        """
+        checkpoint = CLECheckpoint(cle.clock, self._tick, self.tfm.get_state(),
+                                   self.bca.get_state())
+        if filename is not None:
+            checkpoint.save(filename)
+        logger.info("CLE checkpoint taken at %f", checkpoint.clock)
+        return checkpoint
+
+    def restore(self, checkpoint):
+        """
+        Restores a snapshot taken with checkpoint (stops the simulation before restoring). Spikes
+        in flight are discarded, but the brain simulator keeps its own time, so device times are
+        offset from the CLE clock afterwards, see CLECheckpoint.
+
+        :param checkpoint: The checkpoint or the path of a file it has been saved to
+        """
+        if not isinstance(checkpoint, CLECheckpoint):
+            checkpoint = CLECheckpoint.load(checkpoint)
+        self.stop()
+        if checkpoint.brain is not None:
+            self.bca.set_state(checkpoint.brain)
+        self.tfm.set_state(checkpoint.transfer_functions)
+        cle.clock = checkpoint.clock
+        self._tick = checkpoint.tick
+        self.pacer.reset()
+        logger.info("CLE restored to checkpoint at %f", checkpoint.clock)
+
     @property
     def simulation_time(self):  # -> float64
         """
@@ -393,6 +559,31 @@ class DeterministicClosedLoopEngine(IClosedLoopControl):
             return self.elapsed_time + time.time() - self.start_time
         return self.elapsed_time
 
+    @property
+    def real_time_factor(self):
+        """
+        Gets the targeted ratio of simulation time to wall clock time, None if the simulation runs
+        as fast as possible
+        """
+        return self.pacer.real_time_factor
+
+    @real_time_factor.setter
+    def real_time_factor(self, value):
+        """
+        Sets the targeted ratio of simulation time to wall clock time
+
+        :param value: The real-time factor, None to run as fast as possible
+        """
+        self.pacer.real_time_factor = value
+
+    @property
+    def real_time_lag(self):  # -> float64
+        """
+        Gets how far the simulation is behind its real-time schedule in seconds, negative values
+        indicate that it is ahead. Always 0 if the simulation is not paced.
+        """
+        return self.pacer.lag
+
     @property
     def initial_robot_poses(self):
         """
@@ -435,6 +626,15 @@ class DeterministicClosedLoopEngine(IClosedLoopControl):
         """
         return self._rca_elapsed_time
 
+    def step_timing_statistics(self, window=None):
+        """
+        Gets the p50, p95, p99 and max wall clock time of each phase of the CLE steps
+
+        :param window: The number of most recent steps to consider, all recorded steps if None
+        :return: A dictionary indexed by phase name (see StepTimingRecorder.PHASES)
+        """
+        return self.step_timings.statistics(window)
+
     def wait_step(self, timeout=None):
         """
         Wait for the currently running simulation step to end.
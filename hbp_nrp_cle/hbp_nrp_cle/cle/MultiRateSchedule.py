@@ -0,0 +1,98 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Multi-rate scheduling of the components orchestrated by the CLE.
+"""
+
+__author__ = 'GeorgHinkel'
+
+
+class MultiRateSchedule(object):
+    """
+    Assigns each component of the closed loop its own period, given as a number of base ticks.
+    The base tick is the CLE time step. A component with a period of n ticks is called on every
+    n-th tick and then advances by n ticks at once, components that are not due are not called.
+    """
+
+    BRAIN = 'brain'
+    ROBOT = 'robot'
+    TRANSFER_FUNCTIONS = 'transfer_functions'
+    EXTERNAL_MODULES = 'external_modules'
+
+    def __init__(self, brain=1, robot=1, transfer_functions=1, external_modules=1):
+        """
+        Creates a new schedule
+
+        :param brain: The period of the brain simulation in ticks
+        :param robot: The period of the robot simulation in ticks
+        :param transfer_functions: The period of the transfer functions in ticks
+        :param external_modules: The period of the external modules in ticks
+        """
+        self.__periods = {}
+        for component, period in ((MultiRateSchedule.BRAIN, brain),
+                                  (MultiRateSchedule.ROBOT, robot),
+                                  (MultiRateSchedule.TRANSFER_FUNCTIONS, transfer_functions),
+                                  (MultiRateSchedule.EXTERNAL_MODULES, external_modules)):
+            if not isinstance(period, (int, long)) or period < 1:
+                raise ValueError("The period of the {0} must be a positive number of ticks"
+                                 .format(component))
+            self.__periods[component] = period
+
+    @staticmethod
+    def from_periods(tick, **periods):
+        """
+        Creates a schedule from periods given in seconds
+
+        :param tick: The base tick, i.e. the CLE time step, in seconds
+        :param periods: The periods in seconds indexed by component, components not specified
+         run on every tick
+        :return: A new schedule
+        """
+        ticks = {}
+        for component, period in periods.iteritems():
+            n = int(round(period / tick))
+            if n < 1 or abs(period / tick - n) > 1e-6:
+                raise ValueError("The period of the {0} is not a multiple of the CLE time step"
+                                 .format(component))
+            ticks[component] = n
+        return MultiRateSchedule(**ticks)
+
+    def period(self, component):
+        """
+        Gets the period of the given component
+
+        :param component: The component, e.g. MultiRateSchedule.BRAIN
+        :return: The period in ticks
+        """
+        return self.__periods[component]
+
+    def is_due(self, component, tick):
+        """
+        Determines whether the given component has to be called on the given tick
+
+        :param component: The component, e.g. MultiRateSchedule.BRAIN
+        :param tick: The index of the tick, starting from 0
+        :return: True, if the component is due, otherwise False
+        """
+        return tick % self.__periods[component] == 0
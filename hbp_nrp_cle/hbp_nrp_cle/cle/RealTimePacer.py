@@ -0,0 +1,160 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Deadline based pacing of the CLE main loop against the wall clock.
+"""
+
+import time
+
+__author__ = 'GeorgHinkel'
+
+
+class RealTimePacer(object):
+    """
+    Paces the simulation steps so that the simulation time advances at a target real-time factor.
+
+    Deadlines are absolute: the deadline of the n-th step after start is the start time plus
+    n times the wall clock duration of a step. Therefore, sleeping inaccuracies do not add up
+    and the loop does not drift. When a step misses its deadline, the CATCH_UP policy runs the
+    following steps without sleeping until the schedule is met again, while the SKIP policy
+    drops the missed deadlines and continues from the current time.
+    """
+
+    CATCH_UP = 'catch_up'
+    SKIP = 'skip'
+
+    def __init__(self, real_time_factor=None, policy=CATCH_UP):
+        """
+        Creates a new pacer
+
+        :param real_time_factor: The target ratio of simulation time to wall clock time, or None
+         to run as fast as possible
+        :param policy: The policy applied when a deadline is missed, CATCH_UP or SKIP
+        """
+        self.__real_time_factor = None
+        self.__policy = None
+        self.real_time_factor = real_time_factor
+        self.policy = policy
+        self.__deadline = None
+        self.__lag = 0.0
+        self.overruns = 0
+        self.skipped_deadlines = 0
+
+    @property
+    def real_time_factor(self):
+        """
+        Gets the target real-time factor, None if the simulation runs as fast as possible
+        """
+        return self.__real_time_factor
+
+    @real_time_factor.setter
+    def real_time_factor(self, value):
+        """
+        Sets the target real-time factor. The schedule is restarted from the current time.
+
+        :param value: The target ratio of simulation time to wall clock time, None or 0 to run
+         as fast as possible
+        """
+        if not value:
+            value = None
+        elif value < 0:
+            raise ValueError("The real-time factor must be positive")
+        self.__real_time_factor = value
+        self.__deadline = None
+
+    @property
+    def policy(self):
+        """
+        Gets the policy applied when a deadline is missed
+        """
+        return self.__policy
+
+    @policy.setter
+    def policy(self, value):
+        """
+        Sets the policy applied when a deadline is missed
+
+        :param value: CATCH_UP or SKIP
+        """
+        if value not in (RealTimePacer.CATCH_UP, RealTimePacer.SKIP):
+            raise ValueError("Unknown pacing policy {0}".format(value))
+        self.__policy = value
+
+    @property
+    def enabled(self):
+        """
+        Gets a value indicating whether the steps are paced at all
+        """
+        return self.__real_time_factor is not None
+
+    @property
+    def lag(self):
+        """
+        Gets how far the simulation was behind schedule at the end of the last step, in seconds
+        of wall clock time. Negative values indicate that the simulation was ahead of schedule.
+        """
+        return self.__lag
+
+    def start(self):
+        """
+        (Re-)Starts the schedule from the current time, e.g. when the simulation is resumed
+        """
+        self.__deadline = time.time()
+        self.__lag = 0.0
+
+    def reset(self):
+        """
+        Resets the schedule and the overrun counters
+        """
+        self.__deadline = None
+        self.__lag = 0.0
+        self.overruns = 0
+        self.skipped_deadlines = 0
+
+    def wait(self, timestep, interrupt=None):
+        """
+        Waits for the deadline of the step that just finished
+
+        :param timestep: The simulation time of the step in seconds
+        :param interrupt: An optional threading.Event that stops waiting when set
+        """
+        if self.__real_time_factor is None:
+            return
+        if self.__deadline is None:
+            self.start()
+        period = timestep / self.__real_time_factor
+        self.__deadline += period
+        now = time.time()
+        self.__lag = now - self.__deadline
+        if self.__lag <= 0.0:
+            if interrupt is None:
+                time.sleep(-self.__lag)
+            else:
+                interrupt.wait(-self.__lag)
+            return
+        self.overruns += 1
+        if self.__policy == RealTimePacer.SKIP:
+            missed = int(self.__lag / period)
+            self.skipped_deadlines += missed
+            self.__deadline += missed * period
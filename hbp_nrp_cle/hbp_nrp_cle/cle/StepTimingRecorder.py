@@ -0,0 +1,120 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Recording of the wall clock time spent in the phases of the CLE steps.
+"""
+
+import numpy as np
+
+__author__ = 'GeorgHinkel'
+
+
+class StepTimingRecorder(object):
+    """
+    Records the duration of the phases of each CLE step in a fixed-size ring buffer.
+
+    The buffer is preallocated, so recording a step does not allocate any memory and the
+    recorder can be kept on all the time.
+    """
+
+    PHASES = ('robot_wait', 'brain_run', 'brain_refresh', 'robot_refresh',
+              'transfer_functions', 'external_modules', 'total')
+
+    # default number of steps kept in the ring buffer
+    DEFAULT_CAPACITY = 4096
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        Creates a new step timing recorder
+
+        :param capacity: The number of steps kept in the ring buffer
+        """
+        if capacity <= 0:
+            raise ValueError("The capacity of the step timing recorder must be positive")
+        self.__timings = np.zeros((capacity, len(StepTimingRecorder.PHASES)))
+        self.__capacity = capacity
+        self.__next = 0
+        self.__count = 0
+
+    @property
+    def capacity(self):
+        """
+        Gets the number of steps kept in the ring buffer
+        """
+        return self.__capacity
+
+    @property
+    def count(self):
+        """
+        Gets the number of steps currently held in the ring buffer
+        """
+        return self.__count
+
+    def record(self, timings):
+        """
+        Records the phase durations of a step, overwriting the oldest step if the buffer is full
+
+        :param timings: A sequence of durations in seconds, ordered as PHASES
+        """
+        self.__timings[self.__next] = timings
+        self.__next = (self.__next + 1) % self.__capacity
+        if self.__count < self.__capacity:
+            self.__count += 1
+
+    def reset(self):
+        """
+        Discards all the recorded steps
+        """
+        self.__next = 0
+        self.__count = 0
+
+    def last(self, window=None):
+        """
+        Gets the phase durations of the most recent steps, oldest first
+
+        :param window: The maximum number of steps to return, all the recorded steps if None
+        :return: An array with one row per step and one column per phase
+        """
+        n = self.__count if window is None else max(0, min(window, self.__count))
+        indices = (np.arange(self.__next - n, self.__next)) % self.__capacity
+        return self.__timings[indices]
+
+    def statistics(self, window=None):
+        """
+        Computes the p50, p95, p99 and max duration of every phase over the most recent steps
+
+        :param window: The number of steps to consider, all the recorded steps if None
+        :return: A dictionary indexed by phase name, containing dictionaries with the keys
+         'p50', 'p95', 'p99' and 'max'. The dictionary is empty if no step was recorded.
+        """
+        timings = self.last(window)
+        if len(timings) == 0:
+            return {}
+        percentiles = np.percentile(timings, [50, 95, 99], axis=0)
+        maxima = timings.max(axis=0)
+        return dict((phase, {'p50': percentiles[0, i],
+                             'p95': percentiles[1, i],
+                             'p99': percentiles[2, i],
+                             'max': maxima[i]})
+                    for i, phase in enumerate(StepTimingRecorder.PHASES))
@@ -5,17 +5,22 @@ The CLE interface grants complete control over both the physic and the
 neural simulations. The two simulation can be started, advanced, paused and
 resetted in a synchronous manner.
 
-Two implementation of the CLE interface are given:
+Three implementations of the CLE interface are given:
 
-a.  ClosedLoopEngine is a fully parallel implementation in which the physics
-    simulation, the neural simulation and the transfer functions run in
-    separate threads. Currently, a bug in NEST makes it impossible to use
-    this implementation as running the neural simulation in a separate thread
-    causes a segmentation fault.
+a.  ClosedLoopEngine is a pipelined implementation in which the transfer
+    functions of a step run on a worker thread while the physics and the
+    neural simulation compute the same step. The transfer functions therefore
+    work on data that is at most one step old. The neural simulation stays on
+    the CLE thread, as running it in a separate thread makes NEST crash.
 
-b.  SerialClosedLoopEngine is an implementation that overcomes the NEST bug
-    by running the neural simulation and the transfer functions in the same
-    thread, obviously reducing the performances.
+b.  DeterministicClosedLoopEngine is an implementation that runs the
+    transfer functions sequentially after the physics and the neural
+    simulation, so that they always work on the state of the current step.
+
+c.  AsynchronousClosedLoopEngine is a loosely-coupled implementation in which
+    the physics and the neural simulation run freely within a window of
+    sync_interval steps and only meet at its end. Neither simulation may get
+    ahead of the other by more than max_drift seconds of simulation time.
 
 The ROSCLEServer module provides utility classes to run the Closed Loop
 Engine in a separate process, while communicating with it through ROS services.
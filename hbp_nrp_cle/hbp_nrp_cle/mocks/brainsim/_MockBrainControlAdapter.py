@@ -91,6 +91,22 @@ class MockBrainControlAdapter(IBrainControlAdapter):
         """
         pass
 
+    def get_state(self):
+        """
+        Gets a snapshot of the neuron state
+
+        :return: None, the mock does not support snapshots
+        """
+        return None
+
+    def set_state(self, state):
+        """
+        Restores the neuron state
+
+        :param state: The snapshot
+        """
+        pass
+
     def load_brain(self, brain_file, **populations):
         """
         Loads the neuronal network contained in the given file
@@ -68,6 +68,17 @@ class MockTransferFunctionManager(ITransferFunctionManager):
         """
         pass
 
+    def replace_tf(self, tf, new_tf, activation=True):
+        """
+        Replaces the definition of an initialized transfer function in place
+
+        :param tf: The initialized transfer function
+        :param new_tf: The freshly loaded transfer function
+        :param activation: boolean value of the desired activation state
+        :return: False, the mock never replaces transfer functions in place
+        """
+        return False
+
     def run_neuron_to_robot(self, t):
         """
         Runs the transfer function mocks for neuron to robot direction
@@ -132,6 +143,23 @@ class MockTransferFunctionManager(ITransferFunctionManager):
         """
         return []
 
+    def next_run_time(self):
+        """
+        Gets the earliest simulation time at which the mocked transfer functions run again
+
+        :return: 0.0, the mocked transfer functions run on every step
+        """
+        return 0.0
+
+    @property
+    def flawed(self):
+        """
+        Gets the list of faulty Transfer Functions of this mock
+
+        :return: An empty list
+        """
+        return []
+
     @property
     def sleep_time(self):
         """
@@ -154,6 +182,30 @@ class MockTransferFunctionManager(ITransferFunctionManager):
         """
         pass
 
+    def get_profiles(self):
+        """
+        Gets the profiles of the transfer functions
+
+        :return: An empty dictionary
+        """
+        return {}
+
+    def get_state(self):
+        """
+        Gets a snapshot of the state of the transfer functions
+
+        :return: An empty snapshot
+        """
+        return {}
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        pass
+
     def shutdown(self):
         """
         Shutdown the tf manager
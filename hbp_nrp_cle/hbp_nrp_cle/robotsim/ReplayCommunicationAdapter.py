@@ -0,0 +1,248 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Represents an implementation of the robot communication adapter that replays the robot inputs
+recorded by a RobotInputRecorder instead of communicating with a world simulation
+"""
+
+from hbp_nrp_cle.robotsim.RobotInterface import IRobotCommunicationAdapter, \
+    IRobotSubscribedTopic, IRobotPublishedTopic
+from hbp_nrp_cle.robotsim.RobotInputLog import read_robot_input_log
+from hbp_nrp_cle.tf_framework._TransferFunctionManager import TransferFunctionManager
+import logging
+
+logger = logging.getLogger(__name__)
+
+__author__ = 'GeorgHinkel'
+
+
+class ReplayCommunicationAdapter(IRobotCommunicationAdapter):
+    """
+    Represents a robot communication adapter that feeds the values of a robot input log back to
+    the subscribed topics, one step of the log per refresh of the buffers. Published values are
+    discarded.
+    """
+
+    def __init__(self, filename):
+        """
+        Creates a new replay communication adapter
+
+        :param filename: The path of the robot input log
+        """
+        super(ReplayCommunicationAdapter, self).__init__()
+        self.__filename = filename
+        self.__records = None
+        self.__pending = None
+        self.__step = 0
+        self.rewind()
+
+    @property
+    def step(self):
+        """
+        Gets the index of the next step to replay
+        """
+        return self.__step
+
+    def rewind(self):
+        """
+        Restarts the replay from the first step of the log
+        """
+        if self.__records is not None:
+            self.__records.close()
+        self.__records = read_robot_input_log(self.__filename)
+        self.__pending = next(self.__records, None)
+        self.__step = 0
+
+    def initialize(self, name):
+        """
+        Initializes this robot communication adapter
+
+        :param name: The name of this node
+        """
+        logger.info("Replaying robot inputs from %s", self.__filename)
+
+    def create_topic_publisher(self, topic, **config):
+        """
+        Creates a publisher object for the given topic
+
+        :param topic: The topic
+        :param config: Additional configuration for the publisher
+        :return: A publisher object
+        """
+        return ReplayPublishedTopic()
+
+    def create_topic_subscriber(self, topic, **config):
+        """
+        Creates the subscription object for the given topic
+
+        :param topic: The topic or its name
+        :param config: Additional configuration for the subscriber
+        :return: A subscription object
+        """
+        name = topic if isinstance(topic, str) else topic.name
+        return ReplaySubscribedTopic(name, config.get('initial_value', None))
+
+    def refresh_buffers(self, t):
+        """
+        Exposes the values recorded for the next step of the log
+
+        :param t: The simulation time
+        """
+        values = {}
+        while self.__pending is not None and self.__pending[0] <= self.__step:
+            values[self.__pending[1]] = self.__pending[2]
+            self.__pending = next(self.__records, None)
+        for subscriber in self.subscribed_topics:
+            subscriber.replay(values, t)
+        self.__step += 1
+
+    def shutdown(self):
+        """
+        Closes the robot input log
+        """
+        if self.__records is not None:
+            self.__records.close()
+            self.__records = None
+            self.__pending = None
+
+
+class ReplayPublishedTopic(IRobotPublishedTopic):
+    """
+    Represents a robot topic publisher that discards the messages sent to it
+    """
+
+    def __init__(self):
+        """
+        Creates a new replay publisher
+        """
+        self.__last_sent = None
+        self.__sent_count = 0
+
+    def send_message(self, value):
+        """
+        Discards the message
+
+        :param value: The message to be sent
+        """
+        self.__last_sent = value
+        self.__sent_count += 1
+
+    @property
+    def last_sent(self):
+        """
+        Gets the last message sent to this publisher
+        """
+        return self.__last_sent
+
+    @property
+    def sent_count(self):
+        """
+        Gets the number of messages sent to this publisher
+        """
+        return self.__sent_count
+
+    def _unregister(self):
+        """
+        Unregister the Topic. Meaningless for replay
+        """
+        pass
+
+
+class ReplaySubscribedTopic(IRobotSubscribedTopic):
+    """
+    Represents a robot topic subscriber whose values are replayed from a robot input log
+    """
+
+    def __init__(self, topic_name, initial_value):
+        """
+        Creates a new replay subscriber
+
+        :param topic_name: The name of the subscribed topic
+        :param initial_value: The initial value for the subscriber
+        """
+        self.__topic_name = topic_name
+        self.__value = initial_value
+        self.__changed = False
+        self.__tfs = []
+
+    @property
+    def topic_name(self):
+        """
+        Gets the name of the subscribed topic
+        """
+        return self.__topic_name
+
+    def register_tf_trigger(self, tf):
+        """
+        Registers to trigger the provided TF in case a new value appears
+
+        :param tf: The transfer function
+        """
+        if tf not in self.__tfs:
+            self.__tfs.append(tf)
+
+    def replay(self, values, t):
+        """
+        Exposes the value recorded for this topic, if any
+
+        :param values: A dictionary of the values recorded for the current step by topic name
+        :param t: The simulation time
+        """
+        self.__changed = self.__topic_name in values
+        if self.__changed:
+            self.__value = values[self.__topic_name]
+            for tf in self.__tfs:
+                TransferFunctionManager.run_tf(tf, t)
+
+    @property
+    def changed(self):
+        """
+        Indicates whether the current value of this subscriber has changed
+        since the last iteration
+        """
+        return self.__changed
+
+    @property
+    def value(self):
+        """
+        Gets the last value replayed for this subscribed topic
+        """
+        return self.__value
+
+    def reset(self, transfer_function_manager):
+        """
+        Gets a reset subscriber
+
+        :param transfer_function_manager: The transfer function manager in which the subscribed
+         topic is contained
+        """
+        self.__changed = False
+        self.__value = None
+        return self
+
+    def _unregister(self):
+        """
+        Detaches the subscribed topic from the replay, meaningless for replay
+        """
+        pass
@@ -0,0 +1,149 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Represents an implementation of the robot control adapter that does not run any world simulation
+and is used together with the ReplayCommunicationAdapter
+"""
+
+from hbp_nrp_cle.robotsim.RobotInterface import IRobotControlAdapter
+from concurrent.futures import Future
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+__author__ = 'GeorgHinkel'
+
+
+class ReplayControlAdapter(IRobotControlAdapter):
+    """
+    Represents a robot control adapter that only advances the simulation time. The robot inputs
+    are provided by a ReplayCommunicationAdapter, which is rewound when the world is reset.
+    """
+
+    def __init__(self, communication_adapter=None, time_step=0.001):
+        """
+        Creates a new replay control adapter
+
+        :param communication_adapter: The ReplayCommunicationAdapter to rewind on reset (Optional)
+        :param time_step: The physics simulation time step in seconds
+        """
+        self.__communication_adapter = communication_adapter
+        self.__time_step = time_step
+        self.__sim_time = 0.0
+
+    def initialize(self):
+        """
+        Initializes the world simulation control adapter
+        """
+        logger.info("Replay control adapter initialized")
+
+    @property
+    def time_step(self):
+        """
+        Gets the physics simulation time step in seconds
+
+        :return: The physics simulation time step in seconds
+        """
+        return self.__time_step
+
+    def set_time_step(self, time_step):
+        """
+        Sets the physics simulation time step in seconds
+
+        :param time_step: The physics simulation time step in seconds
+        :return: True, the time step is always updated
+        """
+        self.__time_step = time_step
+        return True
+
+    @property
+    def is_paused(self):
+        """
+        Queries the current status of the physics simulation
+
+        :return: Always True, as the physics simulation only advances with run_step
+        """
+        return True
+
+    @property
+    def is_alive(self):
+        """
+        Queries the current status of the world simulation
+
+        :return: Always True
+        """
+        return True
+
+    def run_step(self, dt):
+        """
+        Advances the simulation time by the given CLE time step in seconds
+
+        :param dt: The CLE time step in seconds
+        :return: Updated simulation time
+        """
+        self.__sim_time += dt
+        return self.__sim_time
+
+    def run_step_async(self, dt):
+        """
+        Advances the simulation time by the given CLE time step in seconds
+
+        :param dt: The CLE time step in seconds
+        :return: a completed Future for the updated simulation time
+        """
+        future = Future()
+        future.start = time.time()
+        future.set_result(self.run_step(dt))
+        future.end = time.time()
+        return future
+
+    def set_robots(self, robots):
+        """
+        Sets the list of robots, meaningless for replay
+        """
+        pass
+
+    def shutdown(self):
+        """
+        Shuts down the world simulation
+        """
+        pass
+
+    def reset(self):
+        """
+        Resets the simulation time and rewinds the replayed robot inputs
+        """
+        self.__sim_time = 0.0
+        if self.__communication_adapter is not None:
+            self.__communication_adapter.rewind()
+
+    def reset_world(self, models, lights):
+        """
+        Resets the world excluding the robot, meaningless for replay
+
+        :param models: A dictionary containing pairs model_name: model_sdf.
+        :param lights: A dictionary containing pairs light_name: light sdf.
+        """
+        pass
@@ -0,0 +1,150 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains the binary log of robot inputs that allows to replay the values the
+subscribed topics had at each CLE step boundary without running the world simulation.
+
+The log starts with a magic header followed by one record per topic value. Each record consists
+of a fixed size header (step index, encoding, length of the topic name, length of the message
+type and length of the payload), the topic name, the message type and the payload. ROS messages
+are stored in their ROS serialization, any other value is pickled.
+"""
+
+__author__ = 'GeorgHinkel'
+
+import struct
+import importlib
+import cPickle as pickle
+from cStringIO import StringIO
+
+LOG_HEADER = 'NRPRIL\x01\n'
+RECORD_HEADER = struct.Struct('<IBHHI')
+
+ENCODING_ROS = 0
+ENCODING_PICKLE = 1
+
+
+def _is_ros_message(value):
+    """
+    Determines whether the given value is a ROS message
+
+    :param value: The value
+    """
+    return hasattr(value, '_type') and hasattr(value, 'serialize') and \
+        hasattr(value, 'deserialize')
+
+
+class RobotInputRecorder(object):
+    """
+    Writes the values of subscribed topics seen at each step boundary to a binary log
+    """
+
+    def __init__(self, filename):
+        """
+        Creates a new recorder writing to the given file
+
+        :param filename: The path of the log file
+        """
+        self.__file = open(filename, 'wb')
+        self.__file.write(LOG_HEADER)
+        self.__step = 0
+        self.__buffer = StringIO()
+
+    @property
+    def step(self):
+        """
+        Gets the index of the step currently recorded
+        """
+        return self.__step
+
+    def record(self, topic_name, value):
+        """
+        Records the value of a subscribed topic for the current step
+
+        :param topic_name: The name of the topic
+        :param value: The value of the subscribed topic
+        """
+        if _is_ros_message(value):
+            encoding = ENCODING_ROS
+            message_type = value._type  # pylint: disable=protected-access
+            buff = self.__buffer
+            buff.seek(0)
+            buff.truncate()
+            value.serialize(buff)
+            payload = buff.getvalue()
+        else:
+            encoding = ENCODING_PICKLE
+            message_type = ''
+            payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        topic_name = str(topic_name)
+        self.__file.write(RECORD_HEADER.pack(self.__step, encoding, len(topic_name),
+                                             len(message_type), len(payload)))
+        self.__file.write(topic_name)
+        self.__file.write(message_type)
+        self.__file.write(payload)
+
+    def next_step(self):
+        """
+        Completes the current step
+        """
+        self.__step += 1
+
+    def close(self):
+        """
+        Flushes and closes the log
+        """
+        if not self.__file.closed:
+            self.__file.close()
+
+
+def read_robot_input_log(filename):
+    """
+    Reads a log written by a RobotInputRecorder
+
+    :param filename: The path of the log file
+    :return: A generator of tuples (step index, topic name, value) in the order of recording
+    """
+    message_types = {}
+    with open(filename, 'rb') as log:
+        if log.read(len(LOG_HEADER)) != LOG_HEADER:
+            raise ValueError("The file {0} is not a robot input log".format(filename))
+        while True:
+            header = log.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            step, encoding, name_length, type_length, payload_length = \
+                RECORD_HEADER.unpack(header)
+            topic_name = log.read(name_length)
+            message_type = log.read(type_length)
+            payload = log.read(payload_length)
+            if encoding == ENCODING_ROS:
+                message_class = message_types.get(message_type)
+                if message_class is None:
+                    package, name = message_type.split('/')
+                    message_class = getattr(importlib.import_module(package + '.msg'), name)
+                    message_types[message_type] = message_class
+                value = message_class().deserialize(payload)
+            else:
+                value = pickle.loads(payload)
+            yield step, topic_name, value
@@ -173,6 +173,25 @@ class IRobotCommunicationAdapter(object):  # pragma: no cover
     def __init__(self):  # -> None:
         self.__published_topics = []
         self.__subscribed_topics = []
+        self.__double_buffered = False
+
+    @property
+    def double_buffered(self):  # -> bool:
+        """
+        Gets a value indicating whether subscribed topics are double-buffered, i.e. values
+        received from the robot only become visible when the buffers are refreshed
+        """
+        return self.__double_buffered
+
+    @double_buffered.setter
+    def double_buffered(self, value):  # -> None:
+        """
+        Sets whether subscribed topics are double-buffered. This only affects topics
+        registered afterwards.
+
+        :param value: True to enable double-buffering, otherwise False
+        """
+        self.__double_buffered = bool(value)
 
     @property
     def published_topics(self):  # -> list:
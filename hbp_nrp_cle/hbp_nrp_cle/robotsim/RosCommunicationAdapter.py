@@ -29,9 +29,11 @@ using ROS
 from hbp_nrp_cle.robotsim.RobotInterface import IRobotCommunicationAdapter, \
     Topic, PreprocessedTopic, IRobotSubscribedTopic, IRobotPublishedTopic
 from hbp_nrp_cle.tf_framework._TransferFunctionManager import TransferFunctionManager
+from hbp_nrp_cle.tf_framework import TFRunningException
 import rosgraph_msgs.msg
 import rospy
 import logging
+import threading
 import rosgraph.masterapi as master
 
 logger = logging.getLogger(__name__)
@@ -49,6 +51,13 @@ DEFAULT_SUB_QUEUE_SIZE = 1
 # Queue size for publisher topics.
 DEFAULT_PUB_QUEUE_SIZE = 10
 
+# Trigger policies of subscribed topics. Immediate triggers run the TFs in the ROS callback
+# thread, the other policies queue the received values until the next refresh of the buffers.
+# A positive integer N queues at most the N latest values.
+TRIGGER_IMMEDIATE = 'immediate'
+TRIGGER_LATEST = 'latest'
+TRIGGER_EVERY = 'every'
+
 
 class RosCommunicationAdapter(IRobotCommunicationAdapter):
     """
@@ -88,6 +97,71 @@ class RosCommunicationAdapter(IRobotCommunicationAdapter):
         self.__topic_types = []
         self.__refresh_topic_types()
         self.__clock_listener = None
+        self.__input_recorder = None
+        self.__recording_started = False
+        self.__trigger_policy = TRIGGER_IMMEDIATE
+
+    @property
+    def trigger_policy(self):
+        """
+        Gets the default trigger policy of subscribed topics
+        """
+        return self.__trigger_policy
+
+    @trigger_policy.setter
+    def trigger_policy(self, policy):
+        """
+        Sets the default trigger policy of subscribed topics. This only affects topics
+        registered afterwards.
+
+        :param policy: TRIGGER_IMMEDIATE, TRIGGER_LATEST, TRIGGER_EVERY or the maximum number of
+         triggers per step
+        """
+        self.__trigger_policy = policy
+
+    @property
+    def trigger_statistics(self):
+        """
+        Gets the trigger statistics of the subscribed topics
+
+        :return: A dictionary mapping topic names to dictionaries with the number of 'received',
+         'dispatched' and 'dropped' triggers
+        """
+        return dict((subscriber.topic_name, {'received': subscriber.trigger_count,
+                                             'dispatched': subscriber.dispatched_triggers,
+                                             'dropped': subscriber.dropped_triggers})
+                    for subscriber in self.subscribed_topics
+                    if isinstance(subscriber, RosSubscribedTopic))
+
+    @property
+    def input_recorder(self):
+        """
+        Gets the RobotInputRecorder that logs the values of the subscribed topics at every step
+        boundary, None if the inputs are not recorded
+        """
+        return self.__input_recorder
+
+    @input_recorder.setter
+    def input_recorder(self, recorder):
+        """
+        Sets the RobotInputRecorder that logs the values of the subscribed topics at every step
+        boundary
+
+        :param recorder: The recorder, or None to stop recording
+        """
+        self.__input_recorder = recorder
+        self.__recording_started = False
+
+    def __record_consumed_inputs(self):
+        """
+        Records the changed values of the subscribers that are not double-buffered. These values
+        have already been read by the transfer functions of the step that just ended, so they are
+        recorded for that step.
+        """
+        recorder = self.__input_recorder
+        for subscriber in self.subscribed_topics:
+            if not subscriber.double_buffered and subscriber.changed:
+                recorder.record(subscriber.topic_name, subscriber.value)
 
     def __refresh_topic_types(self):
         """
@@ -154,6 +228,8 @@ class RosCommunicationAdapter(IRobotCommunicationAdapter):
 
         :return: A subscription object
         """
+        config.setdefault('double_buffered', self.double_buffered)
+        config.setdefault('trigger_policy', self.__trigger_policy)
         if isinstance(topic, PreprocessedTopic):
             return RosSubscribedPreprocessedTopic(topic,
                                                   config.get('initial_value', None),
@@ -177,12 +253,30 @@ class RosCommunicationAdapter(IRobotCommunicationAdapter):
 
     def refresh_buffers(self, t):
         """
-        Resets the changed bit for all subscribers
+        Resets the changed bit for all subscribers. Double-buffered subscribers additionally
+        expose the last value received since the previous refresh. If an input recorder is set,
+        the values that changed are recorded for the step whose transfer functions see them
+        first: values of double-buffered subscribers for the step starting now, values of the
+        other subscribers for the step that just ended. Afterwards, the transfer functions
+        triggered by queued subscriber values are run.
 
         :param t: The world simulation time in milliseconds
         """
+        recorder = self.__input_recorder
+        if recorder is not None:
+            self.__record_consumed_inputs()
+            if self.__recording_started:
+                recorder.next_step()
+            self.__recording_started = True
         for subscriber in self.subscribed_topics:
-            subscriber.reset_changed()
+            if subscriber.double_buffered:
+                subscriber.swap_buffers()
+                if recorder is not None and subscriber.changed:
+                    recorder.record(subscriber.topic_name, subscriber.value)
+            else:
+                subscriber.reset_changed()
+        for subscriber in self.subscribed_topics:
+            subscriber.dispatch_triggers(t)
 
     def shutdown(self):
         """
@@ -192,6 +286,15 @@ class RosCommunicationAdapter(IRobotCommunicationAdapter):
             publisher._unregister()  # pylint: disable=protected-access
         for subscriber in self.subscribed_topics:
             subscriber._unregister()  # pylint: disable=protected-access
+            if subscriber.dropped_triggers:
+                logger.info("Dropped %d of %d triggers received on topic %s",
+                            subscriber.dropped_triggers, subscriber.trigger_count,
+                            subscriber.topic_name)
+        if self.__input_recorder is not None:
+            if self.__recording_started:
+                self.__record_consumed_inputs()
+            self.__input_recorder.close()
+            self.__input_recorder = None
 
 
 class RosPublishedTopic(IRobotPublishedTopic):
@@ -276,11 +379,31 @@ class RosSubscribedTopic(IRobotSubscribedTopic):
         :param config: Additional configuration for the subscriber
         :param **queue_size: ROS Subscriber queue_size parameter, please refer to ROS documentation
         :param **buff_size: ROS Subscriber buff_size parameter, please refer to ROS documentation
-        """
+        :param **double_buffered: If set, received values only become visible after a call to
+         swap_buffers
+        :param **trigger_policy: TRIGGER_IMMEDIATE to run triggered TFs in the ROS callback,
+         TRIGGER_LATEST to run them once per step for the latest value, TRIGGER_EVERY to run them
+         for every value received or a positive integer N to run them for the N latest values
+        """
+        policy = config.get('trigger_policy', TRIGGER_IMMEDIATE)
+        if policy not in (TRIGGER_IMMEDIATE, TRIGGER_LATEST, TRIGGER_EVERY) and \
+                not (isinstance(policy, int) and policy > 0):
+            raise ValueError("Invalid trigger policy {0}".format(policy))
+        self.__trigger_policy = policy
+        self.__pending = []
+        self.__pending_lock = threading.Lock()
+        self.__trigger_count = 0
+        self.__dispatched_triggers = 0
+        self.__dropped_triggers = 0
+        self.__dispatched = None
         self.__changed = False
         self.__value = initial_value
+        self.__double_buffered = config.get('double_buffered', False)
+        self.__received = initial_value
+        self.__received_changed = False
         self.__tfs = []
         assert isinstance(topic, Topic)
+        self.__topic_name = topic.name
         self.__subscriber = rospy.Subscriber(topic.name, topic.topic_type,
                                              self._callback,
                                              queue_size=config.get('queue_size',
@@ -306,11 +429,84 @@ class RosSubscribedTopic(IRobotSubscribedTopic):
         :param data: The incoming data on this topic
         """
         logger.debug("ROS subscriber callback")
-        self.__changed = True
-        self.__value = data
-        t = sim_time
-        for tf in self.__tfs:
-            TransferFunctionManager.run_tf(tf, t)
+        if self.__double_buffered:
+            self.__received = data
+            self.__received_changed = True
+        else:
+            self.__changed = True
+            self.__value = data
+        if not self.__tfs:
+            return
+        self.__trigger_count += 1
+        policy = self.__trigger_policy
+        if policy == TRIGGER_IMMEDIATE:
+            self.__dispatched_triggers += 1
+            t = sim_time
+            for tf in self.__tfs:
+                TransferFunctionManager.run_tf(tf, t)
+            return
+        with self.__pending_lock:
+            if policy == TRIGGER_LATEST:
+                self.__dropped_triggers += len(self.__pending)
+                self.__pending = [data]
+            else:
+                self.__pending.append(data)
+                if policy != TRIGGER_EVERY and len(self.__pending) > policy:
+                    del self.__pending[0]
+                    self.__dropped_triggers += 1
+
+    def dispatch_triggers(self, t):
+        """
+        Runs the triggered transfer functions for the values queued since the last dispatch.
+        While they run, the subscriber exposes the queued value as a changed value. The value and
+        the changed status received from ROS are left untouched.
+
+        :param t: The simulation time
+        """
+        if not self.__pending:
+            return
+        with self.__pending_lock:
+            values = self.__pending
+            self.__pending = []
+        try:
+            for value in values:
+                self.__dispatched = (value,)
+                for tf in self.__tfs:
+                    try:
+                        TransferFunctionManager.run_triggered_tf(tf, t)
+                    except TFRunningException:
+                        logger.error("Triggered transfer function %s failed", tf.name)
+        finally:
+            self.__dispatched = None
+        self.__dispatched_triggers += len(values)
+
+    @property
+    def trigger_policy(self):
+        """
+        Gets the trigger policy of this subscriber
+        """
+        return self.__trigger_policy
+
+    @property
+    def trigger_count(self):
+        """
+        Gets the number of values received that triggered transfer functions
+        """
+        return self.__trigger_count
+
+    @property
+    def dispatched_triggers(self):
+        """
+        Gets the number of values for which the triggered transfer functions have been run
+        """
+        return self.__dispatched_triggers
+
+    @property
+    def dropped_triggers(self):
+        """
+        Gets the number of triggers dropped due to the trigger policy
+        """
+        return self.__dropped_triggers
 
     @property
     def changed(self):
@@ -318,7 +514,7 @@ class RosSubscribedTopic(IRobotSubscribedTopic):
         Indicates whether the current value of this subscriber has changed
         since the last iteration
         """
-        return self.__changed
+        return self.__dispatched is not None or self.__changed
 
     def reset_changed(self):
         """
@@ -326,12 +522,37 @@ class RosSubscribedTopic(IRobotSubscribedTopic):
         """
         self.__changed = False
 
+    @property
+    def topic_name(self):
+        """
+        Gets the name of the subscribed topic
+        """
+        return self.__topic_name
+
+    @property
+    def double_buffered(self):
+        """
+        Indicates whether received values are only exposed when swapping the buffers
+        """
+        return self.__double_buffered
+
+    def swap_buffers(self):
+        """
+        Exposes the last value received since the previous swap. The changed status reflects
+        whether any value has been received in the meantime.
+        """
+        self.__changed = self.__received_changed
+        self.__received_changed = False
+        self.__value = self.__received
+
     @property
     def value(self):
         """
-        Gets the last value received by this ROS subscribed topic
+        Gets the last value received by this ROS subscribed topic, or the queued value the
+        triggered transfer functions are currently run for
         """
-        return self.__value
+        dispatched = self.__dispatched
+        return dispatched[0] if dispatched is not None else self.__value
 
     def reset(self, transfer_function_manager):
         """
@@ -342,6 +563,10 @@ class RosSubscribedTopic(IRobotSubscribedTopic):
         """
         self.reset_changed()
         self.__value = None
+        self.__received = None
+        self.__received_changed = False
+        with self.__pending_lock:
+            self.__pending = []
         return self
 
     def _unregister(self):
@@ -0,0 +1,109 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Tests the buffering of the accesses of transfer functions to brain devices
+"""
+
+from hbp_nrp_cle.brainsim.common.devices import BufferedDevice, DeviceGroup
+from hbp_nrp_cle.brainsim.BrainInterface import IPoissonSpikeGenerator
+from hbp_nrp_cle.mocks.brainsim import MockBrainCommunicationAdapter
+from hbp_nrp_cle.mocks.brainsim.__devices.MockSpikeGenerator import MockPoissonSpikeGenerator
+import numpy
+import unittest
+from mock import Mock
+
+__author__ = 'GeorgHinkel'
+
+
+class TestBufferedDevice(unittest.TestCase):
+
+    def test_writes_are_applied_on_flush(self):
+        generator = MockPoissonSpikeGenerator()
+        buffered = BufferedDevice(generator)
+        buffered.rate = 42.0
+        buffered.rate = 43.0
+        self.assertEqual(43.0, buffered.rate)
+        self.assertEqual(1.0, generator.rate)
+        self.assertEqual(2, buffered.pending)
+        buffered.flush()
+        self.assertEqual(43.0, generator.rate)
+        self.assertEqual([42.0, 43.0], generator.history)
+        self.assertEqual(0, buffered.pending)
+        self.assertEqual(43.0, buffered.rate)
+
+    def test_reads_do_not_access_the_device(self):
+        generator = Mock(state_properties=('rate',), rate=5.0)
+        buffered = BufferedDevice(generator)
+        generator.rate = 7.0
+        self.assertEqual(5.0, buffered.rate)
+        buffered.rate = 3.0
+        buffered.flush()
+        self.assertEqual(3.0, buffered.rate)
+
+    def test_device_group_selections(self):
+        group = DeviceGroup(MockPoissonSpikeGenerator,
+                            [MockPoissonSpikeGenerator() for _ in range(4)])
+        buffered = BufferedDevice(group)
+        self.assertEqual(4, len(buffered))
+        buffered[1].rate = 10.0
+        buffered[2:4].rate = [20.0, 30.0]
+        self.assertEqual(10.0, buffered[1].rate)
+        self.assertEqual(20.0, buffered[2].rate)
+        self.assertTrue(numpy.array_equal([1.0, 10.0, 20.0, 30.0], buffered.rate))
+        self.assertEqual([1.0] * 4, group.rate)
+        buffered.flush()
+        self.assertEqual([1.0, 10.0, 20.0, 30.0], group.rate)
+        buffered.rate = 5.0
+        self.assertEqual(5.0, buffered[3].rate)
+        buffered.flush()
+        self.assertEqual([5.0] * 4, group.rate)
+
+    def test_reset_discards_pending_writes(self):
+        generator = MockPoissonSpikeGenerator()
+        buffered = BufferedDevice(generator)
+        buffered.rate = 42.0
+        self.assertIs(buffered, buffered.reset(Mock()))
+        self.assertEqual(0, buffered.pending)
+        self.assertEqual(1.0, buffered.rate)
+        buffered.set_state({'active': True, 'rate': 12.0})
+        self.assertEqual(12.0, buffered.rate)
+
+    def test_adapter_buffers_generators(self):
+        adapter = MockBrainCommunicationAdapter()
+        adapter.double_buffered = True
+        device = adapter.register_spike_source(Mock(), IPoissonSpikeGenerator)
+        self.assertIsInstance(device, BufferedDevice)
+        device.spec = 'spec'
+        self.assertEqual('spec', device.spec)
+        self.assertEqual(0, device.pending)
+        device.rate = 42.0
+        self.assertEqual(1.0, device.device.rate)
+        adapter.flush_buffers()
+        self.assertEqual(42.0, device.device.rate)
+        adapter.unregister_spike_source(device)
+        self.assertEqual([], adapter.generator_devices)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Unit tests for the snapshots of the NEST neuron state
+"""
+
+from hbp_nrp_cle.brainsim.common.NestNeuronState import get_nest_neuron_state, \
+    set_nest_neuron_state
+
+import unittest
+from mock import Mock
+
+__author__ = 'Georg Hinkel'
+
+
+class TestNestNeuronState(unittest.TestCase):
+
+    def setUp(self):
+        self.nest = Mock()
+        self.nest.GetStatus.return_value = [
+            {'recordables': ('V_m', 'g_ex'), 'V_m': -65.0, 'g_ex': 0.5, 'C_m': 250.0},
+            {'recordables': ('V_m', 'I_syn'), 'V_m': -70.0, 'C_m': 250.0}
+        ]
+
+    def test_get_state(self):
+        state = get_nest_neuron_state(self.nest, [2, 1, 2])
+        self.nest.GetStatus.assert_called_once_with([1L, 2L])
+        self.assertDictEqual(state, {1L: {'V_m': -65.0, 'g_ex': 0.5},
+                                     2L: {'V_m': -70.0}})
+
+    def test_get_state_empty(self):
+        self.assertDictEqual(get_nest_neuron_state(self.nest, []), {})
+        self.assertFalse(self.nest.GetStatus.called)
+
+    def test_set_state(self):
+        set_nest_neuron_state(self.nest, {2L: {'V_m': -70.0}, 1L: {'V_m': -65.0}})
+        self.nest.SetStatus.assert_called_once_with([1L, 2L], [{'V_m': -65.0}, {'V_m': -70.0}])
+        # the spikes in flight are discarded before the neurons are restored
+        self.assertEqual(['ResetNetwork', 'SetStatus'],
+                         [name for name, _, _ in self.nest.method_calls])
+
+    def test_set_state_read_only_variable(self):
+        def set_status(gids, values):
+            if len(gids) > 1 or 'g_ex' in values:
+                raise Exception("read only")
+
+        self.nest.SetStatus.side_effect = set_status
+        set_nest_neuron_state(self.nest, {1L: {'V_m': -65.0, 'g_ex': 0.5}, 2L: {'V_m': -70.0}})
+        self.nest.SetStatus.assert_any_call([1L], {'V_m': -65.0})
+        self.nest.SetStatus.assert_any_call([2L], {'V_m': -70.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
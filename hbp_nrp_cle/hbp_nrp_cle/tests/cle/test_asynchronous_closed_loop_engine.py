@@ -0,0 +1,134 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+AsynchronousClosedLoopEngine unit test
+"""
+
+from hbp_nrp_cle.cle.AsynchronousClosedLoopEngine import AsynchronousClosedLoopEngine
+from hbp_nrp_cle.cle.CLEInterface import ForcedStopException
+from hbp_nrp_cle.mocks.robotsim import MockRobotControlAdapter, MockRobotCommunicationAdapter
+from hbp_nrp_cle.mocks.brainsim import MockBrainControlAdapter, MockBrainCommunicationAdapter
+from hbp_nrp_cle.mocks.tf_framework import MockTransferFunctionManager
+from concurrent.futures import Future
+
+import unittest
+import threading
+from mock import Mock, patch, MagicMock
+
+
+class TestAsynchronousClosedLoopEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.rca = MockRobotControlAdapter()
+        self.bca = MockBrainControlAdapter()
+        self.tfm = MockTransferFunctionManager()
+        self.tfm.run_tfs = Mock()
+        self.ema = MagicMock()
+
+        patcher = patch('hbp_nrp_cle.robotsim.GazeboHelper.rospy')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cle = AsynchronousClosedLoopEngine(self.rca, MockRobotCommunicationAdapter(),
+                                                self.bca, MockBrainCommunicationAdapter(),
+                                                self.tfm, self.ema, 0.01,
+                                                sync_interval=5, max_drift=0.02)
+        self.cle.initialize("foo")
+        self.addCleanup(self.cle.shutdown)
+
+    def test_invalid_sync_interval(self):
+        self.assertRaises(ValueError, AsynchronousClosedLoopEngine, self.rca, None, self.bca,
+                          None, self.tfm, self.ema, 0.01, sync_interval=0)
+
+    def test_run_step_runs_window(self):
+        self.rca.run_step_async = Mock(wraps=self.rca.run_step_async)
+        self.bca.run_step = Mock()
+        self.assertAlmostEqual(self.cle.run_step(0.01), 0.05)
+        self.assertEqual(self.rca.run_step_async.call_count, 5)
+        self.assertEqual(self.bca.run_step.call_count, 5)
+        self.assertEqual(self.tfm.run_tfs.call_count, 5)
+        self.assertEqual(self.cle.synchronizations, 1)
+        self.assertEqual(self.cle.drift, 0.0)
+        self.assertLessEqual(self.cle.max_observed_drift, 0.02 + 1e-9)
+        self.assertEqual(self.cle.step_timings.count, 5)
+
+    def test_drift_is_bounded(self):
+        robot_futures = []
+
+        def slow_robot(dt):
+            f = Future()
+            f.start, f.end = 0, 0
+            robot_futures.append(f)
+            threading.Timer(0.05, f.set_result, [None]).start()
+            return f
+
+        self.rca.run_step_async = slow_robot
+        self.cle.run_step(0.01)
+        self.assertGreater(self.cle.drift_waits, 0)
+        self.assertLessEqual(self.cle.max_observed_drift, 0.02 + 1e-9)
+        self.assertEqual(len(robot_futures), 5)
+
+    def test_run_steps_respects_horizon(self):
+        summary = self.cle.run_steps(7)
+        self.assertEqual(summary['steps'], 7)
+        self.assertAlmostEqual(self.cle.simulation_time, 0.07)
+        self.assertEqual(self.cle.synchronizations, 2)
+
+    def test_forced_stop_aborts_window(self):
+        def failing_robot(dt):
+            f = Future()
+            f.set_exception(ForcedStopException())
+            return f
+
+        self.rca.run_step_async = failing_robot
+        self.cle.run_step(0.01)
+        self.assertLessEqual(self.cle.simulation_time, 0.02 + 1e-9)
+
+    def test_robot_error_aborts_window(self):
+        calls = []
+
+        def failing_robot(dt):
+            calls.append(dt)
+            if len(calls) == 2:
+                raise Exception("service unavailable")
+            f = Future()
+            f.start, f.end = 0, 0
+            f.set_result(None)
+            return f
+
+        self.rca.run_step_async = failing_robot
+        self.assertRaises(Exception, self.cle.run_step, 0.01)
+        self.assertLessEqual(self.cle.simulation_time, 0.03 + 1e-9)
+        self.assertEqual(len(calls), 2)
+
+    def test_reset(self):
+        self.cle.run_step(0.01)
+        self.cle.reset()
+        self.assertEqual(self.cle.synchronizations, 0)
+        self.assertEqual(self.cle.max_observed_drift, 0.0)
+        self.assertEqual(self.cle.simulation_time, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,15 +27,23 @@ CLE unit test
 
 from hbp_nrp_cle.cle.DeterministicClosedLoopEngine import DeterministicClosedLoopEngine
 from hbp_nrp_cle.cle.ClosedLoopEngine import ClosedLoopEngine
+from hbp_nrp_cle.cle.MultiRateSchedule import MultiRateSchedule
 from hbp_nrp_cle.mocks.robotsim import MockRobotControlAdapter, MockRobotCommunicationAdapter
 from hbp_nrp_cle.mocks.brainsim import MockBrainControlAdapter, MockBrainCommunicationAdapter
 from hbp_nrp_cle.mocks.tf_framework import MockTransferFunctionManager
 from geometry_msgs.msg import Point, Pose, Quaternion
+from hbp_nrp_cle.brainsim.BrainInterface import IPoissonSpikeGenerator
+from hbp_nrp_cle.robotsim.RobotInterface import Topic
+from hbp_nrp_cle.tf_framework import config
+import hbp_nrp_cle.tf_framework as nrp
 from concurrent.futures import Future
 
 import unittest
+import threading
 import time
-from mock import Mock, patch, MagicMock
+import tempfile
+import os
+from mock import Mock, patch, MagicMock, PropertyMock
 
 
 # all the methods are inherited from unittest.TestCase
@@ -61,7 +69,9 @@ class TestDeterministicClosedLoopEngine(unittest.TestCase):
         self.mock_wait_for_service = patch('hbp_nrp_cle.robotsim.GazeboHelper.rospy.wait_for_service').start()
         self.mock_service_proxy = patch('hbp_nrp_cle.robotsim.GazeboHelper.rospy.ServiceProxy').start()
 
-        self.__cle = self.CLE_Class(rca, rcm, self.__bca, bcm, self.__tfm, 0.01)
+        self.__ema = MagicMock()
+
+        self.__cle = self.CLE_Class(rca, rcm, self.__bca, bcm, self.__tfm, self.__ema, 0.01)
 
     def tearDown(self):
         self.mock_wait_for_service.stop()
@@ -72,6 +82,68 @@ class TestDeterministicClosedLoopEngine(unittest.TestCase):
         self.assertTrue(self.__cle.is_initialized)
         self.assertEqual(self.__cle.run_step(0.01), 0.01)
 
+    def test_step_timing_statistics(self):
+        self.__cle.initialize("foo")
+        self.__cle.run_step(0.01)
+        self.__cle.run_step(0.01)
+        self.assertEqual(self.__cle.step_timings.count, 2)
+        stats = self.__cle.step_timing_statistics()
+        self.assertGreaterEqual(stats['total']['max'], stats['brain_run']['max'])
+        self.__cle.reset()
+        self.assertEqual(self.__cle.step_timing_statistics(), {})
+
+    def test_run_step_multi_rate(self):
+        self.__cle.initialize("foo")
+        self.__cle.schedule = MultiRateSchedule(brain=4, robot=1, transfer_functions=2,
+                                                external_modules=10)
+        self.__cle.rca.run_step_async = Mock(wraps=self.__cle.rca.run_step_async)
+        self.__bca.run_step = Mock()
+        self.__tfm.run_tfs = Mock()
+        for _ in range(8):
+            self.__cle.run_step(0.01)
+        self.assertAlmostEqual(self.__cle.simulation_time, 0.08)
+        self.assertEqual(self.__cle.rca.run_step_async.call_count, 8)
+        self.assertEqual(self.__bca.run_step.call_count, 2)
+        self.assertAlmostEqual(self.__bca.run_step.call_args[0][0], 40.0)
+        self.assertEqual(self.__tfm.run_tfs.call_count, 4)
+        self.assertEqual(self.__ema.run_step.call_count, 1)
+
+    def test_run_step_adaptive_macro_step(self):
+        self.__cle.initialize("foo")
+        self.__cle.max_macro_steps = 5
+        self.__bca.run_step = Mock()
+        self.__tfm.run_tfs = Mock()
+        self.__tfm.next_run_time = Mock(return_value=0.025)
+        self.__cle.run_step(0.01)
+        self.__bca.run_step.assert_called_once_with(40.0)
+        self.__tfm.run_tfs.assert_called_once_with(0.01 + 0.01 + 0.01)
+        self.assertEqual(self.__cle.simulation_time, 0.01 + 0.01 + 0.01 + 0.01)
+
+        # steps are not merged beyond the number of steps requested
+        self.__tfm.next_run_time.return_value = float('inf')
+        summary = self.__cle.run_steps(7)
+        self.assertEqual(summary['steps'], 7)
+        self.assertEqual(self.__bca.run_step.call_count, 3)
+        self.assertAlmostEqual(self.__cle.simulation_time, 0.11)
+
+    def test_run_for(self):
+        self.__cle.initialize("foo")
+        self.__tfm.run_tfs = Mock()
+        summary = self.__cle.run_for(0.05)
+        self.assertEqual(summary['steps'], 5)
+        self.assertAlmostEqual(summary['simulation_time'], 0.05)
+        self.assertAlmostEqual(self.__cle.simulation_time, 0.05)
+        self.assertEqual(self.__tfm.run_tfs.call_count, 5)
+        self.assertIn('total', summary['phases'])
+        self.assertEqual(summary['flawed_transfer_functions'], [])
+        self.assertGreaterEqual(self.__cle.real_time, summary['real_time'])
+
+    def test_run_steps_while_running(self):
+        self.__cle.initialize("foo")
+        with patch.object(self.CLE_Class, 'running', new_callable=PropertyMock) as running:
+            running.return_value = True
+            self.assertRaises(Exception, self.__cle.run_steps, 1)
+
     def test_get_time(self):
         self.__cle.initialize("foo")
         self.assertTrue(self.__cle.is_initialized)
@@ -88,6 +160,18 @@ class TestDeterministicClosedLoopEngine(unittest.TestCase):
         self.__cle.stop()
         self.assertGreater(self.__cle.real_time, 0.0)
 
+    def test_start_stop_paced(self):
+        self.__cle.initialize("foo")
+        self.__tfm.run_tfs = Mock()
+        self.__cle.real_time_factor = 1.0
+        self.assertEqual(self.__cle.real_time_factor, 1.0)
+        self.__cle.start()
+        time.sleep(0.5)
+        self.__cle.stop()
+        # at most 0.5 s of simulation time plus the step in progress
+        self.assertLess(self.__cle.simulation_time, 0.5 + 3 * 0.01)
+        self.assertLess(self.__cle.real_time_lag, 0.1)
+
     def test_reset(self):
         self.__cle.initialize("foo")
         self.assertTrue(self.__cle.is_initialized)
@@ -127,6 +211,33 @@ class TestDeterministicClosedLoopEngine(unittest.TestCase):
         self.__cle.reset_brain()
         self.assertEquals(1, self.__cle.load_brain.call_count)
 
+    def test_checkpoint_restore(self):
+        self.__cle.initialize("foo")
+        self.__cle.run_step(0.01)
+        self.__tfm.get_state = Mock(return_value={'global_data': {'x': 1}})
+        self.__tfm.set_state = Mock()
+        self.__bca.get_state = Mock(return_value={1L: {'V_m': -70.0}})
+        self.__bca.set_state = Mock()
+        checkpoint = self.__cle.checkpoint()
+        self.__cle.run_step(0.01)
+        self.__cle.restore(checkpoint)
+        self.assertAlmostEqual(self.__cle.simulation_time, 0.01)
+        self.__tfm.set_state.assert_called_once_with({'global_data': {'x': 1}})
+        self.__bca.set_state.assert_called_once_with({1L: {'V_m': -70.0}})
+
+    def test_checkpoint_restore_file(self):
+        self.__cle.initialize("foo")
+        self.__cle.run_step(0.01)
+        checkpoint_file = tempfile.NamedTemporaryFile(suffix='.checkpoint', delete=False)
+        checkpoint_file.close()
+        self.addCleanup(os.remove, checkpoint_file.name)
+        self.__cle.checkpoint(checkpoint_file.name)
+        self.__cle.run_step(0.01)
+        self.__bca.set_state = Mock()
+        self.__cle.restore(checkpoint_file.name)
+        self.assertAlmostEqual(self.__cle.simulation_time, 0.01)
+        self.assertFalse(self.__bca.set_state.called)
+
     def test_shutdown(self):
         self.__cle.initialize("foo")
         self.__cle.shutdown()
@@ -203,12 +314,105 @@ class TestDeterministicClosedLoopEngine(unittest.TestCase):
         self.__tfm.hard_reset_brain_devices.assert_called()
 
 
+class TestMacroStepsWithTransferFunctions(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('hbp_nrp_cle.robotsim.GazeboHelper.rospy')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_triggered_tf_does_not_prevent_merging(self):
+        nrp.start_new_tf_manager()
+        nrp.set_nest_adapter(MockBrainCommunicationAdapter())
+        nrp.set_robot_adapter(MockRobotCommunicationAdapter())
+        calls = []
+
+        @nrp.Robot2Neuron(throttling_rate=10)
+        def slow_tf(t):
+            calls.append(('slow_tf', t))
+
+        @nrp.MapRobotSubscriber("camera", Topic('/camera', float))
+        @nrp.Robot2Neuron(triggers="camera")
+        def camera_tf(t, camera):
+            calls.append(('camera_tf', t))
+
+        nrp.initialize("test")
+        bca = MockBrainControlAdapter()
+        bca.run_step = Mock()
+        cle = DeterministicClosedLoopEngine(MockRobotControlAdapter(),
+                                            config.active_node.robot_adapter, bca,
+                                            config.active_node.brain_adapter, config.active_node,
+                                            MagicMock(), 0.01)
+        cle.initialize("foo")
+        self.addCleanup(cle.shutdown)
+        cle.max_macro_steps = 5
+
+        # the TFs have never run, so the first step is not merged
+        cle.run_step(0.01)
+        bca.run_step.assert_called_once_with(10.0)
+        bca.run_step.reset_mock()
+        # the throttled TF is due again at 0.1, the topic-triggered TF only on a new image
+        self.assertAlmostEqual(cle.run_step(0.01), 0.06)
+        bca.run_step.assert_called_once_with(50.0)
+        self.assertEqual([t for name, t in calls if name == 'slow_tf'], [0.0])
+
+
 class TestClosedLoopEngine(TestDeterministicClosedLoopEngine):
     CLE_Class = ClosedLoopEngine
-    
-    def setUp(self):
-        with patch("hbp_nrp_cle.cle.ClosedLoopEngine.threading"):
-            super(TestClosedLoopEngine, self).setUp()
+
+    def test_run_step_adaptive_macro_step(self):
+        # the pipelined engine does not merge steps
+        cle = self._TestDeterministicClosedLoopEngine__cle
+        cle.initialize("foo")
+        cle.max_macro_steps = 5
+        cle.bca.run_step = Mock()
+        cle.tfm.run_tfs = Mock()
+        cle.tfm.next_run_time = Mock(return_value=float('inf'))
+        cle.run_step(0.01)
+        cle.bca.run_step.assert_called_once_with(10.0)
+        cle.shutdown()
+
+    def test_double_buffered_topics(self):
+        self.assertTrue(self._TestDeterministicClosedLoopEngine__cle.rcm.double_buffered)
+
+    def test_run_step_pipelines_tfs(self):
+        cle = self._TestDeterministicClosedLoopEngine__cle
+        cle.initialize("foo")
+        cle.tfm.run_tfs = Mock()
+        cle.bcm.refresh_buffers = Mock()
+        cle.run_step(0.01)
+        cle.run_step(0.01)
+        # the TFs of each step work on the clock at the beginning of the step
+        self.assertEqual([c[0][0] for c in cle.tfm.run_tfs.call_args_list], [0.0, 0.01])
+        self.assertEqual(cle.bcm.refresh_buffers.call_count, 2)
+        cle.shutdown()
+
+    def test_tf_device_writes_wait_for_brain_step(self):
+        cle = self._TestDeterministicClosedLoopEngine__cle
+        cle.initialize("foo")
+        generator = cle.bcm.register_spike_source(Mock(), IPoissonSpikeGenerator)
+        written = threading.Event()
+
+        def run_tfs(t):
+            generator.rate = 42.0
+            written.set()
+
+        rates = []
+
+        def run_brain(dt):
+            # the TFs write the device while the brain simulates
+            self.assertTrue(written.wait(5))
+            rates.append(generator.device.rate)
+
+        cle.tfm.run_tfs = run_tfs
+        cle.bca.run_step = run_brain
+        cle.run_step(0.01)
+        self.assertEqual([1.0], rates)
+        self.assertEqual(42.0, generator.device.rate)
+        written.clear()
+        cle.run_step(0.01)
+        self.assertEqual([1.0, 42.0], rates)
+        cle.shutdown()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,64 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+MultiRateSchedule unit test
+"""
+
+import unittest
+from hbp_nrp_cle.cle.MultiRateSchedule import MultiRateSchedule
+
+
+class TestMultiRateSchedule(unittest.TestCase):
+
+    def test_default_runs_everything(self):
+        schedule = MultiRateSchedule()
+        for tick in range(5):
+            self.assertTrue(schedule.is_due(MultiRateSchedule.BRAIN, tick))
+            self.assertTrue(schedule.is_due(MultiRateSchedule.EXTERNAL_MODULES, tick))
+
+    def test_periods(self):
+        schedule = MultiRateSchedule(brain=4, transfer_functions=2)
+        self.assertEqual(schedule.period(MultiRateSchedule.BRAIN), 4)
+        self.assertEqual(schedule.period(MultiRateSchedule.ROBOT), 1)
+        self.assertEqual([t for t in range(9) if schedule.is_due(MultiRateSchedule.BRAIN, t)],
+                         [0, 4, 8])
+        self.assertEqual([t for t in range(5)
+                          if schedule.is_due(MultiRateSchedule.TRANSFER_FUNCTIONS, t)],
+                         [0, 2, 4])
+
+    def test_invalid_periods(self):
+        self.assertRaises(ValueError, MultiRateSchedule, brain=0)
+        self.assertRaises(ValueError, MultiRateSchedule, robot=1.5)
+
+    def test_from_periods(self):
+        schedule = MultiRateSchedule.from_periods(0.005, brain=0.02, transfer_functions=0.02,
+                                                  external_modules=0.1)
+        self.assertEqual(schedule.period(MultiRateSchedule.BRAIN), 4)
+        self.assertEqual(schedule.period(MultiRateSchedule.ROBOT), 1)
+        self.assertEqual(schedule.period(MultiRateSchedule.EXTERNAL_MODULES), 20)
+        self.assertRaises(ValueError, MultiRateSchedule.from_periods, 0.02, brain=0.03)
+
+
+if __name__ == '__main__':
+    unittest.main()
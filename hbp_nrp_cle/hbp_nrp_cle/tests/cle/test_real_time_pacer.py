@@ -0,0 +1,108 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+RealTimePacer unit test
+"""
+
+import unittest
+from mock import patch, Mock
+from hbp_nrp_cle.cle.RealTimePacer import RealTimePacer
+
+
+@patch('hbp_nrp_cle.cle.RealTimePacer.time')
+class TestRealTimePacer(unittest.TestCase):
+
+    def test_disabled(self, mock_time):
+        pacer = RealTimePacer()
+        self.assertFalse(pacer.enabled)
+        pacer.wait(0.02)
+        self.assertFalse(mock_time.sleep.called)
+        pacer.real_time_factor = 0
+        self.assertIsNone(pacer.real_time_factor)
+
+    def test_invalid_configuration(self, mock_time):
+        self.assertRaises(ValueError, RealTimePacer, -1.0)
+        self.assertRaises(ValueError, RealTimePacer, 1.0, 'foo')
+
+    def test_absolute_deadlines(self, mock_time):
+        pacer = RealTimePacer(real_time_factor=0.5)
+        mock_time.time.return_value = 100.0
+        pacer.start()
+        mock_time.time.return_value = 100.01
+        pacer.wait(0.02)
+        self.assertAlmostEqual(mock_time.sleep.call_args[0][0], 0.03)
+        self.assertAlmostEqual(pacer.lag, -0.03)
+        # the sleep overshot, the next deadline is not shifted
+        mock_time.time.return_value = 100.05
+        pacer.wait(0.02)
+        self.assertAlmostEqual(mock_time.sleep.call_args[0][0], 0.03)
+        self.assertEqual(pacer.overruns, 0)
+
+    def test_interrupt(self, mock_time):
+        pacer = RealTimePacer(real_time_factor=1.0)
+        mock_time.time.return_value = 100.0
+        pacer.start()
+        event = Mock()
+        pacer.wait(0.02, event)
+        self.assertAlmostEqual(event.wait.call_args[0][0], 0.02)
+
+    def test_catch_up(self, mock_time):
+        pacer = RealTimePacer(real_time_factor=1.0, policy=RealTimePacer.CATCH_UP)
+        mock_time.time.return_value = 100.0
+        pacer.start()
+        mock_time.time.return_value = 100.05
+        pacer.wait(0.02)
+        self.assertEqual(pacer.overruns, 1)
+        self.assertAlmostEqual(pacer.lag, 0.03)
+        self.assertFalse(mock_time.sleep.called)
+        pacer.wait(0.02)
+        pacer.wait(0.02)
+        self.assertEqual(pacer.overruns, 2)
+        self.assertAlmostEqual(pacer.lag, -0.01)
+        self.assertEqual(pacer.skipped_deadlines, 0)
+
+    def test_skip(self, mock_time):
+        pacer = RealTimePacer(real_time_factor=1.0, policy=RealTimePacer.SKIP)
+        mock_time.time.return_value = 100.0
+        pacer.start()
+        mock_time.time.return_value = 100.05
+        pacer.wait(0.02)
+        self.assertEqual(pacer.overruns, 1)
+        self.assertEqual(pacer.skipped_deadlines, 1)
+        pacer.wait(0.02)
+        self.assertAlmostEqual(mock_time.sleep.call_args[0][0], 0.01)
+
+    def test_reset(self, mock_time):
+        pacer = RealTimePacer(real_time_factor=1.0)
+        mock_time.time.return_value = 100.0
+        pacer.start()
+        mock_time.time.return_value = 101.0
+        pacer.wait(0.02)
+        pacer.reset()
+        self.assertEqual(pacer.overruns, 0)
+        self.assertEqual(pacer.lag, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
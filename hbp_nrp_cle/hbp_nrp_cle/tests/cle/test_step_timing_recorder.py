@@ -0,0 +1,78 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+StepTimingRecorder unit test
+"""
+
+import unittest
+import numpy as np
+from hbp_nrp_cle.cle.StepTimingRecorder import StepTimingRecorder
+
+
+class TestStepTimingRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = StepTimingRecorder(capacity=10)
+
+    def test_invalid_capacity(self):
+        self.assertRaises(ValueError, StepTimingRecorder, 0)
+
+    def test_empty_statistics(self):
+        self.assertEqual(self.recorder.count, 0)
+        self.assertEqual(self.recorder.statistics(), {})
+        self.assertEqual(len(self.recorder.last()), 0)
+
+    def test_record(self):
+        self.recorder.record(range(7))
+        self.assertEqual(self.recorder.count, 1)
+        self.assertTrue(np.array_equal(self.recorder.last(), [range(7)]))
+
+    def test_ring_buffer_overwrites_oldest(self):
+        for i in range(15):
+            self.recorder.record([i] * 7)
+        self.assertEqual(self.recorder.count, 10)
+        last = self.recorder.last()
+        self.assertEqual(list(last[:, 0]), range(5, 15))
+        self.assertEqual(list(self.recorder.last(3)[:, 6]), [12, 13, 14])
+
+    def test_statistics_window(self):
+        for i in range(10):
+            self.recorder.record([i] * 7)
+        stats = self.recorder.statistics()
+        self.assertEqual(set(stats.keys()), set(StepTimingRecorder.PHASES))
+        self.assertEqual(stats['total']['max'], 9)
+        self.assertAlmostEqual(stats['total']['p50'], 4.5)
+        stats = self.recorder.statistics(window=2)
+        self.assertEqual(stats['brain_run']['max'], 9)
+        self.assertAlmostEqual(stats['brain_run']['p50'], 8.5)
+
+    def test_reset(self):
+        self.recorder.record([1] * 7)
+        self.recorder.reset()
+        self.assertEqual(self.recorder.count, 0)
+        self.assertEqual(self.recorder.statistics(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
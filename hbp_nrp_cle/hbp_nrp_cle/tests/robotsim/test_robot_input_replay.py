@@ -0,0 +1,168 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Tests the recording and replay of robot inputs
+"""
+
+from hbp_nrp_cle.robotsim.RobotInputLog import RobotInputRecorder, read_robot_input_log
+from hbp_nrp_cle.robotsim.ReplayCommunicationAdapter import ReplayCommunicationAdapter
+from hbp_nrp_cle.robotsim.ReplayControlAdapter import ReplayControlAdapter
+from hbp_nrp_cle.robotsim.RobotInterface import Topic
+from hbp_nrp_cle.robotsim.RosCommunicationAdapter import RosCommunicationAdapter
+
+import os
+import struct
+import tempfile
+import unittest
+from mock import Mock, patch
+
+__author__ = 'GeorgHinkel'
+
+
+class FakeMessage(object):
+    """
+    A minimal message with a ROS-like serialization
+    """
+    _type = 'fake_msgs/FakeMessage'
+
+    def __init__(self, data=0.0):
+        self.data = data
+
+    def serialize(self, buff):
+        buff.write(struct.pack('<d', self.data))
+
+    def deserialize(self, payload):
+        self.data = struct.unpack('<d', payload)[0]
+        return self
+
+
+class TestRobotInputReplay(unittest.TestCase):
+
+    def setUp(self):
+        log_file = tempfile.NamedTemporaryFile(suffix='.ril', delete=False)
+        log_file.close()
+        self.filename = log_file.name
+        self.addCleanup(os.remove, self.filename)
+
+        recorder = RobotInputRecorder(self.filename)
+        recorder.record('/camera', FakeMessage(1.5))
+        recorder.record('/joints', [1, 2, 3])
+        recorder.next_step()
+        recorder.next_step()
+        recorder.record('/camera', FakeMessage(2.5))
+        recorder.next_step()
+        recorder.close()
+
+        patcher = patch('hbp_nrp_cle.robotsim.RobotInputLog.importlib.import_module',
+                        return_value=Mock(FakeMessage=FakeMessage))
+        self.import_module = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_log(self):
+        records = list(read_robot_input_log(self.filename))
+        self.assertEqual([(step, name) for step, name, _ in records],
+                         [(0, '/camera'), (0, '/joints'), (2, '/camera')])
+        self.assertEqual(records[0][2].data, 1.5)
+        self.assertEqual(records[1][2], [1, 2, 3])
+        self.assertEqual(records[2][2].data, 2.5)
+        self.import_module.assert_called_once_with('fake_msgs.msg')
+
+    def test_read_invalid_log(self):
+        with open(self.filename, 'wb') as log:
+            log.write('not a log')
+        self.assertRaises(ValueError, list, read_robot_input_log(self.filename))
+
+    def test_replay(self):
+        rcm = ReplayCommunicationAdapter(self.filename)
+        rca = ReplayControlAdapter(rcm)
+        rcm.initialize("replay")
+        camera = rcm.register_subscribe_topic(Topic('/camera', FakeMessage))
+        joints = rcm.register_subscribe_topic('/joints', initial_value=[])
+        publisher = rcm.register_publish_topic(Topic('/cmd', float))
+        tf = Mock(elapsed_time=0.0)
+        camera.register_tf_trigger(tf)
+
+        self.assertEqual(joints.value, [])
+        rcm.refresh_buffers(0.0)
+        self.assertTrue(camera.changed)
+        self.assertEqual(camera.value.data, 1.5)
+        self.assertEqual(joints.value, [1, 2, 3])
+        self.assertEqual(tf.run.call_count, 1)
+
+        rcm.refresh_buffers(0.01)
+        self.assertFalse(camera.changed)
+        self.assertEqual(camera.value.data, 1.5)
+
+        rcm.refresh_buffers(0.02)
+        self.assertTrue(camera.changed)
+        self.assertFalse(joints.changed)
+        self.assertEqual(camera.value.data, 2.5)
+
+        publisher.send_message(4.2)
+        self.assertEqual(publisher.last_sent, 4.2)
+        self.assertEqual(publisher.sent_count, 1)
+
+        self.assertAlmostEqual(rca.run_step_async(0.01).result(), 0.01)
+        rca.reset()
+        self.assertEqual(rcm.step, 0)
+        rcm.refresh_buffers(0.0)
+        self.assertEqual(camera.value.data, 1.5)
+        rcm.shutdown()
+
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.master')
+    def test_replay_matches_recording(self, _, __):
+        rcm = RosCommunicationAdapter()
+        rcm.input_recorder = RobotInputRecorder(self.filename)
+        plain = rcm.register_subscribe_topic(Topic('/plain', int))
+        buffered = rcm.register_subscribe_topic(Topic('/buffered', int), double_buffered=True)
+        received = {0: [(plain, 1), (buffered, 10)], 1: [(plain, 2)], 3: [(buffered, 11)],
+                    4: [(plain, 3), (buffered, 12)]}
+
+        def tf_inputs(plain, buffered):
+            return plain.value, plain.changed, buffered.value, buffered.changed
+
+        recorded = []
+        for step in range(6):
+            rcm.refresh_buffers(step * 0.01)
+            # the world publishes during the step, before the TFs run
+            for subscriber, value in received.get(step, []):
+                subscriber._callback(value)
+            recorded.append(tf_inputs(plain, buffered))
+        rcm.shutdown()
+
+        replay = ReplayCommunicationAdapter(self.filename)
+        plain = replay.register_subscribe_topic('/plain')
+        buffered = replay.register_subscribe_topic('/buffered')
+        replayed = []
+        for step in range(6):
+            replay.refresh_buffers(step * 0.01)
+            replayed.append(tf_inputs(plain, buffered))
+        replay.shutdown()
+
+        self.assertEqual(replayed, recorded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,7 +27,7 @@ Tests the ROS communication adapter
 
 import unittest
 import rospy
-from mock import patch, Mock
+from mock import patch, Mock, call
 from hbp_nrp_cle.robotsim.RobotInterface import PreprocessedTopic, Topic
 from hbp_nrp_cle.robotsim.RosCommunicationAdapter import RosCommunicationAdapter, RosPublishedPreprocessedTopic, \
     RosPublishedTopic, RosSubscribedPreprocessedTopic, RosSubscribedTopic
@@ -177,6 +177,85 @@ class TestRosCommunicationAdapter(unittest.TestCase):
         self.assertEquals(mock_init_node.call_count, 1)
         self.assertEquals(mock_publisher.call_count, 2)
 
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
+    def test_rca_refresh_buffers_records_inputs(self, mock_rospy_subscriber):
+        recorder = Mock()
+        self.rca.input_recorder = recorder
+        plain = self.rca.register_subscribe_topic(Topic('plain', 'b'))
+        buffered = self.rca.register_subscribe_topic(Topic('buffered', 'd'), double_buffered=True)
+        self.rca.register_subscribe_topic(Topic('silent', 'f'))
+        plain._callback(1)
+        buffered._callback(2)
+        self.rca.refresh_buffers(0.1)
+        recorder.record.assert_any_call('plain', 1)
+        recorder.record.assert_any_call('buffered', 2)
+        self.assertEquals(recorder.record.call_count, 2)
+        self.assertEquals(recorder.next_step.call_count, 0)
+        # the plain value is read by the TFs of the running step, so it is recorded before the
+        # recorder moves on to the next step
+        plain._callback(3)
+        recorder.next_step.side_effect = lambda: recorder.record('next', None)
+        self.rca.refresh_buffers(0.2)
+        self.assertEqual(recorder.record.call_args_list[2:],
+                         [call('plain', 3), call('next', None)])
+        plain._callback(4)
+        self.rca.shutdown()
+        recorder.record.assert_called_with('plain', 4)
+        recorder.close.assert_called_once_with()
+        self.assertIsNone(self.rca.input_recorder)
+
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
+    def test_rca_refresh_buffers_dispatches_triggers(self, mock_rospy_subscriber):
+        self.rca.trigger_policy = tested_module.TRIGGER_LATEST
+        sub = self.rca.register_subscribe_topic(Topic('camera', 'b'))
+        self.assertEqual(sub.trigger_policy, tested_module.TRIGGER_LATEST)
+        tf = Mock(active=True, throttled=False, elapsed_time=0.0)
+        sub.register_tf_trigger(tf)
+
+        sub._callback(1)
+        sub._callback(2)
+        self.assertFalse(tf.run.called)
+        self.rca.refresh_buffers(0.1)
+
+        tf.run.assert_called_once_with(0.1)
+        self.assertEqual(sub.value, 2)
+        self.assertEqual(self.rca.trigger_statistics,
+                         {'camera': {'received': 2, 'dispatched': 1, 'dropped': 1}})
+
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
+    def test_rca_dispatch_keeps_changed_bit(self, mock_rospy_subscriber):
+        self.rca.trigger_policy = tested_module.TRIGGER_EVERY
+        sub = self.rca.register_subscribe_topic(Topic('camera', 'b'))
+        seen = []
+        tf = Mock(active=True, throttled=False, elapsed_time=0.0)
+        tf.run.side_effect = lambda t: seen.append((sub.value, sub.changed))
+        sub.register_tf_trigger(tf)
+
+        sub._callback(1)
+        sub._callback(2)
+        self.rca.refresh_buffers(0.1)
+
+        # the triggered TF sees each queued value, the TFs of the step see no new value
+        self.assertEqual(seen, [(1, True), (2, True)])
+        self.assertFalse(sub.changed)
+        self.assertEqual(sub.value, 2)
+
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
+    def test_rca_dispatch_does_not_rewind_value(self, mock_rospy_subscriber):
+        self.rca.trigger_policy = tested_module.TRIGGER_EVERY
+        sub = self.rca.register_subscribe_topic(Topic('camera', 'b'))
+        tf = Mock(active=True, throttled=False, elapsed_time=0.0)
+        # ROS delivers a newer value while the triggered TF runs for an older one
+        tf.run.side_effect = lambda t: sub._callback(3) if sub.value == 1 else None
+        sub.register_tf_trigger(tf)
+
+        sub._callback(1)
+        sub._callback(2)
+        self.rca.refresh_buffers(0.1)
+
+        self.assertEqual(sub.value, 3)
+        self.assertTrue(sub.changed)
+
 
 class TestTopicImplementations(unittest.TestCase):
 
@@ -250,6 +329,42 @@ class TestTopicImplementations(unittest.TestCase):
         self.assertEquals(rst.value, 'data')
         self.assertEquals(mock_rospy_subscriber.call_count, 1)
 
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
+    def test_rst_double_buffered(self, mock_rospy_subscriber):
+        rst = RosSubscribedTopic(Topic('topic_name', 'topic_type'), 10, double_buffered=True)
+        self.assertTrue(rst.double_buffered)
+        rst._callback('data')
+        self.assertFalse(rst.changed)
+        self.assertEquals(rst.value, 10)
+        rst.swap_buffers()
+        self.assertTrue(rst.changed)
+        self.assertEquals(rst.value, 'data')
+        rst.swap_buffers()
+        self.assertFalse(rst.changed)
+        self.assertEquals(rst.value, 'data')
+
+    @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
+    def test_rst_trigger_policies(self, mock_rospy_subscriber):
+        for policy, expected, dropped in [(tested_module.TRIGGER_EVERY, [1, 2, 3], 0),
+                                          (2, [2, 3], 1)]:
+            rst = RosSubscribedTopic(Topic('topic_name', 'topic_type'), None,
+                                     trigger_policy=policy)
+            seen = []
+            tf = Mock(active=True, throttled=False, elapsed_time=0.0)
+            tf.run.side_effect = lambda t, rst=rst: seen.append(rst.value)
+            rst.register_tf_trigger(tf)
+            for value in [1, 2, 3]:
+                rst._callback(value)
+            rst.dispatch_triggers(1.0)
+            rst.dispatch_triggers(1.0)
+            self.assertEqual(seen, expected)
+            self.assertEqual(rst.trigger_count, 3)
+            self.assertEqual(rst.dispatched_triggers, len(expected))
+            self.assertEqual(rst.dropped_triggers, dropped)
+
+        self.assertRaises(ValueError, RosSubscribedTopic, Topic('topic_name', 'topic_type'),
+                          None, trigger_policy='sometimes')
+
     @patch('hbp_nrp_cle.robotsim.RosCommunicationAdapter.rospy.Subscriber')
     def test_rst_reset_changed(self, mock_rospy_subscriber):
         rst = RosSubscribedTopic(Topic('topic_name', 'topic_type'), None)
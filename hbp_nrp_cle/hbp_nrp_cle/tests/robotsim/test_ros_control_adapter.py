@@ -171,6 +171,11 @@ class TestRosControlAdapter(unittest.TestCase):
         self.assertEqual(result, future_mock)
         self.__advance_simulation.assert_called_with(1.0)
 
+    def test_run_step_async_float_multiple(self):
+        self._rca.set_time_step(0.01)
+        self._rca.run_step_async(3 * 0.01)
+        self.__advance_simulation.assert_called_with(3.0)
+
     def test_reset(self):
         with LogCapture('hbp_nrp_cle.robotsim.RosControlAdapter') as logcapture:
             self.__set_physics.return_value=True
@@ -0,0 +1,131 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+Tests for the ColumnRecorder module
+"""
+
+import unittest
+import tempfile
+import shutil
+import os
+import numpy
+import hbp_nrp_cle.tf_framework as nrp
+from hbp_nrp_cle.tf_framework import _ColumnRecorder
+from mock import patch
+
+
+class TestMapColumnRecorder(unittest.TestCase):
+
+    def test_mapping(self):
+        mapping = nrp.MapColumnRecorder("name", "joints.npz", [("time", float), "position"])
+        recorder = mapping.create_adapter(None)
+        self.assertIsInstance(recorder, nrp.ColumnRecorder)
+        self.assertEqual(['time', 'position'], recorder.column_names)
+
+
+class TestColumnRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reserved_column(self):
+        with self.assertRaises(ValueError):
+            nrp.ColumnRecorder("dummy.npz", ["Simulation_reset"])
+
+    def test_record_entry(self):
+        recorder = nrp.ColumnRecorder("dummy.npz", [("step", int), ("value", float)],
+                                      chunk_size=4)
+        for i in range(10):
+            recorder.record_entry(i, i / 2.0)
+        self.assertEqual(10, len(recorder))
+        columns = recorder.get_columns()
+        self.assertEqual(range(10), columns['step'].tolist())
+        self.assertEqual(numpy.dtype(int), columns['step'].dtype)
+        self.assertTrue(numpy.allclose(numpy.arange(10) / 2.0, columns['value']))
+        self.assertFalse(columns['Simulation_reset'].any())
+
+        with self.assertRaises(ValueError):
+            recorder.record_entry(1)
+
+    def test_record_rows(self):
+        recorder = nrp.ColumnRecorder("dummy.npz", ["a", "b"], chunk_size=3)
+        recorder.record_entry(-1, -2)
+        recorder.record_rows(numpy.arange(14).reshape(7, 2))
+        structured = numpy.zeros(2, dtype=[('b', float), ('a', float)])
+        structured['a'] = [100, 101]
+        recorder.record_rows(structured)
+        columns = recorder.get_columns()
+        self.assertEqual([-1, 0, 2, 4, 6, 8, 10, 12, 100, 101], columns['a'].tolist())
+        self.assertEqual([-2, 1, 3, 5, 7, 9, 11, 13, 0, 0], columns['b'].tolist())
+
+        with self.assertRaises(ValueError):
+            recorder.record_rows(numpy.zeros((2, 3)))
+
+    def test_reset_and_csv(self):
+        recorder = nrp.ColumnRecorder("dummy.npz", [("t", float), ("n", int)])
+        recorder.record_entry(0.5, 1)
+        recorder.reset('fakeTfManager')
+        recorder.record_rows([[1.5, 2], [2.5, 3]])
+        self.assertEqual("dummy.csv", recorder.get_csv_recorder_name())
+        self.assertEqual(['t,', 'n,', 'Simulation_reset\n'], recorder.get_csv_headers())
+        self.assertEqual(['0.5,1\n', '1.5,2,RESET\n', '2.5,3\n'], recorder.cleanup())
+        self.assertEqual(0, len(recorder))
+
+        erasing = nrp.ColumnRecorder("dummy.npz", ["x"], erase_on_reset=True)
+        erasing.record_entry(1)
+        erasing.reset('fakeTfManager')
+        erasing.record_entry(2)
+        self.assertEqual(['2.0,RESET\n'], erasing.cleanup())
+
+    def test_get_set_state(self):
+        recorder = nrp.ColumnRecorder("dummy.npz", ["x"], chunk_size=2)
+        recorder.record_rows([[1], [2], [3]])
+        state = recorder.get_state()
+        recorder.reset('fakeTfManager')
+        recorder.record_entry(4)
+        recorder.set_state(state)
+        recorder.record_entry(5)
+        self.assertEqual([1, 2, 3, 5], recorder.get_columns()['x'].tolist())
+        self.assertFalse(recorder.get_columns()['Simulation_reset'].any())
+
+    def test_save_npz(self):
+        recorder = nrp.ColumnRecorder("dummy.npz", [("t", float), ("n", int)])
+        recorder.record_rows([[0.1, 1], [0.2, 2]])
+        path = recorder.save(self.directory)
+        self.assertEqual(os.path.join(self.directory, "dummy.npz"), path)
+        data = numpy.load(path)
+        self.assertEqual([1, 2], data['n'].tolist())
+        self.assertEqual([False, False], data['Simulation_reset'].tolist())
+
+    def test_save_hdf5_requires_h5py(self):
+        recorder = nrp.ColumnRecorder("dummy.h5", ["x"])
+        with patch.object(_ColumnRecorder, 'h5py', None):
+            self.assertRaises(Exception, recorder.save, self.directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,6 +29,9 @@ __author__ = ''
 
 import unittest
 import tempfile
+import gzip
+import os
+import shutil
 import hbp_nrp_cle
 import hbp_nrp_cle.tf_framework as nrp
 from mock import Mock, patch
@@ -59,9 +62,124 @@ class TestCSVRecorder(unittest.TestCase):
         recorder.cleanup()
         self.assertEqual(recorder._CSVRecorder__values,[])
 
+    def test_get_set_state(self):
+        recorder = nrp.CSVRecorder("dummy_file.csv", ['header1', 'header2'])
+        recorder.record_entry("tst1", "tst2")
+        state = recorder.get_state()
+        recorder.reset('fakeTfManager')
+        recorder.record_entry("tst3", "tst4")
+        recorder.set_state(state)
+        self.assertFalse(recorder._CSVRecorder__reset_since_last_record)
+        self.assertEqual(recorder.cleanup(), ['tst1,', 'tst2\n'])
+
     def test_reset(self):
         recorder = nrp.CSVRecorder("dummy_file.csv", ['header1', 'header2\n'],erase_on_reset=True)
         result = recorder.reset('fakeTfManager')
         self.assertEqual(recorder._CSVRecorder__filename,"dummy_file.csv")
         self.assertTrue(recorder._CSVRecorder__reset_since_last_record)
-        self.assertEqual(recorder._CSVRecorder__headers,['header1,', 'header2\n,', 'Simulation_reset\n'])
\ No newline at end of file
+        self.assertEqual(recorder._CSVRecorder__headers,['header1,', 'header2\n,', 'Simulation_reset\n'])
+
+class TestStreamingCSVRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_mapping(self):
+        mapping = nrp.MapCSVRecorder("name", "filename", ['header1', 'header2'], streaming=True,
+                                     buffer_size=4, compress=True)
+        recorder = mapping.create_adapter(None)
+        self.assertIsInstance(recorder, nrp.StreamingCSVRecorder)
+        self.assertIsInstance(recorder, nrp.CSVRecorder)
+
+    def test_streaming(self):
+        recorder = nrp.StreamingCSVRecorder("dummy_file.csv", ['header1', 'header2'],
+                                            buffer_size=2, chunk_size=3,
+                                            directory=self.directory)
+        for i in range(10):
+            recorder.record_entry(i, i * 2)
+        recorder.flush()
+        path = recorder.path
+        with open(path) as spool:
+            self.assertEqual(10, len(spool.readlines()))
+
+        rows = recorder.cleanup()
+        self.assertEqual(10, len(rows))
+        self.assertEqual(["{0},{1}\n".format(i, i * 2) for i in range(10)], rows)
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNone(recorder.path)
+        self.assertEqual([], recorder.cleanup())
+
+        # recording after a cleanup starts a new file
+        recorder.record_entry("a", "b")
+        self.assertEqual(["a,b\n"], list(recorder.cleanup()))
+
+    def test_streaming_compressed(self):
+        recorder = nrp.StreamingCSVRecorder("dummy_file.csv", ['header1', 'header2'],
+                                            chunk_size=2, compress=True,
+                                            directory=self.directory)
+        for i in range(5):
+            recorder.record_entry(i, "x")
+        recorder.flush()
+        self.assertTrue(recorder.path.endswith('.csv.gz'))
+        with gzip.open(recorder.path) as spool:
+            self.assertEqual(5, len(spool.readlines()))
+        self.assertEqual(["{0},x\n".format(i) for i in range(5)], list(recorder.cleanup()))
+
+    def test_streaming_detach_file(self):
+        recorder = nrp.StreamingCSVRecorder("dummy_file.csv", ['header1', 'header2'],
+                                            directory=self.directory)
+        self.assertIsNone(recorder.detach_file())
+        recorder.record_entry("tst1", "tst2")
+        path = recorder.detach_file()
+        self.assertIsNone(recorder.path)
+        with open(path) as spool:
+            self.assertEqual(['tst1,tst2\n'], spool.readlines())
+        self.assertEqual([], recorder.cleanup())
+
+    def test_dump_streams_rows(self):
+        recorder = nrp.StreamingCSVRecorder("dummy_file.csv", ['header1', 'header2'],
+                                            compress=True, directory=self.directory)
+        for i in range(3):
+            recorder.record_entry(i, "x")
+        tf = Mock(params=['t', recorder])
+        with patch('hbp_nrp_cle.tf_framework.get_transfer_functions', return_value=[tf]):
+            [[name, headers, values]] = nrp.dump_csv_recorder_to_files()
+        self.assertEqual("dummy_file.csv", name)
+        self.assertIsInstance(values, nrp.SpooledRows)
+        self.assertEqual(3, len(values))
+        self.assertEqual(["{0},x\n".format(i) for i in range(3)], list(values))
+        self.assertEqual(["{0},x\n".format(i) for i in range(3)], list(values))
+        self.assertIsNone(recorder.path)
+        path = values.path
+        values.close()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual([], list(values))
+
+        recorder.record_entry("a", "b")
+        recorder.flush()
+        path = recorder.path
+        with patch('hbp_nrp_cle.tf_framework.get_transfer_functions', return_value=[tf]):
+            nrp.clean_csv_recorders_files()
+        self.assertFalse(os.path.exists(path))
+
+    def test_streaming_reset_and_state(self):
+        recorder = nrp.StreamingCSVRecorder("dummy_file.csv", ['header1', 'header2'],
+                                            erase_on_reset=True, compress=True,
+                                            directory=self.directory)
+        recorder.record_entry("tst1", "tst2")
+        state = recorder.get_state()
+        recorder.record_entry("tst3", "tst4")
+        recorder.set_state(state)
+        recorder.reset('fakeTfManager')
+        recorder.record_entry("tst5", "tst6")
+        self.assertEqual(['header1,header2,Simulation_reset\n', 'tst5,tst6,RESET\n'],
+                         list(recorder.cleanup()))
+
+        recorder.record_entry("tst1", "tst2")
+        state = recorder.get_state()
+        recorder.record_entry("tst3", "tst4")
+        recorder.set_state(state)
+        self.assertEqual(['tst1,tst2\n'], list(recorder.cleanup()))
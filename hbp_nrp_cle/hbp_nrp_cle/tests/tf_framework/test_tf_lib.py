@@ -26,6 +26,8 @@ import cv2
 import numpy as np
 import random
 from hbp_nrp_cle.tf_framework import tf_lib
+import hbp_nrp_cle.tf_framework as nrp
+from mock import patch
 
 __author__ = 'Alessandro Ambrosano'
 
@@ -50,6 +52,76 @@ class TestTFLib(unittest.TestCase):
             ang_ideal = tf_lib.cam.pixel2angle(ball_pos[0], ball_pos[1])[0]
             self.assertLessEqual(abs(ang_cmptd - ang_ideal), 0.2)
 
+    def test_image_cache(self):
+        tf_lib.image_cache.invalidate()
+        image = object()
+        other = object()
+        rgb = np.zeros((4, 6, 3), dtype=np.uint8)
+        hsv = np.ones((4, 6, 3), dtype=np.uint8)
+        with patch.object(tf_lib, 'bridge') as bridge, patch.object(tf_lib, 'cv2') as cv:
+            bridge.imgmsg_to_cv2.return_value = rgb
+            cv.COLOR_RGB2HSV = 40
+            cv.cvtColor.return_value = hsv
+            cv.inRange.return_value = np.zeros((4, 6), dtype=np.uint8)
+
+            self.assertIs(rgb, tf_lib.decode_image(image))
+            self.assertIs(hsv, tf_lib.decode_image_hsv(image))
+            tf_lib.detect_red(image)
+            self.assertIs(hsv, tf_lib.decode_image_hsv(image))
+            self.assertEqual(1, bridge.imgmsg_to_cv2.call_count)
+            self.assertEqual(1, cv.cvtColor.call_count)
+            cv.cvtColor.assert_called_once_with(rgb, 40)
+
+            # other messages and encodings are decoded separately
+            tf_lib.decode_image(other)
+            tf_lib.decode_image(image, "bgr8")
+            self.assertEqual(3, bridge.imgmsg_to_cv2.call_count)
+
+            # a new step invalidates the cache
+            nrp.start_new_tf_manager()
+            nrp.config.active_node.run_tfs(0.02)
+            tf_lib.decode_image(image)
+            self.assertEqual(4, bridge.imgmsg_to_cv2.call_count)
+
+    def test_mask_centroid(self):
+        mask = np.zeros((48, 64), dtype=np.uint8)
+        self.assertIsNone(tf_lib.mask_centroid(mask))
+        mask[10:21, 30:41] = 255
+        self.assertEqual((35.0, 15.0), tf_lib.mask_centroid(mask))
+        mask[0, 0] = 1
+        x, y = tf_lib.mask_centroid(mask)
+        ys, xs = np.nonzero(mask)
+        self.assertAlmostEqual(xs.mean(), x)
+        self.assertAlmostEqual(ys.mean(), y)
+
+    def test_region_counts_and_ratios(self):
+        mask = np.zeros((10, 9), dtype=np.uint8)
+        mask[:, 0] = 1
+        mask[:5, 8] = 1
+        self.assertEqual([10, 5], tf_lib.region_counts(mask).tolist())
+        self.assertEqual([10, 0, 5], tf_lib.region_counts(mask, 3).tolist())
+        out = np.empty(3)
+        self.assertIs(out, tf_lib.region_ratios(mask, 3, out=out))
+        self.assertTrue(np.allclose([10 / 30., 0., 5 / 30.], out))
+        self.assertTrue(np.allclose([10 / 40., 5 / 50.], tf_lib.region_ratios(mask)))
+
+    def test_channel_rates(self):
+        image = np.zeros((60, 80, 3), dtype=np.uint8)
+        image[:, 40:, 0] = 255
+        out = np.empty((30, 40, 3))
+        with patch.object(tf_lib.cv2, 'resize',
+                          side_effect=lambda img, size: img[::2, ::2]) as resize:
+            self.assertIs(out, tf_lib.channel_rates(image, 40, 30, out=out))
+            with patch.object(tf_lib, 'decode_image', return_value=image):
+                rates = tf_lib.get_color_values(object())
+        resize.assert_called_with(image, (40, 30))
+        self.assertTrue(np.allclose(out[:, :20], 1 / 5000.))
+        self.assertTrue(np.allclose(out[:, 20:, 0], 5000 ** (255 / 256.) / 5000))
+        self.assertTrue(np.allclose(out[:, 20:, 1:], 1 / 5000.))
+        self.assertTrue(np.allclose(rates.left_red, 1 / 5000.))
+        self.assertTrue(np.allclose(rates.right_red, 5000 ** (255 / 256.) / 5000))
+        self.assertEqual((600,), rates.right_blue.shape)
+
     def test_camera(self):
         w, h = 640, 480
         c = tf_lib.Camera()
@@ -166,6 +238,52 @@ class TestTFLib(unittest.TestCase):
         self.assertAlmostEqual(_x, x)
         self.assertAlmostEqual(_y, y)
 
+    def test_camera_arrays(self):
+        c = tf_lib.Camera()
+        c.set_image_size(64, 48)
+        u = np.array([[0, 10, 32], [63, 5, 47]])
+        v = np.array([[0, 47, 24], [1, 30, 12]])
+
+        for conversion in (c.pixel2metric, c.pixel2norm, c.pixel2angle):
+            x, y = conversion(u, v)
+            self.assertEqual(u.shape, x.shape)
+            for i in range(u.shape[0]):
+                for j in range(u.shape[1]):
+                    sx, sy = conversion(u[i, j], v[i, j])
+                    self.assertAlmostEqual(sx, x[i, j])
+                    self.assertAlmostEqual(sy, y[i, j])
+
+        a, e = c.pixel2angle(u, v)
+        _u, _v = c.angle2pixel(a, e)
+        self.assertTrue(np.allclose(_u, u))
+        self.assertTrue(np.allclose(_v, v))
+        xm, ym = c.norm2metric(*c.pixel2norm(u, v))
+        self.assertTrue(np.allclose(c.metric2pixel(xm, ym), (u, v)))
+
+        # broadcasting a row of columns against a column of rows
+        a, e = c.pixel2angle(np.arange(64), np.arange(48)[:, np.newaxis])
+        self.assertEqual((48, 64), a.shape)
+
+    def test_angle_map(self):
+        c = tf_lib.Camera()
+        c.set_image_size(64, 48)
+        a, e = c.angle_map()
+        self.assertEqual((48, 64), a.shape)
+        self.assertEqual((48, 64), e.shape)
+        self.assertAlmostEqual(c.pixel2angle(10, 20)[0], a[20, 10])
+        self.assertAlmostEqual(c.pixel2angle(10, 20)[1], e[20, 10])
+        self.assertRaises(ValueError, a.fill, 0)
+
+        self.assertIs(a, c.angle_map()[0])
+        c.set_image_size(32, 24)
+        self.assertEqual((24, 32), c.angle_map()[0].shape)
+        c.set_image_size(64, 48)
+        self.assertIs(a, c.angle_map()[0])
+
+        la, le = c.lookup_angle(np.array([10, 63]), np.array([20, 0]))
+        self.assertTrue(np.allclose(la, c.pixel2angle([10, 63], [20, 0])[0]))
+        self.assertTrue(np.allclose(le, c.pixel2angle([10, 63], [20, 0])[1]))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -76,6 +76,102 @@ class TestTransferFunctionManager(unittest.TestCase):
 
         self.assertEqual(len(tfs), 0)
 
+    def test_next_run_time(self):
+        self.assertEqual(self.tfm.next_run_time(), float('inf'))
+
+        @nrp.Robot2Neuron(throttling_rate=10)
+        def slow_tf(t):
+            pass
+
+        @nrp.Neuron2Robot(throttling_rate=2)
+        def slower_tf(t):
+            pass
+
+        slow_tf.active = True
+        slower_tf.active = True
+        slow_tf.run(1.0)
+        slower_tf.run(1.0)
+        self.assertAlmostEqual(self.tfm.next_run_time(), 1.1)
+        slow_tf.active = False
+        self.assertAlmostEqual(self.tfm.next_run_time(), 1.5)
+
+    def test_execution_plan(self):
+        calls = []
+
+        @nrp.Robot2Neuron()
+        def first_tf(t):
+            calls.append('first_tf')
+
+        @nrp.Neuron2Robot()
+        def second_tf(t):
+            calls.append('second_tf')
+
+        first_tf.active = True
+        second_tf.active = True
+        second_tf.priority = 1
+
+        self.tfm.run_tfs(1.0)
+        self.assertEqual(['second_tf', 'first_tf'], calls)
+
+        # an unchanged set of transfer functions is not sorted again
+        with mock.patch.object(self.tfm, 'transfer_functions') as transfer_functions:
+            self.tfm.run_tfs(2.0)
+            self.assertFalse(transfer_functions.called)
+        self.assertEqual(['second_tf', 'first_tf'] * 2, calls)
+
+        del calls[:]
+        first_tf.priority = 2
+        second_tf.active = False
+        self.tfm.run_tfs(3.0)
+        self.assertEqual(['first_tf'], calls)
+
+    def test_indexed_lookup(self):
+        self.tfm.robot_adapter = self.rcm
+        self.tfm.brain_adapter = self.bcm
+
+        @nrp.MapRobotSubscriber("camera", Husky.Eye.camera)
+        @nrp.MapSpikeSink("device", nrp.brain.actors[1], nrp.leaky_integrator_alpha)
+        @nrp.Neuron2Robot(Husky.RightArm.pose)
+        def camera_trans(t, camera, device):
+            pass
+
+        @nrp.MapSpikeSource("spike_source", nrp.brain.sensors[0], nrp.poisson)
+        @nrp.Robot2Neuron()
+        def robot_2_neuron_tf(t, spike_source):
+            pass
+
+        nrp.set_flawed_transfer_function("def flawed_tf(t): pass", "flawed_tf", Exception())
+        self.tfm.initialize("tfnode")
+
+        self.assertIs(camera_trans, nrp.get_transfer_function("camera_trans"))
+        self.assertIs(robot_2_neuron_tf, self.tfm.get_tf("robot_2_neuron_tf"))
+        self.assertEqual("flawed_tf", nrp.get_transfer_function("flawed_tf").name)
+        self.assertIsNone(self.tfm.get_tf("flawed_tf", flawed=False))
+        self.assertIsNone(nrp.get_transfer_function("missing"))
+
+        camera, device = camera_trans.camera, camera_trans.device
+        self.assertIs(camera_trans, self.tfm.get_tf_by_adapter(camera))
+        self.assertIs(camera_trans, self.tfm.get_tf_by_adapter(device))
+        self.assertIs(camera_trans, self.tfm.get_tf_by_adapter(camera_trans.topic))
+        self.assertIs(robot_2_neuron_tf,
+                      self.tfm.get_tf_by_adapter(robot_2_neuron_tf.spike_source))
+
+        # deletion releases the devices and topics without searching the communication adapters
+        with mock.patch.object(type(self.bcm), 'detector_devices',
+                               new_callable=mock.PropertyMock) as detector_devices:
+            self.assertTrue(nrp.delete_transfer_function("camera_trans"))
+            self.assertFalse(detector_devices.called)
+        self.assertNotIn(device, self.bcm.detector_devices)
+        self.assertNotIn(camera, self.rcm.subscribed_topics)
+        self.assertIsNone(self.tfm.get_tf_by_adapter(device))
+        self.assertIsNone(nrp.get_transfer_function("camera_trans"))
+        self.assertNotIn(camera_trans, self.tfm.n2r)
+        self.assertFalse(nrp.delete_transfer_function("camera_trans"))
+
+        self.assertTrue(nrp.delete_transfer_function("flawed_tf"))
+        self.assertEqual([], self.tfm.flawed)
+        self.assertIsNone(nrp.get_flawed_transfer_function("flawed_tf"))
+
     def test_setting_brainsim_adapter(self):
         self.tfm.robot_adapter = self.rcm
 
@@ -207,6 +207,39 @@ class TestTransferFunctionVariables(unittest.TestCase):
 
         self.assertRaises(Exception, nrp.initialize, "MyTransferFunctions")
 
+    def test_tf_state_snapshot(self):
+        @nrp.MapVariable("local_var", initial_value=[])
+        @nrp.MapVariable("global_var", initial_value=0, scope=nrp.GLOBAL)
+        @nrp.MapCSVRecorder("recorder", filename="values.csv", headers=["t"])
+        @nrp.MapSpikeSource("current", nrp.brain.actors[0], nrp.dc_source)
+        @nrp.Robot2Neuron()
+        def accumulate(t, local_var, global_var, recorder, current):
+            local_var.value.append(t)
+            global_var.value = global_var.value + 1
+            recorder.record_entry(t)
+            current.amplitude = t
+
+        nrp.initialize("MyTransferFunctions")
+        tfm = config.active_node
+
+        tfm.run_robot_to_neuron(1)
+        state = tfm.get_state()
+        tfm.run_robot_to_neuron(2)
+        accumulate.current.active = False
+
+        tfm.set_state(state)
+
+        self.assertListEqual(accumulate.local_var.value, [1])
+        self.assertEqual(tfm.global_data["global_var"], 1)
+        self.assertEqual(accumulate.recorder.cleanup(), ['1\n'])
+        self.assertEqual(accumulate.current.amplitude, 1)
+        self.assertTrue(accumulate.current.active)
+        self.assertEqual(accumulate.params[0], 1)
+
+        tfm.run_robot_to_neuron(2)
+        self.assertListEqual(accumulate.local_var.value, [1, 2])
+        self.assertListEqual(state['transfer_functions']['accumulate'][1], [1])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -155,6 +155,31 @@ def third_tf(t, shared_list):
         self.assertTrue(shared_list[1] == "second_tf")
         self.assertTrue(shared_list[2] == "third_tf")
 
+    def test_run_tfs_parallel_keeps_dependency_order(self):
+        nrp.start_new_tf_manager()
+        config.active_node.brain_adapter = MockBrainCommunicationAdapter()
+        config.active_node.robot_adapter = MockRobotCommunicationAdapter()
+        nrp.set_parallel_workers(4)
+        self.assertEqual(4, config.active_node.parallel_workers)
+
+        tf_template = """@nrp.MapVariable('shared_list', initial_value=[], scope=nrp.GLOBAL)
+@nrp.Neuron2Robot()
+def {0}(t, shared_list):
+    shared_list.value.append('{0}')
+"""
+        for name, priority in [('second_tf', 2), ('third_tf', 1), ('first_tf', 3)]:
+            tf = tf_template.format(name)
+            nrp.set_transfer_function(tf, tf, name, activation=True, priority=priority)
+
+        config.active_node.run_tfs(1.0)
+
+        shared_list = config.active_node.global_data['shared_list']
+        self.assertEqual(['first_tf', 'second_tf', 'third_tf'], shared_list)
+
+        config.active_node.shutdown()
+        nrp.set_parallel_workers(0)
+        self.assertEqual(0, config.active_node.parallel_workers)
+
     def test_tf_set(self):
         nrp.start_new_tf_manager()
         brain = MockBrainCommunicationAdapter()
@@ -231,6 +256,43 @@ def transform_camera(t, camera, camera_device):
         nrp.set_transfer_function(tf_n2r, tf_n2r, 'right_arm')
         self.assertTrue(tf.priority == 1)
 
+    def test_tf_set_replaces_in_place(self):
+        nrp.start_new_tf_manager()
+
+        brain = MockBrainCommunicationAdapter()
+        robot = MockRobotCommunicationAdapter()
+        nrp.set_nest_adapter(brain)
+        nrp.set_robot_adapter(robot)
+        nrp.initialize("MyTransferFunctions")
+
+        tf_template = """@nrp.MapRobotSubscriber("camera", Topic('/husky/camera', sensor_msgs.msg.Image))
+@nrp.MapSpikeSink("neuron", nrp.brain.actors[slice(0, 2, 1)], nrp.leaky_integrator_alpha, v_rest={0})
+@nrp.Neuron2Robot(Topic('/husky/cmd_vel', float))
+def right_arm(t, camera, neuron):
+    return {1}
+"""
+        nrp.set_transfer_function("v1", tf_template.format(1.0, 1), 'right_arm')
+        tf = nrp.get_transfer_function('right_arm')
+        camera, neuron, topic = tf.camera, tf.neuron, tf.topic
+        self.assertEqual(1, len(brain.detector_devices))
+
+        # a new body keeps all devices and topics
+        nrp.set_transfer_function("v2", tf_template.format(1.0, 2), 'right_arm')
+        self.assertEqual(1, len(nrp.get_transfer_functions()))
+        self.assertIs(tf, nrp.get_transfer_function('right_arm'))
+        self.assertIs(camera, tf.camera)
+        self.assertIs(neuron, tf.neuron)
+        self.assertIs(topic, tf.topic)
+        self.assertEqual("v2", tf.source)
+        self.assertEqual(2, tf._func(0.0, tf.camera, tf.neuron))
+        self.assertEqual(1, len(brain.detector_devices))
+
+        # a changed mapping creates a new device and releases the old one
+        nrp.set_transfer_function("v3", tf_template.format(2.0, 3), 'right_arm')
+        self.assertIs(camera, tf.camera)
+        self.assertIsNot(neuron, tf.neuron)
+        self.assertEqual([tf.neuron], brain.detector_devices)
+
     @patch('hbp_nrp_cle.tf_framework.CSVRecorder.cleanup')
     def test_tf_delete(self, mock_cleanup):
 
@@ -0,0 +1,160 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+import hbp_nrp_cle.tf_framework as nrp
+from hbp_nrp_cle.tf_framework import config
+from hbp_nrp_cle.tf_framework._TransferFunctionManager import TransferFunctionManager
+from hbp_nrp_cle.tf_framework._TransferFunctionProcessExecutor import \
+    TransferFunctionProcessExecutor
+from hbp_nrp_cle.mocks.brainsim._MockBrainCommunicationAdapter import MockBrainCommunicationAdapter
+from hbp_nrp_cle.mocks.robotsim._MockRobotCommunicationAdapter import MockRobotCommunicationAdapter
+from hbp_nrp_cle.robotsim.RobotInterface import Topic
+
+import multiprocessing
+import os
+import unittest
+import numpy as np
+
+__author__ = 'GeorgHinkel'
+
+
+class Device(object):
+    def __init__(self):
+        self.voltage = np.arange(10000, dtype=np.float64)
+        self.rate = 0.0
+        self.sent = []
+
+    def send_message(self, value):
+        self.sent.append(value)
+
+    def fail(self):
+        raise KeyError("no such neuron")
+
+
+def read_and_write(t, device, publisher):
+    publisher.send_message(float(device.voltage.sum()))
+    device.rate = t
+    return os.getpid(), device.voltage.shape
+
+
+def raise_value_error(t):
+    raise ValueError("broken transfer function")
+
+
+def call_failing_method(t, device):
+    device.fail()
+
+
+class TestTransferFunctionProcessExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = TransferFunctionProcessExecutor(1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_reads_and_writes_are_applied_in_cle_process(self):
+        device = Device()
+        publisher = Device()
+        for t in (1.0, 2.0):
+            pid, shape = self.executor.call(read_and_write, [t, device, publisher])
+            self.assertNotEqual(os.getpid(), pid)
+            self.assertEqual((10000,), shape)
+            self.assertEqual(t, device.rate)
+        self.assertEqual([49995000.0, 49995000.0], publisher.sent)
+
+    def test_exceptions_are_raised_in_cle_process(self):
+        self.assertRaises(ValueError, self.executor.call, raise_value_error, [0.0])
+        self.assertRaises(KeyError, self.executor.call, call_failing_method, [0.0, Device()])
+
+    def test_workers_start_eagerly(self):
+        executor = TransferFunctionProcessExecutor(2)
+        self.addCleanup(executor.shutdown)
+        self.assertEqual(3, len(multiprocessing.active_children()))
+        executor.shutdown()
+        self.assertEqual(1, len(multiprocessing.active_children()))
+        self.assertRaises(Exception, executor.call, read_and_write, [0.0, Device(), Device()])
+
+    def test_accepts(self):
+        local = 1.0
+
+        def closure(t):
+            return local
+
+        self.assertTrue(self.executor.accepts(read_and_write))
+        self.assertFalse(self.executor.accepts(closure))
+        self.assertFalse(self.executor.accepts(len))
+
+    def test_tf_manager_runs_bodies_in_worker(self):
+        nrp.start_new_tf_manager()
+        brain = MockBrainCommunicationAdapter()
+        robot = MockRobotCommunicationAdapter()
+        nrp.set_nest_adapter(brain)
+        nrp.set_robot_adapter(robot)
+
+        @nrp.MapSpikeSink("neuron0", nrp.brain.actors[slice(0, 2, 1)], nrp.leaky_integrator_alpha)
+        @nrp.Neuron2Robot(Topic('/vel', float))
+        def right_arm(t, neuron0):
+            return os.getpid()
+
+        nrp.set_process_workers(2)
+        nrp.initialize("test")
+        self.assertEqual(2, config.active_node.process_workers)
+        self.assertEqual(2, config.active_node.parallel_workers)
+
+        config.active_node.run_neuron_to_robot(0.1)
+        pid = right_arm.topic.sent[-1]
+        self.assertNotEqual(os.getpid(), pid)
+
+        nrp.set_process_workers(0)
+        config.active_node.run_neuron_to_robot(0.2)
+        self.assertEqual(os.getpid(), right_arm.topic.sent[-1])
+        nrp.set_parallel_workers(0)
+
+    def test_executor_belongs_to_manager(self):
+        nrp.start_new_tf_manager()
+        first = config.active_node
+        first.process_workers = 1
+        self.addCleanup(first.shutdown)
+
+        config.active_node = TransferFunctionManager()
+        nrp.set_nest_adapter(MockBrainCommunicationAdapter())
+        nrp.set_robot_adapter(MockRobotCommunicationAdapter())
+
+        @nrp.MapSpikeSink("neuron0", nrp.brain.actors[slice(0, 2, 1)], nrp.leaky_integrator_alpha)
+        @nrp.Neuron2Robot(Topic('/vel', float))
+        def left_arm(t, neuron0):
+            return os.getpid()
+
+        nrp.initialize("test")
+        config.active_node.run_tfs(0.1)
+        self.assertEqual(os.getpid(), left_arm.topic.sent[-1])
+        config.active_node.shutdown()
+
+        self.assertEqual(1, first.process_workers)
+        first.shutdown()
+        self.assertEqual(0, first.process_workers)
+
+
+if __name__ == '__main__':
+    unittest.main()
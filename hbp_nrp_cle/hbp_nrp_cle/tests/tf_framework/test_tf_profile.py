@@ -0,0 +1,150 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+import hbp_nrp_cle.tf_framework as nrp
+from hbp_nrp_cle.tf_framework import config
+from hbp_nrp_cle.tf_framework._TransferFunction import TransferFunction
+from hbp_nrp_cle.tf_framework._TransferFunctionProfile import TransferFunctionProfile
+import hbp_nrp_cle.tf_framework._TransferFunctionProfile as profile_module
+from hbp_nrp_cle.mocks.robotsim._MockRobotCommunicationAdapter import MockRobotCommunicationAdapter
+from hbp_nrp_cle.mocks.brainsim._MockBrainCommunicationAdapter import MockBrainCommunicationAdapter
+
+import unittest
+from mock import patch, Mock
+
+__author__ = 'GeorgHinkel'
+
+
+class TestTransferFunctionProfile(unittest.TestCase):
+
+    def setUp(self):
+        nrp.start_new_tf_manager()
+        config.active_node.brain_adapter = MockBrainCommunicationAdapter()
+        config.active_node.robot_adapter = MockRobotCommunicationAdapter()
+
+    def test_percentiles(self):
+        profile = TransferFunctionProfile()
+        self.assertIsNone(profile.percentile(50))
+        for _ in range(98):
+            profile.record(3e-6)
+        profile.record(1e-3)
+        profile.record(2.5e-3)
+
+        self.assertEqual(100, profile.calls)
+        self.assertEqual(4e-6, profile.percentile(50))
+        self.assertEqual(1.024e-3, profile.percentile(99))
+        self.assertEqual(2.5e-3, profile.percentile(100))
+        self.assertAlmostEqual(98 * 3e-6 + 3.5e-3, profile.total_time)
+
+        summary = profile.summary()
+        self.assertEqual(2.5e-3, summary['max'])
+        self.assertIsNone(summary['allocated_bytes'])
+
+        profile.reset()
+        self.assertEqual(0, profile.calls)
+        self.assertIsNone(profile.percentile(99))
+
+    @patch.object(TransferFunction, 'excepthook', Mock())
+    def test_profiles_of_manager(self):
+        @nrp.Robot2Neuron(throttling_rate=2)
+        def slow_tf(t):
+            pass
+
+        @nrp.Neuron2Robot()
+        def failing_tf(t):
+            if t > 0.3:
+                raise Exception("failed")
+
+        slow_tf.active = True
+        failing_tf.active = True
+
+        for step in range(1, 8):
+            config.active_node.run_tfs(step * 0.125)
+
+        profiles = config.active_node.get_profiles()
+        self.assertEqual(2, profiles['slow_tf']['calls'])
+        self.assertEqual(5, profiles['slow_tf']['skips'])
+        self.assertEqual(0, profiles['slow_tf']['exceptions'])
+        self.assertIsNotNone(profiles['slow_tf']['p50'])
+        self.assertNotIn(failing_tf, config.active_node.transfer_functions())
+        self.assertEqual(1, profiles['failing_tf']['exceptions'])
+        self.assertEqual(3, profiles['failing_tf']['calls'])
+
+        config.active_node.reset_profiles()
+        self.assertEqual(0, config.active_node.get_profiles()['slow_tf']['calls'])
+        self.assertEqual(0, config.active_node.get_profiles()['slow_tf']['skips'])
+        self.assertEqual(0, config.active_node.get_profiles()['failing_tf']['exceptions'])
+
+    def test_profiles_of_parallel_manager(self):
+        @nrp.Robot2Neuron(throttling_rate=2)
+        def slow_tf(t):
+            pass
+
+        slow_tf.active = True
+        config.active_node.parallel_workers = 2
+        self.addCleanup(setattr, config.active_node, 'parallel_workers', 0)
+
+        for step in range(1, 5):
+            config.active_node.run_tfs(step * 0.125)
+        profiles = config.active_node.get_profiles()
+        self.assertEqual(1, profiles['slow_tf']['calls'])
+        self.assertEqual(3, profiles['slow_tf']['skips'])
+
+        config.active_node.parallel_workers = 0
+        for step in range(5, 8):
+            config.active_node.run_tfs(step * 0.125)
+        profiles = config.active_node.get_profiles()
+        self.assertEqual(2, profiles['slow_tf']['calls'])
+        self.assertEqual(5, profiles['slow_tf']['skips'])
+
+    def test_allocation_sampling(self):
+        tracemalloc = Mock()
+        tracemalloc.get_traced_memory.side_effect = [(100, 0), (164, 0)] * 2
+        tracemalloc.is_tracing.return_value = False
+
+        @nrp.Robot2Neuron()
+        def tf(t):
+            pass
+
+        tf.active = True
+        with patch.object(profile_module, 'tracemalloc', tracemalloc):
+            config.active_node.allocation_sampling = 2
+            try:
+                self.assertEqual(2, config.active_node.allocation_sampling)
+                tracemalloc.start.assert_called_once_with()
+                for step in range(1, 5):
+                    config.active_node.run_tfs(step * 0.01)
+            finally:
+                config.active_node.allocation_sampling = 0
+
+        self.assertEqual(2, tf.profile.sampled_calls)
+        self.assertEqual(64.0, tf.profile.summary()['allocated_bytes'])
+
+    def test_allocation_sampling_unavailable(self):
+        with patch.object(profile_module, 'tracemalloc', None):
+            config.active_node.allocation_sampling = 10
+        self.assertEqual(0, config.active_node.allocation_sampling)
+
+
+if __name__ == "__main__":
+    unittest.main()
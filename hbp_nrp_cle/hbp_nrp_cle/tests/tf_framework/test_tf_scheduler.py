@@ -0,0 +1,139 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+import hbp_nrp_cle.tf_framework as nrp
+from hbp_nrp_cle.tf_framework import TFRunningException
+from hbp_nrp_cle.tf_framework._GlobalData import GlobalDataReference
+from hbp_nrp_cle.tf_framework._TransferFunctionProfile import TransferFunctionProfile
+from hbp_nrp_cle.tf_framework._TransferFunctionScheduler import TransferFunctionScheduler, \
+    get_dependencies
+from hbp_nrp_cle.robotsim.RobotInterface import Topic
+
+import threading
+import unittest
+from mock import Mock
+
+__author__ = 'GeorgHinkel'
+
+
+def create_tf(name, *specs):
+    tf = Mock(topic=None, active=True)
+    tf.name = name
+    tf.should_run.return_value = True
+    tf.profile = TransferFunctionProfile()
+    params = [0.0]
+    for spec in specs:
+        if isinstance(spec, GlobalDataReference):
+            params.append(spec)
+        else:
+            params.append(Mock(spec=spec))
+            params[-1].spec = spec
+    tf.params = params
+    return tf
+
+
+class TestTransferFunctionScheduler(unittest.TestCase):
+
+    def test_dependencies(self):
+        publisher = create_tf("publisher", nrp.MapRobotPublisher("p", Topic("/a", float)))
+        subscriber = create_tf("subscriber", nrp.MapRobotSubscriber("s", Topic("/a", float)))
+        other = create_tf("other", nrp.MapRobotSubscriber("s", Topic("/b", float)))
+        source = create_tf("source", nrp.MapSpikeSource("s", nrp.brain.a[1], nrp.poisson))
+        sink = create_tf("sink", nrp.MapSpikeSink("s", nrp.brain.a[1],
+                                                  nrp.leaky_integrator_alpha))
+        global_a = create_tf("global_a", GlobalDataReference("v", "key", 0, {}))
+        global_b = create_tf("global_b", GlobalDataReference("w", "key", 0, {}))
+
+        dependencies = get_dependencies([publisher, subscriber, other, sink, source,
+                                         global_a, global_b])
+
+        self.assertEqual([set(), {0}, set(), set(), {3}, set(), {5}], dependencies)
+
+    def test_brain_devices_share_the_simulator(self):
+        whole = create_tf("whole", nrp.MapSpikeSource("s", nrp.brain.a[0:10], nrp.poisson))
+        single = create_tf("single", nrp.MapSpikeSource("s", nrp.brain.a[5], nrp.dc_source))
+        other = create_tf("other", nrp.MapSpikeSource("s", nrp.brain.b[1], nrp.poisson))
+        first_sink = create_tf("first_sink", nrp.MapSpikeSink("s", nrp.brain.a[5],
+                                                              nrp.population_rate))
+        second_sink = create_tf("second_sink", nrp.MapSpikeSink("s", nrp.brain.a[0:10],
+                                                                nrp.spike_recorder))
+
+        dependencies = get_dependencies([whole, single, other, first_sink, second_sink])
+
+        self.assertEqual([set(), {0}, {0, 1}, {0, 1, 2}, {0, 1, 2}], dependencies)
+
+    def test_readers_are_independent(self):
+        first = create_tf("first", nrp.MapRobotSubscriber("s", Topic("/a", float)))
+        second = create_tf("second", nrp.MapRobotSubscriber("s", Topic("/a", float)))
+        self.assertEqual([set(), set()], get_dependencies([first, second]))
+
+    def test_run_concurrently(self):
+        first = create_tf("first")
+        second = create_tf("second")
+        released = threading.Event()
+        waited = []
+
+        def run_tf(tf, t):
+            if tf is first:
+                waited.append(released.wait(5.0))
+            else:
+                released.set()
+
+        scheduler = TransferFunctionScheduler(2)
+        self.assertEqual(2, scheduler.workers)
+        failures = scheduler.run([first, second], 1.0, run_tf)
+        scheduler.shutdown()
+
+        self.assertEqual([], failures)
+        self.assertEqual([True], waited)
+
+    def test_run_keeps_order_and_reports_failures(self):
+        topic = Topic("/a", float)
+        tfs = [create_tf("tf%d" % i, nrp.MapRobotPublisher("p", topic)) for i in range(4)]
+        tfs[2].should_run.return_value = False
+        error = TFRunningException("tf1 failed")
+        order = []
+
+        def run_tf(tf, t):
+            order.append(tf.name)
+            if tf is tfs[1]:
+                raise error
+
+        scheduler = TransferFunctionScheduler(3)
+        failures = scheduler.run(tfs, 1.0, run_tf)
+        scheduler.shutdown()
+
+        self.assertEqual(["tf0", "tf1", "tf3"], order)
+        self.assertEqual(1, tfs[2].profile.skips)
+        self.assertEqual([(tfs[1], error)], failures)
+
+    def test_run_raises_unexpected_errors(self):
+        tf = create_tf("tf")
+        scheduler = TransferFunctionScheduler(2)
+        run_tf = Mock(side_effect=ValueError())
+        self.assertRaises(ValueError, scheduler.run, [tf], 1.0, run_tf)
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+import hbp_nrp_cle.tf_framework as nrp
+from hbp_nrp_cle.tf_framework import config
+from hbp_nrp_cle.tests.tf_framework.husky import Husky
+from hbp_nrp_cle.robotsim.RobotInterface import Topic
+
+from hbp_nrp_cle.mocks.robotsim._MockRobotCommunicationAdapter import MockRobotCommunicationAdapter
+from hbp_nrp_cle.mocks.brainsim._MockBrainCommunicationAdapter import MockBrainCommunicationAdapter
+
+import unittest
+
+
+class TestTransferFunctionSkipUnchanged(unittest.TestCase):
+
+    def setUp(self):
+        nrp.start_new_tf_manager()
+        self.brain = MockBrainCommunicationAdapter()
+        self.robot = MockRobotCommunicationAdapter()
+        config.active_node.brain_adapter = self.brain
+        config.active_node.robot_adapter = self.robot
+
+    def test_skip_unchanged_defaults(self):
+        @nrp.Neuron2Robot()
+        def always_run(t):
+            pass
+
+        self.assertFalse(always_run.skip_unchanged)
+        self.assertFalse(always_run.republish_unchanged)
+
+    def test_skip_unchanged_subscriber(self):
+        calls = []
+
+        @nrp.MapRobotSubscriber("camera", Husky.Eye.camera)
+        @nrp.Robot2Neuron(skip_unchanged=True)
+        def see(t, camera):
+            calls.append(t)
+
+        config.active_node.initialize("test")
+        camera = see.camera
+        camera.value = 1
+
+        config.active_node.run_tfs(0.1)
+        # the mock subscriber only resets its changed bit when it receives the same value again
+        camera.value = 1
+        config.active_node.run_tfs(0.2)
+        camera.value = 2
+        config.active_node.run_tfs(0.3)
+        camera.value = 2
+        config.active_node.run_tfs(0.4)
+
+        self.assertEqual([0.1, 0.3], calls)
+        self.assertEqual(2, see.profile.unchanged_skips)
+        self.assertEqual(0, see.profile.skips)
+        self.assertEqual(2, config.active_node.get_profiles()['see']['unchanged_skips'])
+
+    def test_skip_unchanged_republish(self):
+        calls = []
+
+        @nrp.MapSpikeSink("neuron", nrp.brain.actors[1], nrp.population_rate,
+                          updates=[(0.3, 5.0)])
+        @nrp.Neuron2Robot(Topic('/husky/cmd_vel', float), skip_unchanged=True,
+                          republish_unchanged=True)
+        def drive(t, neuron):
+            calls.append(t)
+            return neuron.rate
+
+        config.active_node.initialize("test")
+        self.assertTrue(drive.republish_unchanged)
+        topic = drive.topic
+
+        for step in range(1, 6):
+            t = step * 0.1
+            self.brain.refresh_buffers(t)
+            config.active_node.run_tfs(t)
+
+        self.assertEqual([0.1, 0.30000000000000004], calls)
+        self.assertEqual([0.0, 0.0, 5.0, 5.0, 5.0], topic.sent)
+
+        # after a reset, the next call runs again although the rate did not change
+        config.active_node.reset()
+        config.active_node.run_tfs(0.6)
+        self.assertEqual(3, len(calls))
+
+
+if __name__ == "__main__":
+    unittest.main()
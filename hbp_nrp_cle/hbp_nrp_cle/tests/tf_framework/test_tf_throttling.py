@@ -70,8 +70,41 @@ class TestTransferFunctionThrottling(unittest.TestCase):
         self.assertTrue(throttled_tf.should_run(0.1))
         self.assertTrue(throttled_tf.should_run(1.0))
 
+        self.assertEqual(throttled_tf.next_run_time, 0.1)
+
         throttled_tf.run(1.0)
         self.assertFalse(throttled_tf.should_run(0.1))
         self.assertFalse(throttled_tf.should_run(1.0))
         self.assertTrue(throttled_tf.should_run(1.1))
-        self.assertTrue(throttled_tf.should_run(42.0))
\ No newline at end of file
+        self.assertTrue(throttled_tf.should_run(42.0))
+
+    def test_run_tfs_only_runs_due_throttled_tfs(self):
+        calls = []
+
+        @nrp.Neuron2Robot(throttling_rate=2)
+        def slow_tf(t):
+            calls.append(('slow_tf', t))
+
+        @nrp.Robot2Neuron()
+        def fast_tf(t):
+            calls.append(('fast_tf', t))
+
+        slow_tf.active = True
+        fast_tf.active = True
+        slow_tf.priority = 1
+        self.assertTrue(slow_tf.throttled)
+        self.assertFalse(fast_tf.throttled)
+
+        for step in range(1, 8):
+            config.active_node.run_tfs(step * 0.25)
+
+        self.assertEqual([t for name, t in calls if name == 'slow_tf'], [0.25, 0.75, 1.25, 1.75])
+        self.assertEqual(len([name for name, t in calls if name == 'fast_tf']), 7)
+        self.assertEqual(calls[0], ('slow_tf', 0.25))
+        self.assertAlmostEqual(config.active_node.next_run_time(), 1.75 + 0.0001)
+
+        # a TF run by a trigger outside of run_tfs is not run again before it is due
+        del calls[:]
+        slow_tf.run(2.0)
+        config.active_node.run_tfs(2.25)
+        self.assertEqual([('slow_tf', 2.0), ('fast_tf', 2.25)], calls)
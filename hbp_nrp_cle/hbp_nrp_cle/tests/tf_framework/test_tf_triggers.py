@@ -105,3 +105,61 @@ class TestTransferFunctionTriggers(unittest.TestCase):
 
         self.assertNotIn(multiple_triggers, config.active_node.n2r)
         self.assertIn(dev_and_t, config.active_node.n2r)
+
+    def test_brain_device_triggers(self):
+        calls = []
+
+        @nrp.MapSpikeSink("spikes", nrp.brain.actors[1], nrp.spike_recorder, updates=[1.0, 3.0])
+        @nrp.Neuron2Robot(triggers="spikes")
+        def on_spikes(t, spikes):
+            calls.append(("spikes", t))
+
+        @nrp.MapSpikeSink("rate", nrp.brain.actors[2], nrp.population_rate,
+                          updates=[(1.0, 10.0), (2.0, 40.0), (3.0, 45.0), (4.0, 20.0)],
+                          trigger_threshold=30.0)
+        @nrp.Neuron2Robot(triggers="rate")
+        def on_rate(t, rate):
+            calls.append(("rate", t))
+
+        @nrp.MapSpikeSink("voltage", nrp.brain.actors[3], nrp.leaky_integrator_alpha,
+                          updates=[(2.0, 0.05), (3.0, 0.5)], trigger_epsilon=0.1)
+        @nrp.Neuron2Robot(triggers="voltage")
+        def on_voltage(t, voltage):
+            calls.append(("voltage", t))
+
+        brain = config.active_node.brain_adapter
+        brain.__dict__["actors"] = MockPopulation(range(0, 10))
+        config.brain_root = brain
+
+        @nrp.MapSpikeSink("group", nrp.map_neurons(range(4, 6), lambda i: nrp.brain.actors[i]),
+                          nrp.leaky_integrator_exp,
+                          updates=[(2.0, [0.0, 0.0]), (3.0, [0.0, 1.0]), (4.0, [1.0, 1.0])],
+                          trigger_epsilon=0.1)
+        @nrp.Neuron2Robot(triggers="group")
+        def on_group(t, group):
+            calls.append(("group", t))
+
+        config.active_node.initialize("test")
+        self.assertNotIn(on_spikes, config.active_node.n2r)
+
+        for t in (1.0, 2.0, 3.0, 4.0):
+            brain.refresh_buffers(t)
+
+        self.assertEqual([("spikes", 1.0), ("spikes", 3.0)],
+                         [c for c in calls if c[0] == "spikes"])
+        self.assertEqual([("rate", 2.0), ("rate", 4.0)], [c for c in calls if c[0] == "rate"])
+        self.assertEqual([("voltage", 1.0), ("voltage", 3.0)],
+                         [c for c in calls if c[0] == "voltage"])
+        self.assertEqual(2, len(on_group.group))
+        self.assertEqual([("group", 1.0), ("group", 3.0), ("group", 4.0)],
+                         [c for c in calls if c[0] == "group"])
+
+    def test_generators_do_not_trigger(self):
+        @nrp.MapSpikeSource("gen", nrp.brain.actors[1], nrp.poisson)
+        @nrp.Robot2Neuron(triggers="gen")
+        def generator_trigger(t, gen):
+            pass
+
+        with self.assertRaises(Exception) as context:
+            config.active_node.initialize("test")
+        self.assertIn("does not support triggers", str(context.exception))
@@ -29,7 +29,12 @@ __author__ = 'Daniel Peppicelli, Georg Hinkel'
 from ._MappingSpecification import ParameterMappingSpecification
 from ._CleanableTransferFunctionParameter import ICleanableTransferFunctionParameter
 
+import Queue
+import gzip
 import logging
+import os
+import tempfile
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +44,8 @@ class MapCSVRecorder(ParameterMappingSpecification):
     Class to map a CSV recorder object to transfer function parameters
     """
 
-    def __init__(self, parameter_name, filename, headers, erase_on_reset=False):
+    def __init__(self, parameter_name, filename, headers, erase_on_reset=False,
+                 streaming=False, buffer_size=1024, chunk_size=256, compress=False):
         """
         Maps a parameter to a variable in the specified scope (per-default: the transfer function)
         and if the variable does not yet exist initializes it with the provided value.
@@ -62,11 +68,20 @@ class MapCSVRecorder(ParameterMappingSpecification):
         in the CSV file
         :param erase_on_reset: A value indicating whether the csv recorder should erase its contents
         when the simulation is reset
+        :param streaming: If True, recorded rows are written to a temporary file by a background
+        thread instead of being kept in memory
+        :param buffer_size: The maximum number of rows a streaming recorder keeps in memory
+        :param chunk_size: The maximum number of rows a streaming recorder writes at once
+        :param compress: If True, a streaming recorder compresses its temporary file with gzip
         """
         super(MapCSVRecorder, self).__init__(parameter_name)
         self.filename = filename
         self.headers = headers
         self.__erase_on_reset = erase_on_reset
+        self.__streaming = streaming
+        self.__buffer_size = buffer_size
+        self.__chunk_size = chunk_size
+        self.__compress = compress
 
     def create_adapter(self, transfer_function_manager):  # pylint: disable=unused-argument
         """
@@ -74,6 +89,9 @@ class MapCSVRecorder(ParameterMappingSpecification):
 
         :return: A ready to use CSVRecorder object
         """
+        if self.__streaming:
+            return StreamingCSVRecorder(self.filename, self.headers, self.__erase_on_reset,
+                                        self.__buffer_size, self.__chunk_size, self.__compress)
         return CSVRecorder(self.filename, self.headers, self.__erase_on_reset)
 
     def create_tf(self):
@@ -114,6 +132,15 @@ class CSVRecorder(ICleanableTransferFunctionParameter):
 
         :param string[] values : Values to record
         """
+        self.__values.append(self._format_entry(values))
+
+    def _format_entry(self, values):
+        """
+        Formats the given values as a row of the CSV file
+
+        :param values: The values to record
+        :return: A list of strings, each value followed by a comma or, for the last one, a newline
+        """
         # listify the values since they are tuples
         values = list(values)
         if self.__reset_since_last_record:
@@ -126,7 +153,7 @@ class CSVRecorder(ICleanableTransferFunctionParameter):
         values[-1] = values[-1].replace(',', '\n') if values[-1] else ""
 
         self.__reset_since_last_record = False
-        self.__values.append(values)
+        return values
 
     def get_csv_recorder_name(self):
         """
@@ -151,12 +178,51 @@ class CSVRecorder(ICleanableTransferFunctionParameter):
         """
         self.__reset_since_last_record = True
         if self.__erase_on_reset:
-            header = self.__headers
-            del self.__values[:]
-            self.__values.append(header)
+            self._erase()
 
         return self
 
+    def _erase(self):
+        """
+        Erases the values recorded so far, leaving only the headers
+        """
+        header = self.__headers
+        del self.__values[:]
+        self.__values.append(header)
+
+    def get_state(self):
+        """
+        Gets a snapshot of the values recorded so far
+
+        :return: The snapshot of the values buffer
+        """
+        return self._snapshot(), self.__reset_since_last_record
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        values, self.__reset_since_last_record = state
+        self._restore(values)
+
+    def _snapshot(self):
+        """
+        Gets a snapshot of the recorded values
+
+        :return: A copy of the values buffer
+        """
+        return [list(values) for values in self.__values]
+
+    def _restore(self, values):
+        """
+        Restores the recorded values from a snapshot
+
+        :param values: A snapshot taken with _snapshot
+        """
+        self.__values[:] = [list(v) for v in values]
+
     def cleanup(self):
         """
         Retrieves the csv data recorded values and cleans up the values buffer
@@ -173,3 +239,258 @@ class CSVRecorder(ICleanableTransferFunctionParameter):
         del self.__values[:]
 
         return values
+
+
+_STOP = object()
+
+
+class StreamingCSVRecorder(CSVRecorder):
+    """
+    Records values like the CSVRecorder, but keeps at most a bounded number of rows in memory.
+    A background thread writes the rows in chunks to a temporary file, optionally compressed
+    with gzip. Recording blocks while the buffer is full.
+    """
+
+    def __init__(self, filename, headers, erase_on_reset=False, buffer_size=1024,
+                 chunk_size=256, compress=False, directory=None):
+        """
+        Creates a new streaming CSV recorder
+
+        :param string filename: the filename to save to.
+        :param string[] headers: the name of the columns.
+        :param bool erase_on_reset: A value indicating whether the csv recorder should
+        erase its contents when the simulation is reset
+        :param buffer_size: The maximum number of rows kept in memory
+        :param chunk_size: The maximum number of rows written to the temporary file at once
+        :param compress: If True, the temporary file is compressed with gzip
+        :param directory: The directory of the temporary file, by default the system's
+        temporary directory
+        """
+        super(StreamingCSVRecorder, self).__init__(filename, headers, erase_on_reset)
+        self.__rows = Queue.Queue(maxsize=buffer_size)
+        self.__chunk_size = max(1, chunk_size)
+        self.__compress = compress
+        self.__directory = directory
+        self.__lock = threading.Lock()
+        self.__writer = None
+        self.__path = None
+        self.__written = 0
+
+    @property
+    def path(self):
+        """
+        Gets the path of the temporary file the rows are currently written to, or None if no row
+        has been written since the last cleanup
+        """
+        return self.__path
+
+    @property
+    def compress(self):
+        """
+        Gets whether the temporary file is compressed with gzip
+        """
+        return self.__compress
+
+    def record_entry(self, *values):
+        """
+        Records the values provided. The row is written to the temporary file in the background.
+
+        :param string[] values : Values to record
+        """
+        self.__put(self._format_entry(values))
+
+    def __put(self, item):
+        """
+        Queues a row or an operation on the temporary file for the writer thread
+
+        :param item: A row or a function taking no arguments
+        """
+        with self.__lock:
+            if self.__writer is None:
+                self.__writer = threading.Thread(target=self.__write,
+                                                 name="CSV writer " + self.get_csv_recorder_name())
+                self.__writer.daemon = True
+                self.__writer.start()
+            self.__rows.put(item)
+
+    def flush(self):
+        """
+        Waits until all rows recorded so far have been written to the temporary file
+        """
+        self.__rows.join()
+
+    def __write(self):
+        """
+        Writes queued rows to the temporary file until the recorder is cleaned up
+        """
+        stop = False
+        while not stop:
+            items = [self.__rows.get()]
+            while len(items) < self.__chunk_size:
+                try:
+                    items.append(self.__rows.get_nowait())
+                except Queue.Empty:
+                    break
+            rows = []
+            try:
+                for item in items:
+                    if item is _STOP:
+                        stop = True
+                    elif callable(item):
+                        self.__append(rows)
+                        rows = []
+                        item()
+                    else:
+                        rows.append(item)
+                self.__append(rows)
+            # pylint: disable=broad-except
+            except Exception as e:
+                logger.exception(e)
+            finally:
+                for _ in items:
+                    self.__rows.task_done()
+
+    def __append(self, rows):
+        """
+        Appends the given rows to the temporary file. Compressed chunks are written as separate
+        gzip members, such that the file can be truncated after any chunk.
+
+        :param rows: A list of formatted rows
+        """
+        if not rows:
+            return
+        if self.__path is None:
+            suffix = '.csv.gz' if self.__compress else '.csv'
+            handle, self.__path = tempfile.mkstemp(suffix=suffix, prefix='csv_recorder_',
+                                                   dir=self.__directory)
+            os.close(handle)
+        data = ''.join(''.join(row) for row in rows)
+        with open(self.__path, 'ab') as spool:
+            if self.__compress:
+                compressed = gzip.GzipFile(fileobj=spool, mode='wb')
+                compressed.write(data)
+                compressed.close()
+            else:
+                spool.write(data)
+            self.__written = spool.tell()
+
+    def __truncate(self, size):
+        """
+        Truncates the temporary file to the given size
+
+        :param size: The new size in bytes
+        """
+        if self.__path is not None and size < self.__written:
+            with open(self.__path, 'r+b') as spool:
+                spool.truncate(size)
+            self.__written = size
+
+    def _erase(self):
+        """
+        Erases the rows written so far, leaving only the headers
+        """
+        header = self.get_csv_headers()
+        self.__put(lambda: self.__truncate(0))
+        self.__put(header)
+
+    def _snapshot(self):
+        """
+        Gets a snapshot of the recorded rows
+
+        :return: The size of the temporary file after all rows recorded so far have been written
+        """
+        self.flush()
+        return self.__written
+
+    def _restore(self, values):
+        """
+        Discards the rows recorded after the given snapshot
+
+        :param values: A snapshot taken with _snapshot
+        """
+        self.__put(lambda: self.__truncate(values))
+        self.flush()
+
+    def detach_file(self):
+        """
+        Stops the writer thread and hands over the temporary file without reading it, so that
+        even long recordings can be copied without loading them into memory. The caller is
+        responsible for removing the file.
+
+        :return: The path of the temporary file, compressed with gzip if the recorder compresses,
+        or None if no row has been written since the last cleanup
+        """
+        with self.__lock:
+            writer = self.__writer
+            if writer is not None:
+                self.__rows.put(_STOP)
+                writer.join()
+                self.__writer = None
+            path, self.__path, self.__written = self.__path, None, 0
+        return path
+
+    def cleanup(self):
+        """
+        Retrieves the recorded rows from the temporary file and removes it
+
+        :return string[] values: A string array containing the properly formatted
+        comma separated recorder values
+        """
+        path = self.detach_file()
+        if path is None:
+            return []
+        try:
+            with (gzip.open(path, 'rb') if self.__compress else open(path, 'rb')) as spool:
+                return spool.readlines()
+        finally:
+            os.remove(path)
+
+
+class SpooledRows(object):
+    """
+    Represents the rows of a temporary file handed over by a StreamingCSVRecorder. The rows are
+    read from the file whenever they are iterated, so they are never fully loaded into memory.
+    The file is removed when the rows are closed or garbage collected.
+    """
+
+    def __init__(self, path, compressed=False):
+        """
+        Creates the rows of the given temporary file
+
+        :param path: The path of the temporary file, None if no row has been written
+        :param compressed: If True, the temporary file is compressed with gzip
+        """
+        self.__path = path
+        self.__compressed = compressed
+        self.__length = None if path is not None else 0
+
+    @property
+    def path(self):
+        """
+        Gets the path of the temporary file, None if there are no rows or they have been closed
+        """
+        return self.__path
+
+    def __iter__(self):
+        if self.__path is None:
+            return
+        with (gzip.open(self.__path, 'rb') if self.__compressed
+              else open(self.__path, 'rb')) as spool:
+            for row in spool:
+                yield row
+
+    def __len__(self):
+        if self.__length is None:
+            self.__length = sum(1 for _ in self)
+        return self.__length
+
+    def close(self):
+        """
+        Removes the temporary file
+        """
+        path, self.__path = self.__path, None
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def __del__(self):
+        self.close()
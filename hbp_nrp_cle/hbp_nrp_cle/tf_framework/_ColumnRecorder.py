@@ -0,0 +1,373 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains the mapping of a typed, column oriented recorder object to input parameters
+"""
+__author__ = 'GeorgHinkel'
+
+from ._MappingSpecification import ParameterMappingSpecification
+from ._CleanableTransferFunctionParameter import ICleanableTransferFunctionParameter
+
+import logging
+import os
+import numpy
+
+try:
+    import h5py
+except ImportError:  # pragma: no cover
+    h5py = None
+
+logger = logging.getLogger(__name__)
+
+RESET_COLUMN = 'Simulation_reset'
+
+
+class MapColumnRecorder(ParameterMappingSpecification):
+    """
+    Class to map a column recorder object to transfer function parameters
+    """
+
+    def __init__(self, parameter_name, filename, columns, erase_on_reset=False, chunk_size=4096):
+        """
+        Maps a parameter to a recorder that stores numeric rows in typed columns instead of
+        converting them to strings. A transfer function using it could look like this:
+
+        @nrp.MapRobotSubscriber("joint_state",
+                                Topic('/joint_states',
+                                sensor_msgs.msg.JointState))
+        @nrp.MapColumnRecorder("recorder",
+                               filename="joint_positions.npz",
+                               columns=[("time", float), ("Position", float)])
+        @nrp.Robot2Neuron()
+        def joint_state_monitor(t, joint_state, recorder):
+            recorder.record_entry(t, joint_state.value.position[0])
+
+        :param parameter_name: the name of the parameter
+        :param filename: the name of the file to write, ending with .npz, .h5 or .hdf5
+        :param columns: A list of column names or of (name, dtype) pairs. Columns without dtype
+        store 64 bit floats.
+        :param erase_on_reset: A value indicating whether the recorder should erase its contents
+        when the simulation is reset
+        :param chunk_size: The number of rows preallocated at once
+        """
+        super(MapColumnRecorder, self).__init__(parameter_name)
+        self.filename = filename
+        self.columns = columns
+        self.__erase_on_reset = erase_on_reset
+        self.__chunk_size = chunk_size
+
+    def create_adapter(self, transfer_function_manager):  # pylint: disable=unused-argument
+        """
+        Replaces the current mapping operator with the mapping result
+
+        :return: A ready to use ColumnRecorder object
+        """
+        return ColumnRecorder(self.filename, self.columns, self.__erase_on_reset,
+                              self.__chunk_size)
+
+    def create_tf(self):
+        """
+        Creates a TF in case the TF specification has been omitted
+        """
+        from hbp_nrp_cle.tf_framework._Neuron2Robot import Neuron2Robot
+        return Neuron2Robot()
+
+
+class ColumnRecorder(ICleanableTransferFunctionParameter):
+    """
+    Records rows of values into preallocated NumPy column chunks. The values are converted to
+    CSV only when they are exported.
+    """
+
+    def __init__(self, filename, columns, erase_on_reset=False, chunk_size=4096):
+        """
+        Creates a new column recorder
+
+        :param string filename: the filename to save to.
+        :param columns: A list of column names or of (name, dtype) pairs
+        :param bool erase_on_reset: A value indicating whether the recorder should erase its
+        contents when the simulation is reset
+        :param chunk_size: The number of rows preallocated at once
+        """
+        self.__filename = filename
+        self.__names = []
+        self.__dtypes = []
+        for column in columns:
+            if isinstance(column, basestring):
+                column = (column, numpy.float64)
+            name, dtype = column
+            self.__names.append(str(name))
+            self.__dtypes.append(numpy.dtype(dtype))
+        if RESET_COLUMN in self.__names:
+            raise ValueError("The column name {0} is reserved".format(RESET_COLUMN))
+        self.__chunk_size = max(1, int(chunk_size))
+        self.__erase_on_reset = erase_on_reset
+        self.__reset_since_last_record = False
+        self.__chunks = []
+        self.__current = None
+        self.__fill = 0
+        self.__pending = []
+        self.__pending_resets = []
+
+    @property
+    def column_names(self):
+        """
+        Gets the names of the recorded columns
+        """
+        return list(self.__names)
+
+    def __len__(self):
+        """
+        Gets the number of rows recorded so far
+        """
+        return sum(len(chunk[-1]) for chunk in self.__chunks) + self.__fill + len(self.__pending)
+
+    def __new_chunk(self):
+        """
+        Preallocates a new chunk of columns, keeping the full chunk
+        """
+        if self.__current is not None:
+            self.__chunks.append(self.__current)
+        self.__current = [numpy.empty(self.__chunk_size, dtype=dtype) for dtype in self.__dtypes]
+        self.__current.append(numpy.zeros(self.__chunk_size, dtype=bool))
+        self.__fill = 0
+
+    def record_entry(self, *values):
+        """
+        Records a single row. Rows are collected in a short list and copied into the column
+        chunks once a chunk worth of rows has been recorded.
+
+        :param values: One value per column
+        """
+        if len(values) != len(self.__names):
+            raise ValueError("Expected {0} values, but got {1}"
+                             .format(len(self.__names), len(values)))
+        if self.__reset_since_last_record:
+            self.__pending_resets.append(len(self.__pending))
+            self.__reset_since_last_record = False
+        self.__pending.append(values)
+        if len(self.__pending) >= self.__chunk_size:
+            self.__flush_pending()
+
+    def record_rows(self, rows):
+        """
+        Records many rows at once
+
+        :param rows: A two-dimensional array with one column per recorder column or a structured
+        array with fields named like the recorder columns
+        """
+        rows = numpy.asarray(rows)
+        if rows.dtype.names is not None:
+            columns = [rows[name] for name in self.__names]
+        else:
+            if rows.ndim == 1:
+                rows = rows.reshape(1, -1)
+            if rows.ndim != 2 or rows.shape[1] != len(self.__names):
+                raise ValueError("Expected rows with {0} columns, but got an array of shape {1}"
+                                 .format(len(self.__names), rows.shape))
+            columns = [rows[:, i] for i in range(len(self.__names))]
+        if not columns or len(columns[0]) == 0:
+            return
+        self.__flush_pending()
+        resets = numpy.zeros(len(columns[0]), dtype=bool)
+        resets[0] = self.__reset_since_last_record
+        self.__reset_since_last_record = False
+        self.__append(columns, resets)
+
+    def __flush_pending(self):
+        """
+        Copies the rows recorded one by one into the column chunks
+        """
+        pending = self.__pending
+        if not pending:
+            return
+        columns = [numpy.array(column, dtype=dtype)
+                   for column, dtype in zip(zip(*pending), self.__dtypes)]
+        resets = numpy.zeros(len(pending), dtype=bool)
+        resets[self.__pending_resets] = True
+        self.__pending = []
+        self.__pending_resets = []
+        self.__append(columns, resets)
+
+    def __append(self, columns, resets):
+        """
+        Copies columns of rows into the preallocated chunks
+
+        :param columns: A list of arrays, one per recorder column
+        :param resets: A boolean array marking the rows recorded first after a reset
+        """
+        count = len(resets)
+        start = 0
+        while start < count:
+            if self.__current is None or self.__fill == len(self.__current[-1]):
+                self.__new_chunk()
+            fill = self.__fill
+            length = min(count - start, len(self.__current[-1]) - fill)
+            for i, column in enumerate(columns):
+                self.__current[i][fill:fill + length] = column[start:start + length]
+            self.__current[-1][fill:fill + length] = resets[start:start + length]
+            self.__fill = fill + length
+            start += length
+
+    def __column_chunks(self, index):
+        """
+        Gets the used parts of all chunks of a column
+
+        :param index: The column index
+        """
+        self.__flush_pending()
+        chunks = [chunk[index] for chunk in self.__chunks]
+        if self.__current is not None:
+            chunks.append(self.__current[index][:self.__fill])
+        return chunks
+
+    def get_columns(self):
+        """
+        Gets the recorded columns
+
+        :return: A dictionary of column names to arrays, including a boolean array named
+        Simulation_reset that marks the first row recorded after a reset
+        """
+        result = {}
+        for i, name in enumerate(self.__names + [RESET_COLUMN]):
+            chunks = self.__column_chunks(i)
+            result[name] = numpy.concatenate(chunks) if chunks else \
+                numpy.empty(0, dtype=(self.__dtypes + [numpy.dtype(bool)])[i])
+        return result
+
+    def save(self, directory='.'):
+        """
+        Writes the recorded columns to the file of this recorder in the given directory. Files
+        ending with .h5 or .hdf5 are written as HDF5 and require h5py, all others as NumPy .npz.
+
+        :param directory: The directory of the file
+        :return: The path of the written file
+        """
+        path = os.path.join(directory, self.__filename)
+        columns = self.get_columns()
+        if os.path.splitext(path)[1].lower() in ('.h5', '.hdf5'):
+            if h5py is None:
+                raise Exception("Saving {0} requires h5py to be installed".format(path))
+            with h5py.File(path, 'w') as output:
+                for name in self.__names + [RESET_COLUMN]:
+                    output.create_dataset(name, data=columns[name])
+        else:
+            with open(path, 'wb') as output:
+                numpy.savez(output, **columns)
+        return path
+
+    def get_csv_recorder_name(self):
+        """
+        Returns the name of the CSV file the recorded values are exported to
+
+        :return string filename: the filename of the recorder with a .csv extension
+        """
+        return os.path.splitext(self.__filename)[0] + '.csv'
+
+    def get_csv_headers(self):
+        """
+        Returns the recorder's headers in the format of the CSV recorder
+
+        :return string[] headers: The headers separated by a comma in an array
+        """
+        return [name + ',' for name in self.__names] + [RESET_COLUMN + '\n']
+
+    def to_csv(self):
+        """
+        Converts the recorded rows to CSV. The rows are formatted chunk by chunk when iterated.
+
+        :return: An iterable of comma separated rows, each ending with a newline
+        """
+        self.__flush_pending()
+        chunks = list(self.__chunks)
+        if self.__current is not None and self.__fill > 0:
+            chunks.append([column[:self.__fill] for column in self.__current])
+        return _format_csv(chunks)
+
+    # pylint: disable=unused-argument
+    def reset(self, tf_manager):
+        """
+        Resets the recorder
+        """
+        self.__reset_since_last_record = True
+        if self.__erase_on_reset:
+            self.__clear()
+        return self
+
+    def __clear(self):
+        """
+        Discards the recorded rows
+        """
+        self.__chunks = []
+        self.__current = None
+        self.__fill = 0
+        self.__pending = []
+        self.__pending_resets = []
+
+    def get_state(self):
+        """
+        Gets a snapshot of the rows recorded so far
+
+        :return: The snapshot of the recorded columns
+        """
+        return self.get_columns(), self.__reset_since_last_record
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        columns, reset_since_last_record = state
+        self.__clear()
+        if len(columns[RESET_COLUMN]) > 0:
+            # the restored rows form a single full chunk
+            chunk = [numpy.array(columns[name], dtype=dtype)
+                     for name, dtype in zip(self.__names, self.__dtypes)]
+            chunk.append(numpy.array(columns[RESET_COLUMN], dtype=bool))
+            self.__chunks.append(chunk)
+        self.__reset_since_last_record = reset_since_last_record
+
+    def cleanup(self):
+        """
+        Retrieves the recorded rows as CSV and discards them
+
+        :return string[] values: A string array containing the properly formatted
+        comma separated recorder values
+        """
+        rows = list(self.to_csv())
+        self.__clear()
+        return rows
+
+
+def _format_csv(chunks):
+    """
+    Formats chunks of columns as CSV rows
+
+    :param chunks: A list of chunks, each a list of column arrays with the reset column last
+    """
+    for chunk in chunks:
+        for row in zip(*[column.tolist() for column in chunk]):
+            line = ','.join(str(value) for value in row[:-1])
+            yield line + (',RESET\n' if row[-1] else '\n')
@@ -29,6 +29,7 @@ __author__ = 'Sebastian Krach'
 from ._MappingSpecification import ParameterMappingSpecification
 
 import abc
+import copy
 import logging
 from hbp_nrp_cle.tf_framework._PropertyPath import PropertyPath
 from hbp_nrp_cle.brainsim.BrainInterface import IBrainCommunicationAdapter
@@ -200,6 +201,22 @@ class LocalDataReference(DataReference):
         """
         self.__value = _val
 
+    def get_state(self):
+        """
+        Gets a snapshot of the value associated with this parameter
+
+        :return: A deep copy of the value
+        """
+        return copy.deepcopy(self.__value)
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        self.__value = copy.deepcopy(state)
+
 
 class GlobalDataReference(DataReference):
     """
@@ -222,6 +239,13 @@ class GlobalDataReference(DataReference):
         if self.__global_key not in self.__data_dict:
             self.reset(None)
 
+    @property
+    def global_key(self):
+        """
+        Gets the name of the variable in the global scope
+        """
+        return self.__global_key
+
     def _value_getter(self):
         """
         Gets the value associated with this parameter
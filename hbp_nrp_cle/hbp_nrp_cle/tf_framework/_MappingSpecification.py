@@ -67,6 +67,19 @@ class ParameterMappingSpecification(object):
         """
         raise NotImplementedError("This method was not implemented in the concrete implementation")
 
+    # pylint: disable=no-self-use,unused-argument
+    def detect_change(self, adapter, previous):
+        """
+        Detects whether the input the given adapter provides to the transfer function changed.
+        Parameters that are no inputs, such as publishers or variables, never change.
+
+        :param adapter: The adapter created for this mapping
+        :param previous: The observation returned for the previous call, None on the first call
+        :return: A tuple of whether the input changed and the observation to compare the next
+         call against
+        """
+        return False, None
+
     @property
     def name(self):
         """
@@ -36,6 +36,7 @@ from hbp_nrp_cle.brainsim.BrainInterface import IFixedSpikeGenerator, \
 from ._MappingSpecification import ParameterMappingSpecification
 from . import config
 from ._TransferFunction import TransferFunction
+import numpy
 import sys
 
 import logging
@@ -50,6 +51,9 @@ class MapSpikeSink(ParameterMappingSpecification):
     supported_device_types = [ILeakyIntegratorAlpha, ILeakyIntegratorExp,
                               IPopulationRate, ISpikeRecorder, IRawSignal]
 
+    observed_attributes = {ILeakyIntegratorAlpha: 'voltage', ILeakyIntegratorExp: 'voltage',
+                           IPopulationRate: 'rate', IRawSignal: 'value'}
+
     def __init__(self, key, value, device_type, **kwargs):  # -> None:
         """
         Maps a parameter to a neuron
@@ -58,6 +62,10 @@ class MapSpikeSink(ParameterMappingSpecification):
         :param value: the neuron reference
         :param kwargs: Additional configuration
         :param device_type: The type of device that should be created at the referenced neurons
+        :param **trigger_threshold: If the device triggers the transfer function, the rate a
+         population rate has to cross to trigger
+        :param **trigger_epsilon: If the device triggers the transfer function, the change of the
+         rate or voltage that triggers
         """
         super(MapSpikeSink, self).__init__(key)
         self.__value = value
@@ -112,9 +120,35 @@ class MapSpikeSink(ParameterMappingSpecification):
         adapter = transfer_function_manager.brain_adapter
         assert isinstance(adapter, IBrainCommunicationAdapter)
         neurons = self.neurons.select(config.brain_root, adapter)
-        return adapter.register_spike_sink(neurons,
-                                           self.device_type,
-                                           **self.config)
+        device_config = dict(self.config)
+        threshold = device_config.pop('trigger_threshold', None)
+        epsilon = device_config.pop('trigger_epsilon', None)
+        device = adapter.register_spike_sink(neurons,
+                                             self.device_type,
+                                             **device_config)
+        if threshold is not None or epsilon is not None:
+            device.configure_trigger(threshold, epsilon or 0.0)
+        return device
+
+    def detect_change(self, adapter, previous):
+        """
+        Detects whether the device recorded spikes in the last step or its rate, voltage or
+        signal value differs from the previous call
+
+        :param adapter: The brain device or device group
+        :param previous: The values observed in the previous call
+        :return: A tuple of whether the input changed and the current values
+        """
+        if self.device_type is ISpikeRecorder:
+            return bool(numpy.any(adapter.spiked)), None
+        attribute = MapSpikeSink.observed_attributes.get(self.device_type)
+        if attribute is None:
+            # custom devices may change in any way
+            return True, None
+        values = numpy.array(getattr(adapter, attribute), dtype=float)
+        changed = previous is None or previous.shape != values.shape or \
+            not numpy.array_equal(previous, values)
+        return changed, values
 
     def create_tf(self):
         """
@@ -151,6 +185,16 @@ class MapSpikeSource(MapSpikeSink):
         """
         return device_type in MapSpikeSource.supported_device_types
 
+    # pylint: disable=unused-argument
+    def detect_change(self, adapter, previous):
+        """
+        Spike sources are outputs of the transfer function and never change its input
+
+        :param adapter: The brain device
+        :param previous: The observation of the previous call
+        """
+        return False, None
+
     def create_tf(self):
         """
         Creates a TF in case the TF specification has been omitted
@@ -164,14 +208,21 @@ class Neuron2Robot(TransferFunction):
     Class to represent a transfer function from neurons to robot
     """
 
-    def __init__(self, robot_topic=None, triggers=None, throttling_rate=None):
+    def __init__(self, robot_topic=None, triggers=None, throttling_rate=None,
+                 skip_unchanged=False, republish_unchanged=False):
         """
         Defines a new transfer function from robots to neurons
 
         :param robot_topic: the robot topic reference
         :param other_topics: other topics required by this transfer function
-        """
-        super(Neuron2Robot, self).__init__(triggers, throttling_rate)
+        :param skip_unchanged: If True, calls are skipped while the subscribed topics and brain
+         devices of the transfer function did not change
+        :param republish_unchanged: If True, the last return value is published again to the
+         robot topic whenever a call is skipped
+        """
+        super(Neuron2Robot, self).__init__(triggers, throttling_rate, skip_unchanged)
+        self.__republish_unchanged = republish_unchanged
+        self.__last_value = None
         if robot_topic is not None:
             assert isinstance(robot_topic, (Topic, str))
         self.__main_topic = robot_topic
@@ -208,14 +259,17 @@ class Neuron2Robot(TransferFunction):
         return "{0} transfers to robot {1} using {2}" \
             .format(self.name, self.__main_topic, self._params)
 
-    def run(self, t):  # -> None:
+    def run(self, t, executor=None):  # -> None:
         """
         Runs this transfer function at the given simulation time
 
         :param t: The simulation time
+        :param executor: The TransferFunctionProcessExecutor of the transfer function manager, or
+         None to run the body in the CLE process
         """
 
-        return_value = super(Neuron2Robot, self).run(t)
+        return_value = super(Neuron2Robot, self).run(t, executor)
+        self.__last_value = return_value
 
         if return_value is not None:
             try:
@@ -226,6 +280,42 @@ class Neuron2Robot(TransferFunction):
             except Exception, e:
                 self._handle_error(e, sys.exc_info()[2])
 
+    def _replace_definition(self, other):
+        """
+        Takes over the definition of another, not yet initialized transfer function including
+        its main robot topic
+
+        :param other: The transfer function providing the new definition
+        """
+        super(Neuron2Robot, self)._replace_definition(other)
+        self.__main_topic = other.topic
+        self.__republish_unchanged = other.__republish_unchanged
+        self.__last_value = None
+
+    @property
+    def republish_unchanged(self):
+        """
+        Gets whether the last return value is published again when a call is skipped because
+        the inputs of the transfer function did not change
+        """
+        return self.__republish_unchanged
+
+    def skip(self, t):
+        """
+        Called instead of run when the call at the given simulation time is skipped because the
+        inputs of the transfer function did not change
+
+        :param t: The simulation time
+        """
+        if self.__republish_unchanged and self.__last_value is not None:
+            try:
+                topic_publisher = self.__main_topic
+                if topic_publisher is not None:
+                    topic_publisher.send_message(self.__last_value)
+            # pylint: disable=broad-except
+            except Exception, e:
+                self._handle_error(e, sys.exc_info()[2])
+
     def unregister(self):
         """
         Unregister the main robot topic publisher, this TF will no longer
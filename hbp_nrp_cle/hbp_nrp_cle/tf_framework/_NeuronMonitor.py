@@ -215,11 +215,13 @@ class NeuronMonitor(TransferFunction):
         """
         self.publisher.send_message(SpikeRate(t, self.device.rate, self.name))
 
-    def run(self, t):  # -> None:
+    def run(self, t, executor=None):  # -> None:
         """
-        Runs this transfer function at the given simulation time
+        Runs this transfer function at the given simulation time. Neuron monitors always run in
+        the CLE process.
 
         :param t: The simulation time
+        :param executor: Ignored
         """
         # pylint: disable=broad-except
         try:
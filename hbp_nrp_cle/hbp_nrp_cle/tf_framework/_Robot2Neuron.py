@@ -105,6 +105,17 @@ class MapRobotSubscriber(MapRobotPublisher):
         assert isinstance(adapter, IRobotCommunicationAdapter)
         return adapter.register_subscribe_topic(self.topic, **self.config)
 
+    def detect_change(self, adapter, previous):
+        """
+        Detects whether the subscriber received a new value since the previous call
+
+        :param adapter: The robot subscriber
+        :param previous: The value observed in the previous call
+        :return: A tuple of whether the input changed and the current value
+        """
+        value = adapter.value
+        return adapter.changed or value is not previous, value
+
     def create_tf(self):
         """
         Creates a TF in case the TF specification has been omitted
@@ -28,7 +28,8 @@ Defines the base class for a transfer function
 import inspect
 import textwrap
 import logging
-from hbp_nrp_cle.tf_framework import TFException, TFRunningException
+from hbp_nrp_cle.tf_framework import TFException, TFRunningException, config
+from hbp_nrp_cle.tf_framework._TransferFunctionProfile import TransferFunctionProfile
 from abc import abstractmethod
 import sys
 
@@ -56,7 +57,26 @@ class TransferFunction(object):
 
     excepthook = __default_excepthook
 
-    def __init__(self, triggers=None, throttling_rate=None):
+    __revision = 0
+
+    @staticmethod
+    def revision():
+        """
+        Gets a counter that changes whenever a transfer function is created, (de-)activated or
+        reprioritized or a transfer function manager changes its collections of transfer functions
+
+        :return: The current revision
+        """
+        return TransferFunction.__revision
+
+    @staticmethod
+    def invalidate_execution_plans():
+        """
+        Notifies the transfer function managers that their execution plans are outdated
+        """
+        TransferFunction.__revision += 1
+
+    def __init__(self, triggers=None, throttling_rate=None, skip_unchanged=False):
         self._params = []
         self._func = None
         self.__active = False
@@ -64,8 +84,11 @@ class TransferFunction(object):
         self.__local_data = {}
         self.__source = None
         self.__elapsed_time = 0.0
+        self.__profile = TransferFunctionProfile()
         self.__updated_since_last_error = True
         self.__publish_error_callback = None
+        self.__skip_unchanged = skip_unchanged
+        self.__observations = None
         self.__triggers = triggers
         if triggers is None:
             self.__triggers = ["t"]
@@ -73,6 +96,7 @@ class TransferFunction(object):
             self.__triggers = [self.__triggers]
         elif not isinstance(triggers, list):
             raise Exception("The triggers should be a list of parameters that trigger execution")
+        self.__throttled = throttling_rate is not None
         if isinstance(throttling_rate, (int, float)) and throttling_rate > 0:
             self.__min_delta_t = 1.0 / throttling_rate
         elif throttling_rate is None:
@@ -89,6 +113,68 @@ class TransferFunction(object):
         """
         return self._params[0] + self.__min_delta_t <= t
 
+    @property
+    def next_run_time(self):
+        """
+        Gets the earliest simulation time at which this TF runs again, given its throttling rate
+
+        :return: The simulation time in seconds
+        """
+        return self._params[0] + self.__min_delta_t
+
+    @property
+    def throttled(self):
+        """
+        Gets whether the execution frequency of this TF has been limited with a throttling rate
+        """
+        return self.__throttled
+
+    @property
+    def skip_unchanged(self):
+        """
+        Gets whether calls of this TF are skipped while its inputs did not change
+        """
+        return self.__skip_unchanged
+
+    def inputs_changed(self):
+        """
+        Checks whether any subscribed topic or brain device of this TF changed since the previous
+        check and remembers the current inputs for the next check
+
+        :return: True, if an input changed or the inputs have not been checked before
+        """
+        previous = self.__observations
+        if previous is not None and len(previous) != len(self._params) - 1:
+            previous = None
+        changed = previous is None
+        observations = []
+        for i in range(1, len(self._params)):
+            spec = getattr(self._params[i], 'spec', None)
+            if spec is None or not hasattr(spec, 'detect_change'):
+                observations.append(None)
+                continue
+            param_changed, observation = spec.detect_change(
+                self._params[i], previous[i - 1] if previous is not None else None)
+            changed = changed or param_changed
+            observations.append(observation)
+        self.__observations = observations
+        return changed
+
+    def reset_inputs(self):
+        """
+        Forgets the inputs observed so far, so that the next call is not skipped
+        """
+        self.__observations = None
+
+    def skip(self, t):
+        """
+        Called instead of run when the call at the given simulation time is skipped because the
+        inputs of the transfer function did not change
+
+        :param t: The simulation time
+        """
+        pass
+
     @property
     def name(self):
         """
@@ -133,6 +219,15 @@ class TransferFunction(object):
         """
         self.__elapsed_time = value
 
+    @property
+    def profile(self):
+        """
+        Gets the profiling counters of this transfer function
+
+        :return: The TransferFunctionProfile
+        """
+        return self.__profile
+
     @property
     def updated(self):
         """
@@ -200,6 +295,8 @@ class TransferFunction(object):
 
         """
         if bool_value is not None and type(bool_value) == bool:
+            if bool_value != self.__active:
+                TransferFunction.invalidate_execution_plans()
             self.__active = bool_value
 
     @property
@@ -226,6 +323,7 @@ class TransferFunction(object):
             self.__priority = int(priority_value)
         except (ValueError, TypeError):
             self.__priority = 0
+        TransferFunction.invalidate_execution_plans()
 
     @abstractmethod
     def __call__(self, func):
@@ -248,7 +346,7 @@ class TransferFunction(object):
         if self._func is None:
             self._func = func
 
-            funcs_list.append(self)
+            config.active_node.add_tf(self, funcs_list)
             args = inspect.getargspec(func).args
             if args[0] != "t":
                 raise Exception("The first parameter of a transfer function must be the time!")
@@ -262,6 +360,27 @@ class TransferFunction(object):
             raise Exception("It is not allowed to change the underlying function of a Transfer "
                             "Function after it has been initially set.")
 
+    def _replace_definition(self, other):
+        """
+        Takes over the function, the parameter mappings, the triggers and the throttling rate of
+        another, not yet initialized transfer function of the same type. The parameters of this
+        transfer function are detached and must be released or reused by the caller.
+
+        :param other: The transfer function providing the new definition
+        """
+        for param in self._params[1:]:
+            spec = getattr(param, 'spec', param)
+            self.__dict__.pop(getattr(spec, 'name', None), None)
+        self._func = other._func
+        self._params = other._params
+        self.__triggers = other.__triggers
+        self.__min_delta_t = other.__min_delta_t
+        self.__throttled = other.__throttled
+        self.__skip_unchanged = other.__skip_unchanged
+        self.__observations = None
+        self.__updated_since_last_error = True
+        TransferFunction.invalidate_execution_plans()
+
     def check_params(self):  # -> None:
         """
         Checks whether all parameters have been mapped properly
@@ -272,15 +391,19 @@ class TransferFunction(object):
             if param != "t" and type(param) == str:
                 raise Exception("Parameter %s was not mapped properly" % param)
 
-    def run(self, t):  # -> None:
+    def run(self, t, executor=None):  # -> None:
         """
         Runs this transfer function at the given simulation time
 
         :param t: The simulation time
+        :param executor: The TransferFunctionProcessExecutor of the transfer function manager, or
+         None to run the body in the CLE process
         """
         # pylint: disable=broad-except
         try:
             self._params[0] = t
+            if executor is not None and executor.accepts(self._func):
+                return executor.call(self._func, self._params)
             return self._func(*self._params)
         except Exception, e:
             self._handle_error(e, sys.exc_info()[2])
@@ -320,10 +443,11 @@ class FlawedTransferFunction(object):
     the checks performed on loading.
     """
 
-    def __init__(self, name, source, error=None):
+    def __init__(self, name, source, error=None, profile=None):
         self.__name = name
         self.__source = source
         self.__error = error
+        self.__profile = profile
 
     @property
     def source(self):
@@ -355,6 +479,15 @@ class FlawedTransferFunction(object):
         """
         return self.__error
 
+    @property
+    def profile(self):
+        """
+        Gets the profiling counters the transfer function collected until it failed at runtime
+
+        :return: The TransferFunctionProfile, None if the transfer function failed on loading
+        """
+        return self.__profile
+
     # pylint: disable=no-self-use
     @property
     def active(self):
@@ -49,6 +49,15 @@ class ITransferFunctionManager(object):  # pragma: no cover
         """
         raise NotImplementedError("This method was not implemented in the concrete implementation")
 
+    def next_run_time(self):  # -> float
+        """
+        Gets the earliest simulation time at which any of the active transfer functions is run
+        again by run_tfs
+
+        :return: The simulation time in seconds, infinity if no such transfer function exists
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
     def initialize(self, name):  # -> None:
         """
         Initializes the transfer Function node with the given name
@@ -69,6 +78,17 @@ class ITransferFunctionManager(object):  # pragma: no cover
         """
         raise NotImplementedError("This method was not implemented in the concrete implementation")
 
+    def replace_tf(self, tf, new_tf, activation=True):
+        """
+        Replaces the definition of an initialized transfer function in place
+
+        :param tf: The initialized transfer function
+        :param new_tf: The freshly loaded, not yet initialized transfer function
+        :param activation: The desired activation state; True for activated, False otherwise
+        :return: True, if the transfer function has been replaced in place, otherwise False
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
     def reset(self):  # -> None:
         """
         Resets the transfer functions
@@ -83,6 +103,37 @@ class ITransferFunctionManager(object):  # pragma: no cover
         """
         raise NotImplementedError("This method was not implemented in the concrete implementation")
 
+    @property
+    def flawed(self):
+        """
+        Gets a list of faulty transfer functions
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
+    def get_state(self):
+        """
+        Gets a snapshot of the state of the transfer functions
+
+        :return: The snapshot
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state
+
+        :param state: The snapshot
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
+    def get_profiles(self):
+        """
+        Gets the profiles of the transfer functions
+
+        :return: A dictionary mapping transfer function names to profile summaries
+        """
+        raise NotImplementedError("This method was not implemented in the concrete implementation")
+
     def shutdown(self):
         """
         Shuts down the Transfer Function manager
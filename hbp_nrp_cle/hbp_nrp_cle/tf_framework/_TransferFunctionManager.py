@@ -27,18 +27,39 @@ This module contains the implementation of a transfer functions manager
 
 __author__ = 'GeorgHinkel'
 
-from hbp_nrp_cle.robotsim.RobotInterface import IRobotCommunicationAdapter
+from hbp_nrp_cle.robotsim.RobotInterface import IRobotCommunicationAdapter, Topic
 from hbp_nrp_cle.brainsim.BrainInterface import IBrainCommunicationAdapter, IBrainDevice
 from hbp_nrp_cle.tf_framework import FlawedTransferFunction
+from hbp_nrp_cle.tf_framework._CleanableTransferFunctionParameter import \
+    ICleanableTransferFunctionParameter
+from hbp_nrp_cle.tf_framework._NeuronMonitor import NeuronMonitor
+from hbp_nrp_cle.tf_framework._Neuron2Robot import MapSpikeSink, MapSpikeSource
+from hbp_nrp_cle.tf_framework._Robot2Neuron import MapRobotPublisher, MapRobotSubscriber
+from hbp_nrp_cle.tf_framework._MappingSpecification import ParameterMappingSpecification
+from hbp_nrp_cle.tf_framework._TransferFunction import TransferFunction
 from ._TransferFunctionInterface import ITransferFunctionManager
+from ._TransferFunctionScheduler import TransferFunctionScheduler
+from ._TransferFunctionProcessExecutor import TransferFunctionProcessExecutor
+from ._TransferFunctionProfile import TransferFunctionProfile
+from .tf_lib import image_cache
 from . import BrainParameterException
 from . import TFRunningException
+import copy
+import functools
+import heapq
 import itertools
 import logging
 import time
+import types
 
 logger = logging.getLogger(__name__)
 
+# the kinds of connections an adapter can have to the brain or robot communication adapter
+_DETECTOR = 'detector'
+_GENERATOR = 'generator'
+_PUBLISHER = 'publisher'
+_SUBSCRIBER = 'subscriber'
+
 
 class TransferFunctionManager(ITransferFunctionManager):
     """
@@ -54,11 +75,24 @@ class TransferFunctionManager(ITransferFunctionManager):
         self.__r2n = []
         self.__silent = []
         self.__flawed = []
+        self.__tf_owners = {}
+        self.__tf_names = {}
+        self.__flawed_names = {}
+        self.__adapters = {}
         self.__robotAdapter = None
         self.__nestAdapter = None
         self.__initialized = False
         self.__global_data = {}
         self.__tf_priority = lambda tf: tf.priority if tf.priority else 0
+        self.__scheduler = None
+        self.__process_executor = None
+        self.__plan = ()
+        self.__plan_revision = None
+        self.__plan_order = {}
+        self.__unthrottled = ()
+        self.__triggered = frozenset()
+        self.__due_queue = []
+        self.__steps = 0
 
     @property
     def n2r(self):  # -> list:
@@ -97,18 +131,186 @@ class TransferFunctionManager(ITransferFunctionManager):
         """
         return self.__global_data
 
+    @property
+    def parallel_workers(self):
+        """
+        Gets the number of worker threads that run independent transfer functions concurrently,
+        0 if the transfer functions are run sequentially
+        """
+        return self.__scheduler.workers if self.__scheduler is not None else 0
+
+    @parallel_workers.setter
+    def parallel_workers(self, workers):
+        """
+        Sets the number of worker threads that run independent transfer functions concurrently.
+        Transfer functions are independent if they do not share robot topics or global variables
+        such that one of them writes. Since the neuronal simulator is not thread-safe, transfer
+        functions using spike generators are never run concurrently with other transfer
+        functions using brain devices.
+
+        :param workers: The number of worker threads, 0 or 1 to run the transfer functions
+         sequentially
+        """
+        if self.__scheduler is not None:
+            self.__scheduler.shutdown()
+            self.__scheduler = None
+        if workers > 1:
+            self.__scheduler = TransferFunctionScheduler(workers)
+
+    @property
+    def process_workers(self):
+        """
+        Gets the number of worker processes that run the bodies of transfer functions, 0 if the
+        bodies run in the CLE process
+        """
+        return self.__process_executor.processes if self.__process_executor is not None else 0
+
+    @process_workers.setter
+    def process_workers(self, processes):
+        """
+        Sets the number of worker processes that run the bodies of transfer functions. Devices,
+        topics and variables stay in the CLE process and are accessed through proxies. Since a
+        worker process serves one transfer function at a time, at least as many worker threads
+        are used to run independent transfer functions concurrently.
+
+        The worker processes are started immediately. Forking a process while the rospy and
+        NEST threads run may deadlock the workers, hence this must be set before the closed
+        loop engine is initialized.
+
+        :param processes: The number of worker processes, 0 to run transfer functions in the
+         CLE process
+        """
+        if self.__process_executor is not None:
+            self.__process_executor.shutdown()
+            self.__process_executor = None
+        if processes > 0:
+            self.__process_executor = TransferFunctionProcessExecutor(processes)
+            if processes > 1 and self.parallel_workers < processes:
+                self.parallel_workers = processes
+
     @staticmethod
-    def run_tf(tf, t):  # -> None:
+    def run_tf(tf, t, executor=None):  # -> None:
         """
         Runs the transfer functions for the given point in simulation time
 
         :param tf: the transfer function
         :param t: The simulation time
+        :param executor: The TransferFunctionProcessExecutor running the body of the transfer
+         function, None to run it in the CLE process
+        """
+        if tf.active:
+            if tf.should_run(t):
+                TransferFunctionManager._run_due_tf(tf, t, executor)
+            else:
+                tf.profile.skips += 1
+
+    @staticmethod
+    def run_triggered_tf(tf, t, executor=None):  # -> None:
+        """
+        Runs a transfer function for a queued trigger. Unlike run_tf, a transfer function
+        without throttling rate may run several times for the same point in simulation time.
+
+        :param tf: the transfer function
+        :param t: The simulation time
+        :param executor: The TransferFunctionProcessExecutor running the body of the transfer
+         function, None to run it in the CLE process
+        """
+        if tf.active:
+            if not tf.throttled or tf.should_run(t):
+                TransferFunctionManager._run_due_tf(tf, t, executor)
+            else:
+                tf.profile.skips += 1
+
+    @staticmethod
+    def _run_due_tf(tf, t, executor=None):  # -> None:
+        """
+        Runs a transfer function that is due, unless it skips calls while its inputs did not
+        change and none of them changed
+
+        :param tf: the transfer function
+        :param t: The simulation time
+        :param executor: The TransferFunctionProcessExecutor or None
+        """
+        if tf.skip_unchanged and not tf.inputs_changed():
+            tf.profile.unchanged_skips += 1
+            tf.skip(t)
+        else:
+            TransferFunctionManager._execute_tf(tf, t, executor)
+
+    @staticmethod
+    def _execute_tf(tf, t, executor=None):  # -> None:
+        """
+        Runs the given transfer function and records the call in its profile
+
+        :param tf: the transfer function
+        :param t: The simulation time
+        :param executor: The TransferFunctionProcessExecutor or None
         """
-        if tf.active and tf.should_run(t):
-            start = time.time()
-            tf.run(t)
-            tf.elapsed_time += time.time() - start
+        profile = tf.profile
+        sampled = TransferFunctionProfile.allocation_sampling() and profile.should_sample()
+        if sampled:
+            traced = TransferFunctionProfile.traced_memory()
+        start = time.time()
+        try:
+            if executor is None:
+                tf.run(t)
+            else:
+                tf.run(t, executor)
+        except TFRunningException:
+            profile.exceptions += 1
+            raise
+        finally:
+            duration = time.time() - start
+            tf.elapsed_time += duration
+            profile.record(duration)
+            if sampled:
+                profile.record_allocation(TransferFunctionProfile.traced_memory() - traced)
+
+    @property
+    def allocation_sampling(self):
+        """
+        Gets the interval in which calls of transfer functions are traced for allocations,
+        0 if allocations are not tracked
+        """
+        return TransferFunctionProfile.allocation_sampling()
+
+    @allocation_sampling.setter
+    def allocation_sampling(self, interval):
+        """
+        Sets the interval in which calls of transfer functions are traced for allocations.
+        Tracing allocations requires the tracemalloc module and slows down the traced calls.
+
+        :param interval: Every interval-th call of a transfer function is traced, 0 to disable
+        """
+        TransferFunctionProfile.set_allocation_sampling(interval)
+
+    def get_profiles(self):
+        """
+        Gets the profiles of the transfer functions
+
+        :return: A dictionary mapping the name of each transfer function to the summary of its
+         profile, see TransferFunctionProfile.summary. Transfer functions that failed at runtime
+         keep the profile collected until their failure.
+        """
+        profiles = dict((tf.name, tf.profile.summary()) for tf in self.__flawed
+                        if tf.profile is not None)
+        profiles.update((tf.name, tf.profile.summary()) for tf in self.transfer_functions())
+        # skips of queued transfer functions are only added to their profile once they are due
+        for _, _, tf, step in self.__due_queue:
+            if tf.name in profiles:
+                profiles[tf.name]['skips'] += self.__steps - step - 1
+        return profiles
+
+    def reset_profiles(self):
+        """
+        Resets the profiles of all transfer functions
+        """
+        for tf in self.transfer_functions(flawed=True):
+            if tf.profile is not None:
+                tf.profile.reset()
+        # keeps the heap order, since due times and plan orders remain
+        self.__due_queue = [(due, order, tf, self.__steps - 1)
+                            for due, order, tf, _ in self.__due_queue]
 
     def run_neuron_to_robot(self, t):  # -> None:
         """
@@ -118,10 +320,9 @@ class TransferFunctionManager(ITransferFunctionManager):
         """
         for _n2r in self.__n2r:
             try:
-                TransferFunctionManager.run_tf(_n2r, t)
+                TransferFunctionManager.run_tf(_n2r, t, self.__process_executor)
             except TFRunningException as tf_exception:
-                self.__flawed.append(FlawedTransferFunction(_n2r.name, _n2r.source, tf_exception))
-                self.__n2r.remove(_n2r)
+                self.__set_flawed(_n2r, tf_exception)
 
     def run_robot_to_neuron(self, t):  # -> None:
         """
@@ -131,10 +332,9 @@ class TransferFunctionManager(ITransferFunctionManager):
         """
         for _r2n in self.__r2n:
             try:
-                TransferFunctionManager.run_tf(_r2n, t)
+                TransferFunctionManager.run_tf(_r2n, t, self.__process_executor)
             except TFRunningException as tf_exception:
-                self.__flawed.append(FlawedTransferFunction(_r2n.name, _r2n.source, tf_exception))
-                self.__r2n.remove(_r2n)
+                self.__set_flawed(_r2n, tf_exception)
 
     def run_tfs(self, t):
         """
@@ -142,17 +342,117 @@ class TransferFunctionManager(ITransferFunctionManager):
 
         :param t:  The simulation time
         """
-        _tfs = self.transfer_functions(sorted_=True)
+        # images decoded in the previous step belong to outdated messages
+        image_cache.invalidate()
+        plan = self.__execution_plan()
+
+        step = self.__steps
+        executor = self.__process_executor
+        if self.__scheduler is not None:
+            run_tf = functools.partial(TransferFunctionManager.run_tf, executor=executor)
+            for tf, tf_exception in self.__scheduler.run(plan, t, run_tf):
+                self.__set_flawed(tf, tf_exception)
+            # the scheduler runs the whole plan, so run_tf already counted the skips of this step
+            # and the queued entries only catch up with the steps run without the scheduler
+            for entry in self.__due_queue:
+                entry[2].profile.skips += step - entry[3] - 1
+            self.__due_queue = [(due, order, tf, step) for due, order, tf, _ in self.__due_queue]
+            self.__steps = step + 1
+            return
 
-        for tf in _tfs:
+        due = self.__pop_due(t)
+        if due:
+            for entry in due:
+                # the steps since the entry was queued skipped the transfer function
+                entry[2].profile.skips += step - entry[3] - 1
+            tfs = sorted(self.__unthrottled + tuple(entry[2] for entry in due),
+                         key=self.__plan_order.get)
+        else:
+            tfs = self.__unthrottled
+
+        for tf in tfs:
             try:
-                TransferFunctionManager.run_tf(tf, t)
+                TransferFunctionManager.run_tf(tf, t, executor)
             except TFRunningException as tf_exception:
-                self.__flawed.append(FlawedTransferFunction(tf.name, tf.source, tf_exception))
-                if tf in self.__n2r:
-                    self.__n2r.remove(tf)
-                elif tf in self.__r2n:
-                    self.__r2n.remove(tf)
+                self.__set_flawed(tf, tf_exception)
+
+        for _, order, tf, _ in due:
+            heapq.heappush(self.__due_queue, (tf.next_run_time, order, tf, step))
+        self.__steps = step + 1
+
+    def __execution_plan(self):
+        """
+        Gets the active transfer functions in the order they are run. The plan is only rebuilt
+        when transfer functions are added, removed, (de-)activated or reprioritized.
+
+        :return: A tuple of transfer functions sorted by priority
+        """
+        if self.__plan_revision != TransferFunction.revision():
+            # read the revision first such that concurrent changes lead to another rebuild
+            self.__plan_revision = TransferFunction.revision()
+            plan = [tf for tf in self.transfer_functions(sorted_=True) if tf.active]
+            self.__plan = tuple(plan)
+            self.__plan_order = dict((tf, order) for order, tf in enumerate(plan))
+            self.__unthrottled = tuple(tf for tf in plan if not tf.throttled)
+            self.__triggered = frozenset(tf for tf in plan
+                                         if self.__tf_owners.get(tf) is self.__silent)
+            queued = dict((entry[2], entry[3]) for entry in self.__due_queue)
+            self.__due_queue = [(tf.next_run_time, order, tf, queued.get(tf, self.__steps - 1))
+                                for order, tf in enumerate(plan) if tf.throttled]
+            heapq.heapify(self.__due_queue)
+        return self.__plan
+
+    def __pop_due(self, t):
+        """
+        Pops the throttled transfer functions that are due at the given simulation time from the
+        due-time queue. Entries may be outdated if a transfer function was run by a trigger, but
+        never later than the actual due time, therefore run_tf decides whether to run them.
+
+        :param t: The simulation time
+        :return: A list of queue entries (due time, plan order, transfer function, step in which
+         the entry was queued)
+        """
+        queue = self.__due_queue
+        if not queue or queue[0][0] > t:
+            return ()
+        due = []
+        while queue and queue[0][0] <= t:
+            due.append(heapq.heappop(queue))
+        return due
+
+    def __set_flawed(self, tf, tf_exception):
+        """
+        Replaces the given transfer function by a flawed transfer function
+
+        :param tf: The transfer function that failed
+        :param tf_exception: The exception raised by the transfer function
+        """
+        self.add_flawed_tf(FlawedTransferFunction(tf.name, tf.source, tf_exception, tf.profile))
+        if self.__tf_owners.get(tf) is not self.__silent:
+            self.remove_tf(tf)
+
+    def next_run_time(self):
+        """
+        Gets the earliest simulation time at which any of the active transfer functions is run
+        again by run_tfs. Transfer functions without the trigger t are driven by their trigger
+        devices and topics, so they are not taken into account.
+
+        :return: The simulation time in seconds, infinity if no such transfer function exists
+        """
+        self.__execution_plan()
+        triggered = self.__triggered
+        queue = self.__due_queue
+        if not queue:
+            next_time = float('inf')
+        elif queue[0][2] not in triggered:
+            next_time = queue[0][0]
+        else:
+            next_time = min([entry[0] for entry in queue if entry[2] not in triggered] or
+                            [float('inf')])
+        for tf in self.__unthrottled:
+            if tf.next_run_time < next_time and tf not in triggered:
+                next_time = tf.next_run_time
+        return next_time
 
     @property
     def robot_adapter(self):  # -> IRobotCommunicationAdapter:
@@ -223,7 +523,173 @@ class TransferFunctionManager(ITransferFunctionManager):
 
         return proper_tfs if not flawed else proper_tfs + self.__flawed
 
-    def initialize_tf(self, tf, activation=True):
+    def add_tf(self, tf, tf_list):
+        """
+        Adds a transfer function to the given list of transfer functions of this manager and
+        indexes it by its name
+
+        :param tf: The transfer function
+        :param tf_list: The list the transfer function is added to, either n2r, r2n or silent
+        """
+        tf_list.append(tf)
+        self.__tf_owners[tf] = tf_list
+        self.__tf_names.setdefault(tf.name, []).append(tf)
+        TransferFunction.invalidate_execution_plans()
+
+    def remove_tf(self, tf):
+        """
+        Removes a transfer function from this manager. Its devices and topics are no longer
+        associated with it, but they are not released.
+
+        :param tf: The transfer function
+        :return: True, if the transfer function has been removed, False if it was not managed by
+          this instance
+        """
+        tf_list = self.__tf_owners.pop(tf, None)
+        if tf_list is None:
+            return False
+        tf_list.remove(tf)
+        same_name = self.__tf_names[tf.name]
+        same_name.remove(tf)
+        if not same_name:
+            del self.__tf_names[tf.name]
+        for adapter in itertools.chain(tf.params[1:], [getattr(tf, 'topic', None)]):
+            entry = self.__adapters.get(id(adapter))
+            if entry is not None and entry[2] is tf:
+                self.__adapters[id(adapter)] = (entry[0], entry[1], None)
+        TransferFunction.invalidate_execution_plans()
+        return True
+
+    def __move_tf(self, tf, tf_list):
+        """
+        Moves a managed transfer function to another list of transfer functions
+
+        :param tf: The transfer function
+        :param tf_list: The new list of the transfer function
+        """
+        old_list = self.__tf_owners.get(tf)
+        if old_list is not tf_list:
+            if old_list is not None:
+                old_list.remove(tf)
+            tf_list.append(tf)
+            self.__tf_owners[tf] = tf_list
+            TransferFunction.invalidate_execution_plans()
+
+    def get_tf(self, name, flawed=True):
+        """
+        Gets the transfer function with the given name
+
+        :param name: The name of the transfer function
+        :param flawed: If True, a flawed transfer function is returned if there is no proper
+          transfer function with the given name
+        :return: The earliest added transfer function with the given name or None
+        """
+        same_name = self.__tf_names.get(name)
+        if same_name:
+            return same_name[0]
+        return self.get_flawed_tf(name) if flawed else None
+
+    def find_latest_tf(self, name, ignore=None):
+        """
+        Gets the most recently added proper transfer function with the given name
+
+        :param name: The name of the transfer function
+        :param ignore: A transfer function that should not be returned
+        :return: The transfer function or None
+        """
+        return next((tf for tf in reversed(self.__tf_names.get(name, ()))
+                     if tf is not ignore), None)
+
+    def get_tf_by_adapter(self, adapter):
+        """
+        Gets the transfer function using the given device or topic
+
+        :param adapter: The brain device, robot topic or other parameter adapter
+        :return: The transfer function or None, if no managed transfer function uses the adapter
+        """
+        entry = self.__adapters.get(id(adapter))
+        return entry[2] if entry is not None else None
+
+    def add_flawed_tf(self, flawed_tf):
+        """
+        Adds a flawed transfer function
+
+        :param flawed_tf: The flawed transfer function
+        """
+        self.__flawed.append(flawed_tf)
+        self.__flawed_names.setdefault(flawed_tf.name, []).append(flawed_tf)
+
+    def get_flawed_tf(self, name):
+        """
+        Gets the flawed transfer function with the given name
+
+        :param name: The name of the flawed transfer function
+        :return: The earliest added flawed transfer function with this name or None
+        """
+        same_name = self.__flawed_names.get(name)
+        return same_name[0] if same_name else None
+
+    def remove_flawed_tf(self, flawed_tf):
+        """
+        Removes a flawed transfer function
+
+        :param flawed_tf: The flawed transfer function
+        :return: True, if the flawed transfer function has been removed, otherwise False
+        """
+        same_name = self.__flawed_names.get(flawed_tf.name)
+        if not same_name or flawed_tf not in same_name:
+            return False
+        same_name.remove(flawed_tf)
+        if not same_name:
+            del self.__flawed_names[flawed_tf.name]
+        self.__flawed.remove(flawed_tf)
+        return True
+
+    def __set_adapter(self, tf, index, adapter, spec):
+        """
+        Sets a parameter of the given transfer function to an adapter and indexes the adapter,
+        such that releasing it does not need to search the devices and topics of the brain and
+        robot communication adapters
+
+        :param tf: The transfer function
+        :param index: The parameter index or None for the main topic of the transfer function
+        :param adapter: The adapter
+        :param spec: The mapping specification the adapter was created for
+        """
+        adapter.spec = spec
+        if index is None:
+            tf.topic = adapter
+        else:
+            old = tf.params[index]
+            if old is not adapter and not isinstance(old, ParameterMappingSpecification):
+                self.__forget_adapter(old)
+            tf.params[index] = adapter
+            tf.__dict__[spec.name] = adapter
+        if isinstance(spec, MapSpikeSource):
+            kind = _GENERATOR
+        elif isinstance(spec, MapSpikeSink):
+            kind = _DETECTOR
+        elif isinstance(spec, MapRobotSubscriber):
+            kind = _SUBSCRIBER
+        elif isinstance(spec, (MapRobotPublisher, Topic, basestring)):
+            kind = _PUBLISHER
+        else:
+            kind = None
+        self.__adapters[id(adapter)] = (adapter, kind, tf)
+
+    def __forget_adapter(self, adapter):
+        """
+        Removes an adapter from the adapter index
+
+        :param adapter: The adapter
+        :return: The kind of connection of the adapter or None if it is unknown
+        """
+        entry = self.__adapters.pop(id(adapter), None)
+        if entry is None or entry[0] is not adapter:
+            return None
+        return entry[1]
+
+    def initialize_tf(self, tf, activation=True, previous=None):
         """
         Initializes the given transfer function
 
@@ -232,33 +698,118 @@ class TransferFunctionManager(ITransferFunctionManager):
 
         :param tf: The transfer function
         :param activation: desired activation state; True for activated, False otherwise
+        :param previous: Optional list of (adapter, is_trigger) pairs detached from an earlier
+          definition of this transfer function. Adapters whose mapping did not change are reused,
+          all others are released.
         """
         logger.info("Initialize transfer function " + repr(tf))
         tf.check_params()
         tf.elapsed_time = 0.0
+        tf.profile.reset()
+        tf.reset_inputs()
+        pool = list(previous) if previous is not None else []
+        trigger_names = [trigger for trigger in tf.triggers if isinstance(trigger, str)]
 
         if hasattr(tf, 'topic') and tf.topic is not None:
             saved = tf.topic
-            tf.topic = self.__robotAdapter.register_publish_topic(saved)
-            tf.topic.spec = saved
+            topic = TransferFunctionManager.__reuse_adapter(pool, saved, False)
+            if topic is None:
+                topic = self.__robotAdapter.register_publish_topic(saved)
+            self.__set_adapter(tf, None, topic, saved)
 
         for i in range(1, len(tf.params)):
             param = tf.params[i]
-            tf.params[i] = tf.params[i].create_adapter(self)
-            tf.params[i].spec = param
-            tf.__dict__[param.name] = tf.params[i]
+            adapter = TransferFunctionManager.__reuse_adapter(pool, param,
+                                                              param.name in trigger_names)
+            if adapter is None:
+                adapter = param.create_adapter(self)
+            self.__set_adapter(tf, i, adapter, param)
+
+        for adapter, _ in pool:
+            self.release_adapter(adapter)
 
         if "t" not in tf.triggers:
-            if tf in self.__n2r:
-                self.__n2r.remove(tf)
-            elif tf in self.__r2n:
-                self.__r2n.remove(tf)
-            self.__silent.append(tf)
+            self.__move_tf(tf, self.__silent)
 
         tf.initialize(self, True, True)
         self.activate_tf(tf, activation)
         self._update_trigger(tf)
 
+    @staticmethod
+    def __reuse_adapter(pool, spec, is_trigger):
+        """
+        Takes an adapter created for an equivalent mapping out of the given pool
+
+        :param pool: A list of (adapter, is_trigger) pairs
+        :param spec: The mapping specification that needs an adapter
+        :param is_trigger: True, if the adapter is going to trigger the transfer function
+        :return: The reused adapter or None, if no equivalent adapter is available
+        """
+        signature = _signature(spec)
+        for i, (adapter, was_trigger) in enumerate(pool):
+            old_spec = getattr(adapter, 'spec', None)
+            if was_trigger == is_trigger and old_spec is not None \
+                    and _signature(old_spec) == signature:
+                del pool[i]
+                return adapter
+        return None
+
+    def release_adapter(self, adapter):
+        """
+        Releases an adapter that is no longer used by any transfer function
+
+        :param adapter: The device, topic or other parameter adapter
+        """
+        kind = self.__forget_adapter(adapter)
+        if kind is None:
+            # adapters not created by this manager are looked up in the communication adapters
+            if adapter in self.__nestAdapter.detector_devices:
+                kind = _DETECTOR
+            elif adapter in self.__robotAdapter.published_topics:
+                kind = _PUBLISHER
+            elif adapter in self.__nestAdapter.generator_devices:
+                kind = _GENERATOR
+            elif adapter in self.__robotAdapter.subscribed_topics:
+                kind = _SUBSCRIBER
+        if kind == _DETECTOR:
+            self.__nestAdapter.unregister_spike_sink(adapter)
+        elif kind == _PUBLISHER:
+            self.__robotAdapter.unregister_publish_topic(adapter)
+        elif kind == _GENERATOR:
+            self.__nestAdapter.unregister_spike_source(adapter)
+        elif kind == _SUBSCRIBER:
+            self.__robotAdapter.unregister_subscribe_topic(adapter)
+        if isinstance(adapter, ICleanableTransferFunctionParameter):
+            adapter.cleanup()
+
+    def replace_tf(self, tf, new_tf, activation=True):
+        """
+        Replaces the definition of an initialized transfer function in place with the definition
+        of a freshly loaded transfer function of the same name. Devices and topics whose mapping
+        did not change are kept, so that neither the brain nor the robot connection is rebuilt.
+
+        :param tf: The initialized transfer function
+        :param new_tf: The freshly loaded, not yet initialized transfer function
+        :param activation: desired activation state; True for activated, False otherwise
+        :return: True, if the transfer function has been replaced in place, False if the
+          definitions are too different and the caller must replace the transfer function
+        """
+        if type(tf) is not type(new_tf) or isinstance(tf, NeuronMonitor):
+            return False
+        if (self.__tf_owners.get(tf) is self.__silent) != ("t" not in new_tf.triggers):
+            return False
+
+        pool = [(adapter, adapter in tf.triggers) for adapter in tf.params[1:]]
+        if getattr(tf, 'topic', None) is not None:
+            pool.append((tf.topic, False))
+
+        self.remove_tf(new_tf)
+
+        logger.info("Replace transfer function " + repr(tf) + " in place")
+        tf._replace_definition(new_tf)  # pylint: disable=protected-access
+        self.initialize_tf(tf, activation, pool)
+        return True
+
     @staticmethod
     def _update_trigger(tf):
         """
@@ -339,8 +890,8 @@ class TransferFunctionManager(ITransferFunctionManager):
         if not isinstance(self.__robotAdapter, IRobotCommunicationAdapter):
             raise Exception("The robot adapter is configured incorrectly")
 
-        # Wire transfer functions
-        for tf in itertools.chain(self.__r2n, self.__n2r):
+        # Wire transfer functions, triggered transfer functions move to the silent list meanwhile
+        for tf in list(itertools.chain(self.__r2n, self.__n2r)):
             self.initialize_tf(tf)
 
         # Initialize dependencies
@@ -353,18 +904,23 @@ class TransferFunctionManager(ITransferFunctionManager):
         Resets the given transfer function
         """
         tf.elapsed_time = 0.0
+        tf.profile.reset()
+        tf.reset_inputs()
         tf.check_params()
         if hasattr(tf, "topic") and tf.topic is not None:
-            tf.topic = tf.topic.reset(self)
+            topic = tf.topic
+            reset_topic = topic.reset(self)
+            if reset_topic is not topic:
+                self.__forget_adapter(topic)
+                self.__set_adapter(tf, None, reset_topic, getattr(topic, 'spec', None))
         for i in range(1, len(tf.params)):
             param = tf.params[i]
             reset_value = param.reset(self)
             if param is not reset_value:
-                tf.params[i] = reset_value
+                self.__set_adapter(tf, i, reset_value, param.spec)
                 for k in tf.__dict__:
                     if tf.__dict__[k] is param:
                         tf.__dict__[k] = reset_value
-                reset_value.spec = param.spec
         self._update_trigger(tf)
 
     def reset(self):  # -> None:
@@ -376,6 +932,49 @@ class TransferFunctionManager(ITransferFunctionManager):
         # Wire transfer functions from neuronal simulation to world simulation
         for tf in itertools.chain(self.__r2n, self.__n2r):
             self.__reset_tf(tf)
+        TransferFunction.invalidate_execution_plans()
+        if self.__scheduler is not None:
+            self.__scheduler.invalidate()
+
+    def get_state(self):
+        """
+        Gets a snapshot of the state of the transfer functions, i.e. the global data, the time
+        each transfer function has last run and the state of their local variables, CSV
+        recorders and brain devices
+
+        :return: The snapshot
+        """
+        tf_states = {}
+        for tf in itertools.chain(self.__r2n, self.__n2r, self.__silent):
+            param_states = [None] * len(tf.params)
+            for i in range(1, len(tf.params)):
+                if hasattr(type(tf.params[i]), 'get_state'):
+                    param_states[i] = tf.params[i].get_state()
+            param_states[0] = tf.params[0]
+            tf_states[tf.name] = param_states
+        return {'global_data': copy.deepcopy(self.__global_data),
+                'transfer_functions': tf_states}
+
+    def set_state(self, state):
+        """
+        Restores a snapshot taken with get_state. Transfer functions that have been added or
+        changed since are left untouched.
+
+        :param state: The snapshot
+        """
+        self.__global_data.clear()
+        self.__global_data.update(copy.deepcopy(state['global_data']))
+        tf_states = state['transfer_functions']
+        for tf in itertools.chain(self.__r2n, self.__n2r, self.__silent):
+            param_states = tf_states.get(tf.name)
+            if param_states is None or len(param_states) != len(tf.params):
+                continue
+            tf.params[0] = param_states[0]
+            for i in range(1, len(tf.params)):
+                if param_states[i] is not None and hasattr(type(tf.params[i]), 'set_state'):
+                    tf.params[i].set_state(param_states[i])
+        # the due-time queue must pick up the restored run times
+        TransferFunction.invalidate_execution_plans()
 
     def shutdown(self):
         """
@@ -385,8 +984,19 @@ class TransferFunctionManager(ITransferFunctionManager):
         del self.__r2n[:]
         del self.__flawed[:]
         del self.__silent[:]
+        self.__tf_owners.clear()
+        self.__tf_names.clear()
+        self.__flawed_names.clear()
+        self.__adapters.clear()
         self.__global_data.clear()
+        TransferFunction.invalidate_execution_plans()
         self.__initialized = False
+        if self.__scheduler is not None:
+            self.__scheduler.shutdown()
+            self.__scheduler.invalidate()
+        if self.__process_executor is not None:
+            self.__process_executor.shutdown()
+            self.__process_executor = None
 
     def hard_reset_brain_devices(self):
         """
@@ -407,9 +1017,7 @@ class TransferFunctionManager(ITransferFunctionManager):
                 try:
                     spec = tf.params[i].spec
                     if spec.is_brain_connection:
-                        tf.params[i] = spec.create_adapter(self)
-                        tf.params[i].spec = spec
-                        tf.__dict__[spec.name] = tf.params[i]
+                        self.__set_adapter(tf, i, spec.create_adapter(self), spec)
                 # pylint: disable=broad-except
                 except Exception as e:
                     logger.exception(e)
@@ -442,8 +1050,39 @@ class TransferFunctionManager(ITransferFunctionManager):
             for i in range(1, len(tf.params)):
                 spec = tf.params[i].spec
                 if spec.is_robot_connection:
-                    tf.params[i] = spec.create_adapter(self)
-                    tf.params[i].spec = spec
-                    tf.__dict__[spec.name] = tf.params[i]
+                    self.__set_adapter(tf, i, spec.create_adapter(self), spec)
             tf.initialize(self, False, True)
             self._update_trigger(tf)
+
+
+def _signature(spec):
+    """
+    Computes a comparable signature of a mapping specification that does not depend on the
+    parameter name. Two specifications with the same signature create equivalent adapters.
+
+    :param spec: The mapping specification or robot topic
+    """
+    if not isinstance(spec, ParameterMappingSpecification):
+        return _value_signature(spec)
+    fields = [(key, _value_signature(value)) for key, value in spec.__dict__.items()
+              if key != '_ParameterMappingSpecification__name']
+    return type(spec), tuple(sorted(fields))
+
+
+def _value_signature(value):
+    """
+    Computes a comparable signature of a single mapping argument
+
+    :param value: The argument value
+    """
+    if isinstance(value, Topic):
+        return type(value), value.name, value.topic_type, \
+            _value_signature(getattr(value, 'pre_processor', None))
+    if isinstance(value, types.FunctionType) and value.__closure__ is None:
+        # functions defined in reloaded code are new objects, but have an equal code object
+        return types.FunctionType, value.__code__
+    if isinstance(value, dict):
+        return dict, tuple(sorted((key, _value_signature(v)) for key, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_value_signature(v) for v in value)
+    return repr(value)
@@ -0,0 +1,630 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains an executor that runs transfer function bodies in worker processes.
+
+The body of a transfer function runs in a worker process, while its devices, topics and
+variables stay in the CLE process. The worker accesses them through proxies: attribute reads,
+attribute writes and method calls are forwarded to the CLE process and applied there. Numeric
+arrays such as voltages, spike times or images are passed through a shared memory buffer instead
+of being pickled. Attributes a transfer function read in its previous call are sent along with
+the next call, so that most transfer functions need a single round trip per call.
+"""
+
+__author__ = 'GeorgHinkel'
+
+import cPickle
+import itertools
+import logging
+import marshal
+import mmap
+import multiprocessing
+import os
+import Queue
+import sys
+import tempfile
+import threading
+import types
+import weakref
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# arrays smaller than this are pickled together with the message
+SHARED_ARRAY_THRESHOLD = 4096
+
+_INITIAL_BUFFER_SIZE = 1 << 20
+_PLAIN_TYPES = (type(None), bool, int, long, float, complex, str, unicode, np.generic)
+
+
+class _Ref(object):
+    """
+    A reference to an object that stays in the CLE process
+    """
+
+    def __init__(self, handle, prefetched=None, index=None):
+        """
+        Creates a new reference
+
+        :param handle: The handle of the object in the current call
+        :param prefetched: A dictionary of attribute values read in advance
+        :param index: The parameter position, if the object is a parameter of the transfer
+         function
+        """
+        self.handle = handle
+        self.prefetched = prefetched or {}
+        self.index = index
+
+
+class _SharedArray(object):
+    """
+    The location of an array in the shared memory buffer
+    """
+
+    def __init__(self, offset, dtype, shape):
+        """
+        Creates a new array location
+
+        :param offset: The offset in the shared memory buffer
+        :param dtype: The string representation of the array data type
+        :param shape: The shape of the array
+        """
+        self.offset = offset
+        self.dtype = dtype
+        self.shape = shape
+
+
+def _is_plain(value):
+    """
+    Determines whether the given value is copied to the worker rather than referenced
+
+    :param value: The value
+    """
+    if isinstance(value, _PLAIN_TYPES):
+        return True
+    if isinstance(value, np.ndarray):
+        return value.dtype != object
+    if isinstance(value, (list, tuple)):
+        return all(_is_plain(item) for item in value)
+    if isinstance(value, dict):
+        return all(_is_plain(k) and _is_plain(v) for k, v in value.iteritems())
+    # ROS messages are plain data
+    return isinstance(getattr(type(value), '_slot_types', None), list)
+
+
+def _remote_exception(exception):
+    """
+    Prepares an exception to be sent to the other process
+
+    :param exception: The exception
+    :return: A tuple of the pickled exception, if possible, and the message
+    """
+    try:
+        return cPickle.dumps(exception, cPickle.HIGHEST_PROTOCOL), str(exception)
+    # pylint: disable=broad-except
+    except Exception:
+        return None, "{0}: {1}".format(type(exception).__name__, exception)
+
+
+def _raise_remote_exception(pickled, message):
+    """
+    Raises an exception received from the other process
+
+    :param pickled: The pickled exception or None
+    :param message: The exception message
+    """
+    if pickled is not None:
+        try:
+            exception = cPickle.loads(pickled)
+        # pylint: disable=broad-except
+        except Exception:
+            exception = None
+        if isinstance(exception, BaseException):
+            raise exception
+    raise Exception(message)
+
+
+class _SharedBuffer(object):
+    """
+    A growable memory mapped file shared between the CLE process and a worker
+    """
+
+    def __init__(self, fd, size=0):
+        """
+        Maps the given file
+
+        :param fd: The file descriptor of the shared file
+        :param size: The current size of the file
+        """
+        self.__fd = fd
+        self.__size = 0
+        self.__map = None
+        self.remap(size)
+
+    @property
+    def size(self):
+        """
+        Gets the size of the mapped buffer
+        """
+        return self.__size
+
+    def remap(self, size):
+        """
+        Maps the file again if it has been resized
+
+        :param size: The size of the file
+        """
+        if size != self.__size:
+            if self.__map is not None:
+                self.__map.close()
+            self.__map = mmap.mmap(self.__fd, size) if size > 0 else None
+            self.__size = size
+
+    def grow(self, size):
+        """
+        Resizes the shared file such that it holds at least the given number of bytes
+
+        :param size: The required size
+        """
+        if size > self.__size:
+            new_size = max(_INITIAL_BUFFER_SIZE, self.__size)
+            while new_size < size:
+                new_size *= 2
+            os.ftruncate(self.__fd, new_size)
+            self.remap(new_size)
+
+    def write(self, offset, array):
+        """
+        Copies the given array into the buffer
+
+        :param offset: The offset in the buffer
+        :param array: The array
+        """
+        target = np.ndarray(array.shape, array.dtype, buffer=self.__map, offset=offset)
+        target[...] = array
+
+    def read(self, location):
+        """
+        Copies an array out of the buffer
+
+        :param location: The _SharedArray location of the array
+        """
+        dtype = np.dtype(location.dtype)
+        count = int(np.prod(location.shape)) if location.shape else 1
+        array = np.frombuffer(self.__map, dtype, count, location.offset).copy()
+        return array.reshape(location.shape)
+
+    def close(self):
+        """
+        Unmaps the buffer
+        """
+        self.remap(0)
+
+
+class _RemoteObject(object):
+    """
+    A proxy in the worker process for an object that stays in the CLE process
+    """
+
+    def __init__(self, channel, ref, prefetched):
+        """
+        Creates a new proxy
+
+        :param channel: The worker channel
+        :param ref: The _Ref of the object
+        :param prefetched: A dictionary of decoded attribute values read in advance
+        """
+        object.__setattr__(self, '_RemoteObject__channel', channel)
+        object.__setattr__(self, '_RemoteObject__ref', ref)
+        object.__setattr__(self, '_RemoteObject__cache', prefetched)
+
+    def __getattr__(self, name):
+        cache = self.__cache
+        if name in cache:
+            value = cache[name]
+        else:
+            value = self.__channel.request('get', self.__ref.handle, name)
+            if isinstance(value, _RemoteObject):
+                return value
+            cache[name] = value
+        if self.__ref.index is not None:
+            self.__channel.reads.add((self.__ref.index, name))
+        return value
+
+    def __setattr__(self, name, value):
+        self.__cache.pop(name, None)
+        self.__channel.request('set', self.__ref.handle, name, value)
+
+    def __call__(self, *args, **kwargs):
+        self.__cache.clear()
+        return self.__channel.request('call', self.__ref.handle, args, kwargs)
+
+    def __getitem__(self, key):
+        return self.__channel.request('getitem', self.__ref.handle, key)
+
+    def __setitem__(self, key, value):
+        self.__cache.clear()
+        self.__channel.request('setitem', self.__ref.handle, key, value)
+
+    def __len__(self):
+        return self.__channel.request('len', self.__ref.handle)
+
+    def __repr__(self):
+        return self.__channel.request('repr', self.__ref.handle)
+
+    def _invalidate(self):
+        """
+        Drops the cached attribute values, e.g. after a method of the object has been called
+        """
+        self.__cache.clear()
+
+
+class _WorkerChannel(object):
+    """
+    The connection of a worker process to the CLE process during the call of a transfer function
+    """
+
+    def __init__(self, conn, buffer_):
+        """
+        Creates a new channel
+
+        :param conn: The pipe connection to the CLE process
+        :param buffer_: The shared memory buffer
+        """
+        self.__conn = conn
+        self.__buffer = buffer_
+        self.__proxies = []
+        self.reads = set()
+
+    def request(self, *message):
+        """
+        Sends a request to the CLE process and waits for the result
+
+        :param message: The request
+        :return: The decoded result
+        """
+        self.__conn.send(self.encode(message))
+        reply = self.__conn.recv()
+        self.__buffer.remap(reply[1])
+        if reply[0] == 'error':
+            _raise_remote_exception(reply[2], reply[3])
+        if message[0] in ('call', 'set', 'setitem'):
+            # the call may have changed any of the referenced objects
+            for proxy in self.__proxies:
+                proxy._invalidate()  # pylint: disable=protected-access
+        return self.decode(reply[2])
+
+    def encode(self, value):
+        """
+        Replaces proxies in the given value by references
+
+        :param value: The value to send
+        """
+        if isinstance(value, _RemoteObject):
+            return _Ref(value._RemoteObject__ref.handle)  # pylint: disable=protected-access
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.encode(item) for item in value)
+        if isinstance(value, dict):
+            return dict((k, self.encode(v)) for k, v in value.iteritems())
+        return value
+
+    def decode(self, value):
+        """
+        Replaces references and shared arrays in the given value by proxies and arrays
+
+        :param value: The received value
+        """
+        if isinstance(value, _Ref):
+            prefetched = dict((k, self.decode(v)) for k, v in value.prefetched.iteritems())
+            proxy = _RemoteObject(self, value, prefetched)
+            self.__proxies.append(proxy)
+            return proxy
+        if isinstance(value, _SharedArray):
+            return self.__buffer.read(value)
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.decode(item) for item in value)
+        if isinstance(value, dict):
+            return dict((k, self.decode(v)) for k, v in value.iteritems())
+        return value
+
+
+def _worker_main(conn, fd):  # pragma: no cover
+    """
+    The main loop of a worker process
+
+    :param conn: The pipe connection to the CLE process
+    :param fd: The file descriptor of the shared memory file
+    """
+    functions = {}
+    buffer_ = _SharedBuffer(fd)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == 'stop':
+            break
+        elif message[0] == 'define':
+            _, token, code, module, name, defaults = message
+            if module not in sys.modules:
+                __import__(module)
+            functions[token] = types.FunctionType(marshal.loads(code), vars(sys.modules[module]),
+                                                  name, defaults)
+        elif message[0] == 'run':
+            _, token, size, args = message
+            buffer_.remap(size)
+            channel = _WorkerChannel(conn, buffer_)
+            try:
+                result = functions[token](*channel.decode(args))
+                conn.send(('done', channel.encode(result), channel.reads))
+            # pylint: disable=broad-except
+            except Exception, e:
+                pickled, text = _remote_exception(e)
+                conn.send(('raised', pickled, text))
+    buffer_.close()
+    conn.close()
+
+
+class _Worker(object):
+    """
+    A worker process together with its pipe and shared memory buffer
+    """
+
+    def __init__(self):
+        """
+        Starts a new worker process
+        """
+        self.__conn, child_conn = multiprocessing.Pipe()
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        fd, path = tempfile.mkstemp(prefix='nrp_tf_', dir=shm_dir)
+        # the file stays accessible through the descriptor the worker inherits
+        os.unlink(path)
+        self.__fd = fd
+        self.__buffer = _SharedBuffer(fd)
+        self.__defined = set()
+        self.__process = multiprocessing.Process(target=_worker_main, args=(child_conn, fd))
+        self.__process.daemon = True
+        self.__process.start()
+        child_conn.close()
+        self.__handles = None
+        self.__offset = 0
+
+    @property
+    def alive(self):
+        """
+        Gets whether the worker process is still running
+        """
+        return self.__process.is_alive()
+
+    def call(self, token, func, params, prefetch):
+        """
+        Runs the given function in the worker process
+
+        :param token: The unique token of the function
+        :param func: The function
+        :param params: The parameters of the transfer function
+        :param prefetch: A collection of (parameter index, attribute name) read in the previous
+         call
+        :return: A tuple of the return value and the attributes read during this call
+        """
+        if token not in self.__defined:
+            self.__conn.send(('define', token, marshal.dumps(func.__code__),
+                              func.__globals__['__name__'], func.__name__, func.__defaults__))
+            self.__defined.add(token)
+
+        self.__handles = []
+        self.__offset = 0
+        args = [self.__encode(param, index) for index, param in enumerate(params)]
+        for index, name in prefetch:
+            ref = args[index]
+            if isinstance(ref, _Ref):
+                try:
+                    value = getattr(params[index], name)
+                # pylint: disable=broad-except
+                except Exception:
+                    continue
+                if _is_plain(value):
+                    ref.prefetched[name] = self.__encode(value)
+        self.__conn.send(('run', token, self.__buffer.size, args))
+
+        while True:
+            message = self.__conn.recv()
+            if message[0] == 'done':
+                return self.__decode(message[1]), message[2]
+            elif message[0] == 'raised':
+                _raise_remote_exception(message[1], message[2])
+            self.__offset = 0
+            try:
+                value = self.__serve(message)
+                result = ('result', self.__buffer.size, value)
+            # pylint: disable=broad-except
+            except Exception, e:
+                pickled, text = _remote_exception(e)
+                result = ('error', self.__buffer.size, pickled, text)
+            self.__conn.send(result)
+
+    def __serve(self, message):
+        """
+        Applies a request of the worker process to the referenced object
+
+        :param message: The request
+        :return: The encoded result
+        """
+        kind = message[0]
+        target = self.__handles[message[1]]
+        args = self.__decode(message[2:])
+        if kind == 'get':
+            return self.__encode(getattr(target, args[0]))
+        elif kind == 'set':
+            setattr(target, args[0], args[1])
+            return None
+        elif kind == 'call':
+            return self.__encode(target(*args[0], **args[1]))
+        elif kind == 'getitem':
+            return self.__encode(target[args[0]])
+        elif kind == 'setitem':
+            target[args[0]] = args[1]
+            return None
+        elif kind == 'len':
+            return len(target)
+        elif kind == 'repr':
+            return repr(target)
+        raise ValueError("Unknown request " + str(kind))
+
+    def __encode(self, value, index=None):
+        """
+        Prepares a value of the CLE process to be sent to the worker
+
+        :param value: The value
+        :param index: The parameter position, if the value is a parameter of the transfer
+         function
+        """
+        if isinstance(value, np.ndarray) and value.dtype != object \
+                and value.nbytes >= SHARED_ARRAY_THRESHOLD:
+            offset = self.__offset
+            self.__offset += (value.nbytes + 63) & ~63
+            self.__buffer.grow(self.__offset)
+            self.__buffer.write(offset, value)
+            return _SharedArray(offset, value.dtype.str, value.shape)
+        if isinstance(value, (list, tuple)) and _is_plain(value):
+            return type(value)(self.__encode(item) for item in value)
+        if isinstance(value, dict) and _is_plain(value):
+            return dict((k, self.__encode(v)) for k, v in value.iteritems())
+        if _is_plain(value):
+            return value
+        self.__handles.append(value)
+        return _Ref(len(self.__handles) - 1, index=index)
+
+    def __decode(self, value):
+        """
+        Resolves the references in a value received from the worker
+
+        :param value: The value
+        """
+        if isinstance(value, _Ref):
+            return self.__handles[value.handle]
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.__decode(item) for item in value)
+        if isinstance(value, dict):
+            return dict((k, self.__decode(v)) for k, v in value.iteritems())
+        return value
+
+    def shutdown(self):
+        """
+        Stops the worker process and releases the shared memory
+        """
+        try:
+            self.__conn.send(('stop',))
+        except IOError:  # pragma: no cover
+            pass
+        self.__process.join(5)
+        if self.__process.is_alive():  # pragma: no cover
+            self.__process.terminate()
+        self.__conn.close()
+        self.__buffer.close()
+        os.close(self.__fd)
+
+
+class TransferFunctionProcessExecutor(object):
+    """
+    Runs the bodies of transfer functions in a pool of worker processes
+    """
+
+    def __init__(self, processes):
+        """
+        Creates a new executor and starts its worker processes. Forking a multithreaded process
+        may leave the child deadlocked on locks that other threads held, such as the logging lock,
+        so the executor must be created before the simulation threads run.
+
+        :param processes: The number of worker processes
+        """
+        self.__processes = processes
+        self.__idle = Queue.Queue()
+        for _ in range(processes):
+            self.__idle.put(_Worker())
+        self.__lock = threading.Lock()
+        self.__tokens = weakref.WeakKeyDictionary()
+        self.__token_counter = itertools.count()
+        self.__reads = {}
+
+    @property
+    def processes(self):
+        """
+        Gets the number of worker processes
+        """
+        return self.__processes
+
+    @staticmethod
+    def accepts(func):
+        """
+        Determines whether the given transfer function body can run in a worker process. This
+        requires a plain function without closure that is defined in an importable module.
+
+        :param func: The body of a transfer function
+        """
+        if not isinstance(func, types.FunctionType) or func.__closure__ is not None:
+            return False
+        module = sys.modules.get(func.__globals__.get('__name__'))
+        return module is not None and vars(module) is func.__globals__
+
+    def call(self, func, params):
+        """
+        Calls the given transfer function body in a worker process. Blocks until a worker is
+        available and the call completed.
+
+        :param func: The body of a transfer function
+        :param params: The parameters of the transfer function, including the time
+        :return: The return value of the function
+        """
+        with self.__lock:
+            idle = self.__idle
+            if idle is None:
+                raise Exception("The transfer function worker processes have been shut down")
+            token = self.__tokens.get(func)
+            if token is None:
+                token = next(self.__token_counter)
+                self.__tokens[func] = token
+        worker = idle.get()
+        try:
+            result, reads = worker.call(token, func, params, self.__reads.get(token, ()))
+            self.__reads[token] = reads
+            return result
+        except (EOFError, IOError):
+            logger.error("Transfer function worker process terminated, starting a new one")
+            worker.shutdown()
+            worker = _Worker()
+            raise Exception("The worker process running {0} terminated".format(func.__name__))
+        finally:
+            idle.put(worker)
+
+    def shutdown(self):
+        """
+        Stops all worker processes after their current calls completed. The executor cannot be
+        used afterwards.
+        """
+        with self.__lock:
+            idle, self.__idle = self.__idle, None
+        if idle is not None:
+            for _ in range(self.__processes):
+                idle.get().shutdown()
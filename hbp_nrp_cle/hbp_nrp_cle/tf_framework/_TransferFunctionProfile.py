@@ -0,0 +1,183 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains the profiling counters kept for every transfer function
+"""
+
+__author__ = 'GeorgHinkel'
+
+import logging
+import math
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    # tracemalloc is only built into Python 3, Python 2 requires the pytracemalloc backport
+    tracemalloc = None
+
+logger = logging.getLogger(__name__)
+
+
+class TransferFunctionProfile(object):
+    """
+    Counts the invocations, throttling skips, skips due to unchanged inputs and exceptions of a
+    transfer function and keeps a histogram of its latencies. The histogram uses power of two
+    buckets in microseconds, such that recording a call only takes a few integer operations and
+    the profile can be kept on all the time.
+    """
+
+    # bucket i holds the latencies in [2^(i-1), 2^i) microseconds, the last bucket all above
+    BUCKETS = 32
+
+    # every n-th call of a transfer function is traced for allocations, 0 disables the tracing
+    __allocation_sampling = 0
+
+    def __init__(self):
+        """
+        Creates a new, empty profile
+        """
+        self.calls = 0
+        self.skips = 0
+        self.unchanged_skips = 0
+        self.exceptions = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.sampled_calls = 0
+        self.allocated_bytes = 0
+        self.__histogram = [0] * TransferFunctionProfile.BUCKETS
+
+    @staticmethod
+    def allocation_sampling():
+        """
+        Gets the sampling interval of the allocation tracking, 0 if allocations are not tracked
+        """
+        return TransferFunctionProfile.__allocation_sampling
+
+    @staticmethod
+    def set_allocation_sampling(interval):
+        """
+        Sets the sampling interval of the allocation tracking. Tracking allocations requires the
+        tracemalloc module, which is started if necessary.
+
+        :param interval: Every interval-th call of a transfer function is traced, 0 to disable
+        """
+        if interval and tracemalloc is None:
+            logger.warning("Allocation tracking requires tracemalloc, which is not available")
+            interval = 0
+        if interval and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        TransferFunctionProfile.__allocation_sampling = interval
+
+    def record(self, duration):
+        """
+        Records a call of the transfer function
+
+        :param duration: The wall clock duration of the call in seconds
+        """
+        self.calls += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+        bucket = math.frexp(duration * 1e6)[1]
+        if bucket < 0:
+            bucket = 0
+        elif bucket >= TransferFunctionProfile.BUCKETS:
+            bucket = TransferFunctionProfile.BUCKETS - 1
+        self.__histogram[bucket] += 1
+
+    def should_sample(self):
+        """
+        Determines whether the next call should be traced for allocations
+        """
+        sampling = TransferFunctionProfile.__allocation_sampling
+        return sampling > 0 and self.calls % sampling == 0
+
+    @staticmethod
+    def traced_memory():
+        """
+        Gets the size of the memory currently traced by tracemalloc in bytes
+        """
+        return tracemalloc.get_traced_memory()[0]
+
+    def record_allocation(self, allocated_bytes):
+        """
+        Records the net number of bytes allocated by a traced call
+
+        :param allocated_bytes: The difference of the traced memory after and before the call
+        """
+        self.sampled_calls += 1
+        self.allocated_bytes += max(0, allocated_bytes)
+
+    def percentile(self, percent):
+        """
+        Estimates a latency percentile as the upper bound of the histogram bucket containing it
+
+        :param percent: The percentile between 0 and 100
+        :return: The latency in seconds, None if no call was recorded
+        """
+        if self.calls == 0:
+            return None
+        rank = self.calls * percent / 100.0
+        seen = 0
+        for bucket, count in enumerate(self.__histogram):
+            seen += count
+            if count and seen >= rank:
+                return min(2.0 ** bucket * 1e-6, self.max_time)
+        return self.max_time  # pragma: no cover
+
+    def summary(self):
+        """
+        Summarizes the profile
+
+        :return: A dictionary with the number of 'calls', throttling 'skips', 'unchanged_skips'
+         because the inputs did not change and 'exceptions', the
+         'total_time', the latency percentiles 'p50' and 'p99' and the 'max' latency in seconds
+         and the average 'allocated_bytes' per traced call, None if no call was traced
+        """
+        return {
+            'calls': self.calls,
+            'skips': self.skips,
+            'unchanged_skips': self.unchanged_skips,
+            'exceptions': self.exceptions,
+            'total_time': self.total_time,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max_time,
+            'allocated_bytes':
+                self.allocated_bytes / float(self.sampled_calls) if self.sampled_calls else None
+        }
+
+    def reset(self):
+        """
+        Resets all counters
+        """
+        self.calls = 0
+        self.skips = 0
+        self.unchanged_skips = 0
+        self.exceptions = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.sampled_calls = 0
+        self.allocated_bytes = 0
+        self.__histogram = [0] * TransferFunctionProfile.BUCKETS
@@ -0,0 +1,236 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains a scheduler that runs independent transfer functions concurrently
+"""
+
+__author__ = 'GeorgHinkel'
+
+from hbp_nrp_cle.tf_framework._Robot2Neuron import MapRobotPublisher, MapRobotSubscriber
+from hbp_nrp_cle.tf_framework._Neuron2Robot import MapSpikeSink, MapSpikeSource
+from hbp_nrp_cle.tf_framework._GlobalData import GlobalDataReference
+from hbp_nrp_cle.brainsim.BrainInterface import ICustomDevice
+from hbp_nrp_cle.tf_framework import TFRunningException
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import logging
+
+logger = logging.getLogger(__name__)
+
+READ = 'r'
+WRITE = 'w'
+
+# the neuronal simulator is not thread-safe, so all brain devices share a single resource
+BRAIN = ('brain',)
+
+
+def _topic_name(topic):
+    """
+    Gets the name of the given topic specification
+
+    :param topic: The topic, either a Topic instance or a string
+    """
+    return topic if isinstance(topic, str) else topic.name
+
+
+def get_resources(tf):
+    """
+    Gets the resources the given transfer function accesses through its mapped parameters.
+    Robot topics, the brain and global variables are resources, local variables and CSV recorders
+    are private to the transfer function and therefore not listed. Spike generators write to the
+    neuronal simulator, whereas detectors only read values buffered when the CLE refreshed them.
+    Custom devices may access the simulator in any way and therefore write.
+
+    :param tf: The initialized transfer function
+    :return: A list of tuples (resource key, access) where the access is READ or WRITE
+    """
+    resources = []
+    topic = getattr(tf, 'topic', None)
+    if topic is not None:
+        resources.append((('topic', _topic_name(getattr(topic, 'spec', topic))), WRITE))
+    for param in tf.params[1:]:
+        spec = getattr(param, 'spec', None)
+        if isinstance(spec, MapRobotSubscriber):
+            resources.append((('topic', _topic_name(spec.topic)), READ))
+        elif isinstance(spec, MapRobotPublisher):
+            resources.append((('topic', _topic_name(spec.topic)), WRITE))
+        elif isinstance(spec, MapSpikeSource):
+            resources.append((BRAIN, WRITE))
+        elif isinstance(spec, MapSpikeSink):
+            custom = isinstance(spec.device_type, ICustomDevice)
+            resources.append((BRAIN, WRITE if custom else READ))
+        elif isinstance(param, GlobalDataReference):
+            # reads and writes of a variable cannot be told apart
+            resources.append((('global', param.global_key), WRITE))
+    return resources
+
+
+def get_dependencies(tfs):
+    """
+    Derives the dependencies between the given transfer functions. A transfer function depends on
+    every transfer function earlier in the list that accesses a common resource where at least
+    one of both accesses writes.
+
+    :param tfs: The transfer functions in their sequential execution order
+    :return: A list containing for every transfer function the set of indices it depends on
+    """
+    readers = {}
+    writers = {}
+    dependencies = []
+    for index, tf in enumerate(tfs):
+        predecessors = set()
+        for key, access in get_resources(tf):
+            predecessors.update(writers.get(key, ()))
+            if access == WRITE:
+                predecessors.update(readers.get(key, ()))
+        for key, access in get_resources(tf):
+            (writers if access == WRITE else readers).setdefault(key, []).append(index)
+        predecessors.discard(index)
+        dependencies.append(predecessors)
+    return dependencies
+
+
+class TransferFunctionScheduler(object):
+    """
+    Runs transfer functions on a persistent pool of worker threads such that transfer functions
+    that do not share resources run concurrently while the priority order is kept between
+    transfer functions that depend on each other
+    """
+
+    def __init__(self, workers):
+        """
+        Creates a new scheduler
+
+        :param workers: The number of worker threads
+        """
+        self.__workers = workers
+        self.__executor = None
+        self.__graph_tfs = None
+        self.__successors = None
+        self.__predecessor_counts = None
+
+    @property
+    def workers(self):
+        """
+        Gets the number of worker threads
+        """
+        return self.__workers
+
+    def __update_graph(self, tfs):
+        """
+        Recomputes the dependency graph if the given transfer functions changed
+
+        :param tfs: The transfer functions in their sequential execution order. The graph is
+         cached for the given sequence object, so it must not be modified afterwards.
+        """
+        if tfs is self.__graph_tfs:
+            return
+        dependencies = get_dependencies(tfs)
+        self.__successors = [[] for _ in tfs]
+        for index, predecessors in enumerate(dependencies):
+            for predecessor in predecessors:
+                self.__successors[predecessor].append(index)
+        self.__predecessor_counts = [len(predecessors) for predecessors in dependencies]
+        self.__graph_tfs = tfs
+
+    def invalidate(self):
+        """
+        Discards the cached dependency graph
+        """
+        self.__graph_tfs = None
+
+    @staticmethod
+    def __run(run_tf, tf, t):
+        """
+        Runs a single transfer function on a worker thread
+
+        :return: The TFRunningException raised by the transfer function or None
+        """
+        try:
+            run_tf(tf, t)
+        except TFRunningException as tf_exception:
+            return tf_exception
+        return None
+
+    def run(self, tfs, t, run_tf):
+        """
+        Runs the given transfer functions
+
+        :param tfs: The transfer functions in their sequential execution order
+        :param t: The simulation time
+        :param run_tf: The function running a single transfer function at a given time
+        :return: A list of tuples (transfer function, TFRunningException) for the transfer
+         functions that failed, in the sequential execution order
+        """
+        self.__update_graph(tfs)
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(self.__workers)
+
+        remaining = list(self.__predecessor_counts)
+        ready = [index for index, count in enumerate(remaining) if count == 0]
+        running = {}
+        failures = {}
+        unexpected = None
+        while ready or running:
+            finished = []
+            for index in ready:
+                tf = tfs[index]
+                if tf.active and tf.should_run(t):
+                    running[self.__executor.submit(self.__run, run_tf, tf, t)] = index
+                else:
+                    if tf.active:
+                        tf.profile.skips += 1
+                    finished.append(index)
+            ready = []
+            if running and not finished:
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        tf_exception = future.result()
+                    # pylint: disable=broad-except
+                    except Exception as e:
+                        # let the running transfer functions finish before raising
+                        unexpected = unexpected or e
+                        continue
+                    if tf_exception is not None:
+                        failures[index] = tf_exception
+                    finished.append(index)
+            if unexpected is not None:
+                continue
+            for index in finished:
+                for successor in self.__successors[index]:
+                    remaining[successor] -= 1
+                    if remaining[successor] == 0:
+                        ready.append(successor)
+        if unexpected is not None:
+            raise unexpected
+        return [(tfs[index], failures[index]) for index in sorted(failures)]
+
+    def shutdown(self):
+        """
+        Shuts down the worker threads
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
@@ -124,7 +124,9 @@ from ._Neuron2Robot import Neuron2Robot, MapSpikeSink, MapSpikeSource
 from ._Robot2Neuron import Robot2Neuron, MapRobotPublisher, \
     MapRobotSubscriber
 from hbp_nrp_cle.tf_framework._TransferFunction import TransferFunction, FlawedTransferFunction
-from hbp_nrp_cle.tf_framework._CSVRecorder import MapCSVRecorder, CSVRecorder
+from hbp_nrp_cle.tf_framework._CSVRecorder import MapCSVRecorder, CSVRecorder, \
+    StreamingCSVRecorder, SpooledRows
+from hbp_nrp_cle.tf_framework._ColumnRecorder import MapColumnRecorder, ColumnRecorder
 from hbp_nrp_cle.tf_framework._NeuronMonitor import NeuronMonitor
 from hbp_nrp_cle.tf_framework._GlobalData import MapVariable, GLOBAL, TRANSFER_FUNCTION_LOCAL
 from hbp_nrp_cle.tf_framework._CleanableTransferFunctionParameter \
@@ -257,10 +259,40 @@ def set_robot_adapter(robot_adapter):  # -> None:
     config.active_node.robot_adapter = robot_adapter
 
 
+def set_parallel_workers(workers):  # -> None:
+    """
+    Sets the number of worker threads used to run independent transfer functions concurrently.
+    Transfer functions that share a robot topic, the neurons of a brain device or a global
+    variable keep their priority order.
+
+    :param workers: The number of worker threads, 0 or 1 to run transfer functions sequentially
+    """
+    config.active_node.parallel_workers = workers
+
+
+def set_process_workers(processes):  # -> None:
+    """
+    Sets the number of worker processes that run the bodies of transfer functions, such that
+    CPU-heavy transfer functions scale across cores. Devices, topics and variables stay in the
+    CLE process, the bodies access them through proxies and numeric arrays are passed through
+    shared memory. Bodies with closures run in the CLE process.
+
+    The worker processes are started immediately, so this must be called before the closed loop
+    engine is initialized and the simulation threads run.
+
+    :param processes: The number of worker processes, 0 to run transfer functions in the CLE
+     process
+    """
+    config.active_node.process_workers = processes
+
+
 def start_new_tf_manager():
     """
     Start a new transfer function manager
     """
+    if config.active_node is not None:
+        # the worker processes of the previous manager are not needed anymore
+        config.active_node.process_workers = 0
     config.active_node = _TransferFunctionManager.TransferFunctionManager()
     config.csv_recorders = []
 
@@ -285,7 +317,7 @@ def get_flawed_transfer_function(name):
     :param name: The name of the flawed transfer function
     :return: The flawed transfer function with the given name
     """
-    return next((f_tf for f_tf in config.active_node.flawed if f_tf.name == name), None)
+    return config.active_node.get_flawed_tf(name)
 
 
 def get_transfer_function(name):
@@ -296,7 +328,7 @@ def get_transfer_function(name):
     :return: The transfer function with the given name
     """
 
-    return next((tf for tf in get_transfer_functions() if tf.name == name), None)
+    return config.active_node.get_tf(name)
 
 
 def activate_transfer_function(tf, activate):
@@ -341,26 +373,43 @@ def dump_csv_recorder_to_files():
 
     :return: an array containing a string with the CSV filename,
     an array containing the CSV headers separated by a comma
-    and an array containing the CSV values
+    and an array containing the CSV values. The values of streaming recorders are SpooledRows
+    read from their temporary file.
     """
     result = []
     for tf in get_transfer_functions(flawed=False):
         for param in tf.params[1:]:
-            if isinstance(param, CSVRecorder):
+            if isinstance(param, (CSVRecorder, ColumnRecorder)):
                 name = param.get_csv_recorder_name()
                 headers = param.get_csv_headers()
-                values = param.cleanup()
+                if isinstance(param, StreamingCSVRecorder):
+                    values = SpooledRows(param.detach_file(), param.compress)
+                else:
+                    values = param.cleanup()
                 result.append([name, headers, values])
     return result
 
 
+def dump_column_recorders_to_files(directory):
+    """
+    Writes the values of all column recorders to .npz or HDF5 files in the given directory
+
+    :param directory: The directory the files are written to
+    :return: A list of the paths of the written files
+    """
+    return [param.save(directory) for tf in get_transfer_functions(flawed=False)
+            for param in tf.params[1:] if isinstance(param, ColumnRecorder)]
+
+
 def clean_csv_recorders_files():
     """
     Clean out all CSV recorders generated files.
     """
     for tf in get_transfer_functions(flawed=False):
         for param in tf.params[1:]:
-            if isinstance(param, CSVRecorder):
+            if isinstance(param, StreamingCSVRecorder):
+                SpooledRows(param.detach_file()).close()
+            elif isinstance(param, (CSVRecorder, ColumnRecorder)):
                 param.cleanup()
 
 
@@ -378,32 +427,23 @@ def delete_transfer_function(name):
     if delete_flawed_transfer_function(name):
         is_flawed_deleted = True
 
-    if tf in config.active_node.n2r:
-        config.active_node.n2r.remove(tf)
-    elif tf in config.active_node.r2n:
-        config.active_node.r2n.remove(tf)
-    elif tf in config.active_node.silent:
-        config.active_node.silent.remove(tf)
+    return _delete_transfer_function(tf) or is_flawed_deleted
 
-    else:
-        return is_flawed_deleted
 
-    tf.unregister()
+def _delete_transfer_function(tf):
+    """
+    Removes the given transfer function from the active node and releases its devices
 
-    brain_adapter = config.active_node.brain_adapter
-    robot_adapter = config.active_node.robot_adapter
+    :param tf: The transfer function
+    :return: True if the transfer function has been removed, otherwise False
+    """
+    if tf is None or not config.active_node.remove_tf(tf):
+        return False
+
+    tf.unregister()
 
     for i in range(1, len(tf.params)):
-        if tf.params[i] in brain_adapter.detector_devices:
-            brain_adapter.unregister_spike_sink(tf.params[i])
-        elif tf.params[i] in robot_adapter.published_topics:
-            robot_adapter.unregister_publish_topic(tf.params[i])
-        elif tf.params[i] in brain_adapter.generator_devices:
-            brain_adapter.unregister_spike_source(tf.params[i])
-        elif tf.params[i] in robot_adapter.subscribed_topics:
-            robot_adapter.unregister_subscribe_topic(tf.params[i])
-        if isinstance(tf.params[i], ICleanableTransferFunctionParameter):
-            tf.params[i].cleanup()
+        config.active_node.release_adapter(tf.params[i])
 
     return True
 
@@ -417,22 +457,29 @@ def delete_flawed_transfer_function(name):
     :return: True if the transfer function is correctly deleted. False if the transfer function
              does not exist.
     """
-    result = True
-
     tf = get_flawed_transfer_function(name)
 
-    if tf:
-        config.active_node.flawed.remove(tf)
-    else:
-        result = False
+    return tf is not None and config.active_node.remove_flawed_tf(tf)
 
-    return result
+
+def _find_loaded_transfer_function(name, ignore=None):
+    """
+    Gets the most recently loaded, not flawed transfer function with the given name
+
+    :param name: The name of the transfer function
+    :param ignore: A transfer function that should not be returned
+    :return: The transfer function or None, if no such transfer function exists
+    """
+    return config.active_node.find_latest_tf(name, ignore)
 
 
 def set_transfer_function(new_source, new_code, new_name, activation=True, priority=None):
     """
     Apply transfer function changes made by a client
 
+    If a transfer function with the given name is already loaded, its definition is replaced in
+    place: devices and topics whose mapping did not change are kept instead of being recreated.
+
     :param new_source: Transfer function's updated source
     :param new_code: Compiled code of the updated source
     :param new_name: Transfer function's updated name
@@ -441,19 +488,29 @@ def set_transfer_function(new_source, new_code, new_name, activation=True, prior
     priority are executed first.
     """
 
+    _previous_tf = _find_loaded_transfer_function(new_name)
     # pylint: disable=broad-except
     try:
         # pylint: disable=exec-used
         exec new_code
-        tf = get_transfer_function(new_name)
+        tf = _find_loaded_transfer_function(new_name, _previous_tf)
+        if tf is None:
+            tf = get_transfer_function(new_name)
         if not isinstance(tf, TransferFunction):
             raise Exception("Transfer function has no decorator specifying its type")
-        config.active_node.initialize_tf(tf, activation)
+        if _previous_tf is None or tf is _previous_tf:
+            config.active_node.initialize_tf(tf, activation)
+        elif config.active_node.replace_tf(_previous_tf, tf, activation):
+            tf = _previous_tf
+        else:
+            _delete_transfer_function(_previous_tf)
+            config.active_node.initialize_tf(tf, activation)
     except Exception as e:
         tb = sys.exc_info()[2]
         logger.error("Error while loading new transfer function")
         logger.exception(e)
-        delete_transfer_function(new_name)
+        while delete_transfer_function(new_name):
+            pass
         raise TFLoadingException(new_name, str(e)), None, tb
 
     # we set the new source in an attribute because inspect.getsource won't work after exec
@@ -474,8 +531,7 @@ def set_flawed_transfer_function(source, name="NO_NAME", error=None):
     :param name: The name of the transfer function
     :param error: the Exception raised during the compilation/loading of the code
     """
-    config.active_node.flawed.append(
-        FlawedTransferFunction(name, source, error))
+    config.active_node.add_flawed_tf(FlawedTransferFunction(name, source, error))
 
 
 start_new_tf_manager()
@@ -28,10 +28,12 @@ Contains a library of transfer functions
 # import sensor_msgs.msg
 from __future__ import division
 from cv_bridge import CvBridge
+from collections import OrderedDict
 import cv2
 import numpy as np
 import math
 import logging
+import threading
 
 
 __author__ = 'GeorgHinkel, AlessandroAmbrosano'
@@ -43,6 +45,9 @@ logger = logging.getLogger(__name__)
 class Camera(object):
     """
     Utility class for converting between measures in the Field of View
+
+    All conversions accept scalars as well as NumPy arrays (or anything NumPy can broadcast) and
+    return values of the same shape.
     """
 
     def __init__(self):
@@ -69,6 +74,9 @@ class Camera(object):
         self._curr_fx = self._curr_fy = None
         self._curr_sx = self._curr_sy = None
 
+        # full-frame (azimuth, elevation) lookup tables, keyed by resolution (w, h)
+        self._angle_maps = {}
+
         self.set_image_size(320, 240)
 
     def set_image_size(self, w, h):
@@ -99,7 +107,8 @@ class Camera(object):
         :return: a pair (xm, ym) denoting the metric distance from the center of the image
             (pure number)
         """
-        return float(u - self._curr_cx) / self._curr_fx, float(v - self._curr_cy) / self._curr_fy
+        return (np.true_divide(np.subtract(u, self._curr_cx), self._curr_fx),
+                np.true_divide(np.subtract(v, self._curr_cy), self._curr_fy))
 
     def metric2pixel(self, xm, ym):
         """
@@ -109,7 +118,8 @@ class Camera(object):
         :param ym: the y distance from the center (pure number)
         :return: a pair (u, v) denoting a pixel's coordinates (px)
         """
-        return xm * self._curr_fx + self._curr_cx, ym * self._curr_fy + self._curr_cy
+        return (np.multiply(xm, self._curr_fx) + self._curr_cx,
+                np.multiply(ym, self._curr_fy) + self._curr_cy)
 
     @staticmethod
     def metric2angle(xm, ym):
@@ -121,10 +131,11 @@ class Camera(object):
         :return: a pair (a, e) denoting the azimuth and the elevation, the center being (0, 0)
             (deg)
         """
-        _rho = math.sqrt(xm ** 2 + ym ** 2 + 1)
-        a = -math.atan(xm) * 180 / np.pi  # azimuth
-        e = -math.asin(ym / _rho) * 180 / np.pi  # elevation
-        return a, e
+        xm, ym = np.broadcast_arrays(np.asarray(xm, dtype=float), np.asarray(ym, dtype=float))
+        _rho = np.sqrt(xm ** 2 + ym ** 2 + 1)
+        a = -np.degrees(np.arctan(xm))  # azimuth
+        e = -np.degrees(np.arcsin(ym / _rho))  # elevation
+        return a[()], e[()]
 
     @staticmethod
     def angle2metric(a, e):
@@ -136,9 +147,10 @@ class Camera(object):
         :return: a pair (xm, ym) denoting the metric distance from the center of the image
             (pure number)
         """
-        xm = -math.tan(a * np.pi / 180)
-        ym = -math.tan(e * np.pi / 180) * math.sqrt(xm ** 2 + 1)
-        return xm, ym
+        a, e = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(e, dtype=float))
+        xm = -np.tan(np.radians(a))
+        ym = -np.tan(np.radians(e)) * np.sqrt(xm ** 2 + 1)
+        return xm[()], ym[()]
 
     def pixel2angle(self, u, v):
         """
@@ -174,8 +186,8 @@ class Camera(object):
         :return: a pair (x, y) denoting the distance from the center of the image
             (pure number in range [-1, 1] x [-1, 1])
         """
-        x = 2 * u / self._curr_sx - 1
-        y = 2 * v / self._curr_sy - 1
+        x = np.multiply(u, 2) / self._curr_sx - 1
+        y = np.multiply(v, 2) / self._curr_sy - 1
         return x, y
 
     def norm2pixel(self, x, y):
@@ -186,8 +198,8 @@ class Camera(object):
         :param y: the y coordinate of the distance from the center (pure number in range [-1, 1])
         :return: a pair (u, v) denoting a pixel's coordinates (px)
         """
-        u = self._curr_sx * (x + 1) / 2
-        v = self._curr_sy * (y + 1) / 2
+        u = self._curr_sx * np.add(x, 1) / 2
+        v = self._curr_sy * np.add(y, 1) / 2
         return u, v
 
     def norm2angle(self, x, y):
@@ -217,6 +229,37 @@ class Camera(object):
         xm, ym = self.pixel2metric(u, v)
         return xm, ym
 
+    def angle_map(self):
+        """
+        Gets the (azimuth, elevation) of every pixel of an image at the current resolution.
+        The maps are computed once per resolution and shared afterwards, hence they are read-only.
+
+        :return: a pair (a, e) of arrays of shape (height, width) holding the azimuth and the
+            elevation of each pixel (deg)
+        """
+        key = (self._curr_sx, self._curr_sy)
+        maps = self._angle_maps.get(key)
+        if maps is None:
+            v, u = np.indices((self._curr_sy, self._curr_sx), dtype=float)
+            maps = self.pixel2angle(u, v)
+            for m in maps:
+                m.setflags(write=False)
+            self._angle_maps[key] = maps
+        return maps
+
+    def lookup_angle(self, u, v):
+        """
+        Gets the (azimuth, elevation) pair of integer pixel coordinates from the cached angle map.
+        This is the cheap counterpart of pixel2angle for pixels that lie on the image.
+
+        :param u: the x coordinate (column) of the pixel (px)
+        :param v: the y coordinate (row) of the pixel (px)
+        :return: a pair (a, e) denoting the azimuth and the elevation, the center being (0, 0)
+            (deg)
+        """
+        a, e = self.angle_map()
+        return a[v, u], e[v, u]
+
     @property
     def height(self):
         """
@@ -305,6 +348,159 @@ class Camera(object):
 cam = Camera()
 
 
+class ImageCache(object):
+    """
+    Caches decoded camera images, such that several transfer functions processing the same image
+    message in the same simulation step decode and convert it only once. The cache is invalidated
+    by the transfer function manager at the beginning of every simulation step.
+
+    The cached arrays are shared and must not be modified in place.
+    """
+
+    def __init__(self, size=32):
+        """
+        Creates a new image cache
+
+        :param size: The maximum number of decoded images kept
+        """
+        self.__size = size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, image, encoding="rgb8", conversion=None):
+        """
+        Gets the decoded image message
+
+        :param image: A ROS image message (sensor_msgs.msg.Image)
+        :param encoding: The encoding the image is decoded to
+        :param conversion: An optional OpenCV color conversion code applied to the decoded image,
+            e.g. cv2.COLOR_RGB2HSV
+        :returns: The decoded image as a NumPy array
+        """
+        key = (id(image), encoding, conversion)
+        with self.__lock:
+            entry = self.__entries.get(key)
+        # the message is kept in the entry, so that its id cannot be reused by another message
+        if entry is not None and entry[0] is image:
+            return entry[1]
+        if conversion is None:
+            decoded = bridge.imgmsg_to_cv2(image, encoding)
+        else:
+            decoded = cv2.cvtColor(self.get(image, encoding), conversion)
+        with self.__lock:
+            self.__entries[key] = (image, decoded)
+            while len(self.__entries) > self.__size:
+                self.__entries.popitem(last=False)
+        return decoded
+
+    def invalidate(self):
+        """
+        Discards all cached images
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+
+image_cache = ImageCache()
+
+
+def decode_image(image, encoding="rgb8"):
+    """
+    Decodes a ROS image message, reusing the result for other calls in the same simulation step
+
+    :param image: A ROS image message (sensor_msgs.msg.Image)
+    :param encoding: The encoding the image is decoded to
+    :returns: The decoded image as a NumPy array that must not be modified in place
+    """
+    return image_cache.get(image, encoding)
+
+
+def decode_image_hsv(image):
+    """
+    Decodes a ROS image message and converts it to HSV, reusing the result for other calls in the
+    same simulation step
+
+    :param image: A ROS image message (sensor_msgs.msg.Image)
+    :returns: The HSV image as a NumPy array that must not be modified in place
+    """
+    return image_cache.get(image, "rgb8", cv2.COLOR_RGB2HSV)
+
+
+# 5000 ** (x / 256) as used by get_color_values, written as exp(x * ln(5000) / 256)
+_RATE_BASE = 5000.
+_RATE_EXPONENT = math.log(_RATE_BASE) / 256.
+
+
+def mask_centroid(mask):
+    """
+    Computes the centroid of the non-zero pixels of a mask from its first order image moments
+
+    :param mask: A two-dimensional array, e.g. the result of cv2.inRange
+    :returns: A pair (x, y) of floats, or None if the mask has no non-zero pixel
+    """
+    rows = np.count_nonzero(mask, axis=1)
+    area = rows.sum()
+    if area == 0:
+        return None
+    columns = np.count_nonzero(mask, axis=0)
+    return (float(np.dot(columns, np.arange(columns.size))) / area,
+            float(np.dot(rows, np.arange(rows.size))) / area)
+
+
+def region_counts(mask, regions=2):
+    """
+    Counts the non-zero pixels of a mask in vertical bands of equal width
+
+    :param mask: A two-dimensional array, e.g. the result of cv2.inRange
+    :param regions: The number of bands, counted from left to right
+    :returns: An integer array with the number of non-zero pixels per band
+    """
+    width = mask.shape[1]
+    bounds = (np.arange(regions + 1) * width) // regions
+    cumulative = np.zeros(width + 1, dtype=np.int64)
+    np.cumsum(np.count_nonzero(mask, axis=0), out=cumulative[1:])
+    return cumulative[bounds[1:]] - cumulative[bounds[:-1]]
+
+
+def region_ratios(mask, regions=2, out=None):
+    """
+    Computes the ratio of non-zero pixels of a mask in vertical bands of equal width
+
+    :param mask: A two-dimensional array, e.g. the result of cv2.inRange
+    :param regions: The number of bands, counted from left to right
+    :param out: An optional float array of length regions the ratios are written to
+    :returns: A float array with the ratio of non-zero pixels per band
+    """
+    height, width = mask.shape[:2]
+    bounds = (np.arange(regions + 1) * width) // regions
+    if out is None:
+        out = np.empty(regions)
+    areas = np.diff(bounds) * height
+    np.true_divide(region_counts(mask, regions), np.maximum(areas, 1), out=out)
+    return out
+
+
+def channel_rates(cv_image, width=40, height=30, out=None):
+    """
+    Resizes an 8 bit image and maps every channel value x to the rate 5000 ** (x / 256) / 5000,
+    which intensifies bright colors but keeps the rates in [0, 1]
+
+    :param cv_image: An 8 bit image with one or more channels, e.g. decoded with decode_image
+    :param width: The width of the rate map
+    :param height: The height of the rate map
+    :param out: An optional float array of shape (height, width, channels) the rates are
+        written to
+    :returns: The rate map
+    """
+    resized = cv2.resize(cv_image, (width, height))
+    if out is None:
+        out = np.empty(resized.shape)
+    np.multiply(resized, _RATE_EXPONENT, out=out)
+    np.exp(out, out=out)
+    np.true_divide(out, _RATE_BASE, out=out)
+    return out
+
+
 def find_centroid_hsv(image, lower, upper):
     """
     Finds the centroid of the pixels in an image lying in a given HSV slice.
@@ -322,22 +518,18 @@ def find_centroid_hsv(image, lower, upper):
         return None
 
     try:
-        img_in = bridge.imgmsg_to_cv2(image, "rgb8")
-        hsv_im = cv2.cvtColor(img_in, cv2.COLOR_RGB2HSV)
+        hsv_im = decode_image_hsv(image)
         lower_np = np.array(lower, dtype="uint8")
         upper_np = np.array(upper, dtype="uint8")
         mask = cv2.inRange(hsv_im, lower_np, upper_np)
-        img_out = cv2.bitwise_and(img_in, img_in, mask=mask)
-
-        a = cv2.findNonZero(cv2.cvtColor(img_out, cv2.COLOR_RGB2GRAY))
+        if lower_np[2] == 0:
+            # black pixels do not count, even if the HSV slice contains them
+            mask[hsv_im[:, :, 2] == 0] = 0
 
+        centroid = mask_centroid(mask)
         # At least one point in the HSV slice is detected in the image
-        if a is not None and a.size != 0:
-            b = np.array(
-                    [[float(x[0][0]) / (a.size / 2), float(x[0][1]) / (a.size / 2)] for x in a]
-                ).transpose()
-            y_c, x_c = int(cv2.sumElems(b[1])[0]), int(cv2.sumElems(b[0])[0])
-            return x_c, y_c
+        if centroid is not None:
+            return int(centroid[0]), int(centroid[1])
 
         return None
     # pylint: disable=broad-except
@@ -365,17 +557,15 @@ def detect_red(image):
     if not isinstance(image, type(None)):
         lower_red = np.array([0, 30, 30])
         upper_red = np.array([0, 255, 255])
-        cv_image = bridge.imgmsg_to_cv2(image, "rgb8")
+        cv_image = decode_image(image)
         # Transform image to HSV (easier to detect colors).
-        hsv_image = cv2.cvtColor(cv_image, cv2.COLOR_RGB2HSV)
+        hsv_image = decode_image_hsv(image)
         # Create a mask where every non red pixel will be a Zero.
         mask = cv2.inRange(hsv_image, lower_red, upper_red)
         image_size = (cv_image.shape[0] * cv_image.shape[1])
         if (image_size > 0):
-            half = cv_image.shape[1] // 2
-            # Get the number of red pixels in the image.
-            red_left = cv2.countNonZero(mask[:, :half])
-            red_right = cv2.countNonZero(mask[:, half:])
+            # Get the number of red pixels in the left and right half of the image.
+            red_left, red_right = region_counts(mask, 2).tolist()
             green_blue = (image_size - (red_left + red_right)) / image_size
             # We have to mutiply the rate by two since it is for an half image only.
             red_left = 2 * (red_left / image_size)
@@ -407,7 +597,7 @@ def get_color_values(image, width=40, height=30):
     """
     # assert isinstance(image, sensor_msgs.msg.Image)
     # pixel_values = np.zeros((30, 30, 3), np.float64)
-    half_width = width / 2
+    half_width = width // 2
     n = half_width * height
     red_left_rate = np.zeros(n)
     green_left_rate = np.zeros(n)
@@ -417,11 +607,8 @@ def get_color_values(image, width=40, height=30):
     blue_right_rate = np.zeros(n)
     if not isinstance(image, type(None)):  # Problem: starts as NoneType
         # print eye_sensor.changed
-        # load image in [0,1]
-        cv_image = bridge.imgmsg_to_cv2(image, "rgb8") / 256.
         # resize, then intensify values but keep in [0,1]
-        cv_image = cv2.resize(cv_image, (width, height))
-        cv_image = 5000 ** cv_image / 5000
+        cv_image = channel_rates(decode_image(image), width, height)
 
         red_left_rate = cv_image[:, 0:half_width, 0].flatten()
         green_left_rate = cv_image[:, 0:half_width, 1].flatten()
@@ -0,0 +1,318 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains a synthetic end-to-end benchmark of the closed loop engine. The engine is
+built from the mock adapters of the hbp_nrp_cle.mocks package and a real transfer function
+manager populated with generated transfer functions, so that the measured time is the overhead
+of the framework itself.
+
+Example:
+
+    python cle_benchmark.py --tfs 50 --devices 100 --device-groups 10 --subscribers 20 \\
+        --publishers 20 --recorders 5 --steps 2000 --output results.json
+"""
+
+__author__ = 'GeorgHinkel'
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import psutil
+from mock import patch
+
+import hbp_nrp_cle as cle
+import hbp_nrp_cle.tf_framework as nrp
+from hbp_nrp_cle.robotsim.RobotInterface import Topic
+from hbp_nrp_cle.cle.DeterministicClosedLoopEngine import DeterministicClosedLoopEngine
+from hbp_nrp_cle.cle.ClosedLoopEngine import ClosedLoopEngine
+from hbp_nrp_cle.mocks.robotsim import MockRobotControlAdapter, MockRobotCommunicationAdapter
+from hbp_nrp_cle.mocks.brainsim import MockBrainControlAdapter, MockBrainCommunicationAdapter
+
+ENGINES = {
+    'deterministic': DeterministicClosedLoopEngine,
+    'pipelined': ClosedLoopEngine
+}
+
+
+class BenchmarkBrain(object):
+    """
+    A brain root whose circuit consists of plain neuron indices
+    """
+
+    def __init__(self, neurons):
+        """
+        Creates a new benchmark brain
+
+        :param neurons: The number of neurons in the circuit
+        """
+        self.circuit = range(neurons)
+
+
+class NoExternalModules(object):
+    """
+    An external module array without any external module
+    """
+
+    module_names = []
+
+    def initialize(self):
+        """
+        Initializes the external modules
+        """
+        pass
+
+    def run_step(self):
+        """
+        Runs a step of the external modules
+        """
+        pass
+
+    def shutdown(self):
+        """
+        Shuts down the external modules
+        """
+        pass
+
+
+def _distribute(count, bins):
+    """
+    Distributes count items round-robin over the given number of bins
+
+    :param count: The number of items
+    :param bins: The number of bins
+    :return: A list with the indices of the items for every bin
+    """
+    result = [[] for _ in range(bins)]
+    for i in range(count):
+        result[i % bins].append(i)
+    return result
+
+
+def _create_tf(tf_type, name, mappings):
+    """
+    Creates a transfer function that touches each of its parameters once per run
+
+    :param tf_type: The transfer function decorator, Robot2Neuron or Neuron2Robot
+    :param name: The name of the transfer function
+    :param mappings: A list of tuples (parameter mapping, statement using the parameter)
+    """
+    params = ''.join(', ' + mapping.name for mapping, _ in mappings)
+    body = ''.join('    ' + statement + '\n' for _, statement in mappings)
+    source = 'def {0}(t{1}):\n{2}    return None\n'.format(name, params, body or '')
+    namespace = {}
+    exec source in namespace  # pylint: disable=exec-used
+    tf = tf_type()(namespace[name])
+    tf.source = source
+    for mapping, _ in mappings:
+        tf = mapping(tf)
+    return tf
+
+
+def build_transfer_functions(args):
+    """
+    Builds the transfer functions of the benchmark. Subscribers, spike sources and device groups
+    are mapped to Robot2Neuron transfer functions, publishers, spike sinks and CSV recorders to
+    Neuron2Robot transfer functions.
+
+    :param args: The benchmark configuration
+    """
+    r2n_count = max(1, args.tfs // 2)
+    n2r_count = max(1, args.tfs - r2n_count)
+    r2n = [[] for _ in range(r2n_count)]
+    n2r = [[] for _ in range(n2r_count)]
+
+    for tf_index, subscribers in enumerate(_distribute(args.subscribers, r2n_count)):
+        for i in subscribers:
+            r2n[tf_index].append((nrp.MapRobotSubscriber('sub%d' % i, Topic('/sub%d' % i, float)),
+                                  'sub%d.value' % i))
+    sources = _distribute((args.devices + 1) // 2, r2n_count)
+    for tf_index, devices in enumerate(sources):
+        for i in devices:
+            r2n[tf_index].append((nrp.MapSpikeSource('source%d' % i, nrp.brain.circuit[i],
+                                                     nrp.poisson),
+                                  'source%d.rate = t' % i))
+    for tf_index, groups in enumerate(_distribute(args.device_groups, r2n_count)):
+        for i in groups:
+            neurons = nrp.map_neurons(range(args.group_size),
+                                      lambda j, i=i: nrp.brain.circuit[i * args.group_size + j])
+            r2n[tf_index].append((nrp.MapSpikeSource('group%d' % i, neurons, nrp.poisson),
+                                  'group%d.rate = t' % i))
+    sinks = _distribute(args.devices // 2, n2r_count)
+    for tf_index, devices in enumerate(sinks):
+        for i in devices:
+            n2r[tf_index].append((nrp.MapSpikeSink('sink%d' % i, nrp.brain.circuit[i],
+                                                   nrp.leaky_integrator_alpha),
+                                  'sink%d.voltage' % i))
+    for tf_index, publishers in enumerate(_distribute(args.publishers, n2r_count)):
+        for i in publishers:
+            n2r[tf_index].append((nrp.MapRobotPublisher('pub%d' % i, Topic('/pub%d' % i, float)),
+                                  'pub%d.send_message(t)' % i))
+    for tf_index, recorders in enumerate(_distribute(args.recorders, n2r_count)):
+        for i in recorders:
+            n2r[tf_index].append((nrp.MapCSVRecorder('rec%d' % i, 'rec%d.csv' % i, ['t']),
+                                  'rec%d.record_entry(t)' % i))
+
+    for i, mappings in enumerate(r2n):
+        _create_tf(nrp.Robot2Neuron, 'robot_to_neuron_%d' % i, mappings)
+    for i, mappings in enumerate(n2r):
+        _create_tf(nrp.Neuron2Robot, 'neuron_to_robot_%d' % i, mappings)
+
+
+def build_cle(args):
+    """
+    Builds a closed loop engine from the mock adapters
+
+    :param args: The benchmark configuration
+    :return: The initialized closed loop engine
+    """
+    nrp.start_new_tf_manager()
+    nrp.config.brain_root = BenchmarkBrain(max(args.devices,
+                                               args.device_groups * args.group_size, 1))
+    rca = MockRobotControlAdapter()
+    rca.set_time_step(args.timestep)
+    rcm = MockRobotCommunicationAdapter()
+    bca = MockBrainControlAdapter()
+    bcm = MockBrainCommunicationAdapter()
+    nrp.set_nest_adapter(bcm)
+    nrp.set_robot_adapter(rcm)
+    build_transfer_functions(args)
+
+    # the engine embeds a GazeboHelper that waits for the Gazebo services
+    with patch('hbp_nrp_cle.cle.DeterministicClosedLoopEngine.GazeboHelper'):
+        engine = ENGINES[args.engine](rca, rcm, bca, bcm, nrp.config.active_node,
+                                      NoExternalModules(), args.timestep)
+    engine.initialize()
+    return engine
+
+
+def _memory():
+    """
+    Gets the resident memory of the benchmark process in bytes
+    """
+    process = psutil.Process(os.getpid())
+    if hasattr(process, 'memory_info'):
+        return process.memory_info().rss
+    return process.get_memory_info().rss  # pragma: no cover
+
+
+def run_benchmark(args):
+    """
+    Runs the benchmark
+
+    :param args: The benchmark configuration
+    :return: A dictionary with the configuration and the results
+    """
+    memory_start = _memory()
+    start = time.time()
+    engine = build_cle(args)
+    build_time = time.time() - start
+    memory_built = _memory()
+
+    engine.run_steps(args.warmup)
+    engine.step_timings.reset()
+    gc.collect()
+    memory_warm = _memory()
+    objects_warm = len(gc.get_objects())
+
+    summary = engine.run_steps(args.steps)
+    gc.collect()
+    memory_end = _memory()
+    objects_end = len(gc.get_objects())
+
+    tf_times = engine.tf_elapsed_time()
+    engine.shutdown()
+
+    steps = summary['steps']
+    real_time = summary['real_time']
+    return {
+        'configuration': vars(args),
+        'build_time': build_time,
+        'steps': steps,
+        'simulation_time': summary['simulation_time'],
+        'real_time': real_time,
+        'steps_per_second': steps / real_time if real_time > 0 else float('inf'),
+        'real_time_factor': summary['simulation_time'] / real_time if real_time > 0 else None,
+        'phases': summary['phases'],
+        'transfer_function_time': sum(tf_times.values()) if tf_times else 0.0,
+        'flawed_transfer_functions': summary['flawed_transfer_functions'],
+        'memory': {
+            'start': memory_start,
+            'built': memory_built,
+            'warm': memory_warm,
+            'end': memory_end,
+            'growth_per_1000_steps': (memory_end - memory_warm) * 1000.0 / steps if steps else 0,
+            'object_growth_per_1000_steps':
+                (objects_end - objects_warm) * 1000.0 / steps if steps else 0
+        }
+    }
+
+
+def parse_args(argv):
+    """
+    Parses the command line arguments of the benchmark
+
+    :param argv: The command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Synthetic benchmark of the closed loop engine")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='deterministic')
+    parser.add_argument('--tfs', type=int, default=10, help="number of transfer functions")
+    parser.add_argument('--devices', type=int, default=20,
+                        help="number of brain devices, half spike sources and half spike sinks")
+    parser.add_argument('--device-groups', type=int, default=2,
+                        help="number of spike source device groups")
+    parser.add_argument('--group-size', type=int, default=10,
+                        help="number of devices in every device group")
+    parser.add_argument('--subscribers', type=int, default=5, help="number of robot subscribers")
+    parser.add_argument('--publishers', type=int, default=5, help="number of robot publishers")
+    parser.add_argument('--recorders', type=int, default=1, help="number of CSV recorders")
+    parser.add_argument('--timestep', type=float, default=0.02, help="CLE time step in seconds")
+    parser.add_argument('--warmup', type=int, default=50, help="number of steps not measured")
+    parser.add_argument('--steps', type=int, default=1000, help="number of measured steps")
+    parser.add_argument('--output', help="file to write the JSON results to, default stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Runs the benchmark from the command line
+
+    :param argv: The command line arguments, sys.argv if None
+    """
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    return results
+
+
+if __name__ == '__main__':
+    main()
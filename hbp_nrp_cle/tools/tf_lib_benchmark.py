@@ -0,0 +1,227 @@
+# ---LICENSE-BEGIN - DO NOT CHANGE OR MOVE THIS HEADER
+# This file is part of the Neurorobotics Platform software
+# Copyright (C) 2014,2015,2016,2017 Human Brain Project
+# https://www.humanbrainproject.eu
+#
+# The Human Brain Project is a European Commission funded project
+# in the frame of the Horizon2020 FET Flagship plan.
+# http://ec.europa.eu/programmes/horizon2020/en/h2020-section/fet-flagships
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+# ---LICENSE-END
+"""
+This module contains a micro-benchmark of the vectorised vision primitives of tf_lib. Every
+primitive is compared against the implementation tf_lib used before, on random camera frames of
+typical sizes. Decoding the ROS image message is the same for both and not measured.
+
+Example:
+
+    python tf_lib_benchmark.py --sizes 320x240 640x480 --repetitions 200 --output results.json
+"""
+
+from __future__ import division
+
+import argparse
+import json
+import sys
+import timeit
+
+import cv2
+import numpy as np
+
+from hbp_nrp_cle.tf_framework import tf_lib
+
+__author__ = 'GeorgHinkel'
+
+LOWER_GREEN = np.array([50, 100, 100], dtype="uint8")
+UPPER_GREEN = np.array([70, 255, 255], dtype="uint8")
+LOWER_RED = np.array([0, 30, 30])
+UPPER_RED = np.array([0, 255, 255])
+
+
+def legacy_centroid(rgb, hsv):
+    """
+    Finds the centroid of the green pixels as find_centroid_hsv did before, from the list of
+    non-zero pixel coordinates
+
+    :param rgb: The RGB frame
+    :param hsv: The HSV frame
+    """
+    mask = cv2.inRange(hsv, LOWER_GREEN, UPPER_GREEN)
+    img_out = cv2.bitwise_and(rgb, rgb, mask=mask)
+    a = cv2.findNonZero(cv2.cvtColor(img_out, cv2.COLOR_RGB2GRAY))
+    if a is not None and a.size != 0:
+        b = np.array(
+            [[float(x[0][0]) / (a.size / 2), float(x[0][1]) / (a.size / 2)] for x in a]
+        ).transpose()
+        return int(cv2.sumElems(b[0])[0]), int(cv2.sumElems(b[1])[0])
+    return None
+
+
+def vectorised_centroid(rgb, hsv):  # pylint: disable=unused-argument
+    """
+    Finds the centroid of the green pixels from the image moments of the mask
+
+    :param rgb: The RGB frame
+    :param hsv: The HSV frame
+    """
+    return tf_lib.mask_centroid(cv2.inRange(hsv, LOWER_GREEN, UPPER_GREEN))
+
+
+def legacy_red_halves(rgb, hsv):
+    """
+    Counts the red pixels per image half as detect_red did before
+
+    :param rgb: The RGB frame
+    :param hsv: The HSV frame
+    """
+    mask = cv2.inRange(hsv, LOWER_RED, UPPER_RED)
+    half = rgb.shape[1] // 2
+    return cv2.countNonZero(mask[:, :half]), cv2.countNonZero(mask[:, half:])
+
+
+def vectorised_red_halves(rgb, hsv):  # pylint: disable=unused-argument
+    """
+    Computes the ratio of red pixels per image half
+
+    :param rgb: The RGB frame
+    :param hsv: The HSV frame
+    """
+    return tf_lib.region_ratios(cv2.inRange(hsv, LOWER_RED, UPPER_RED), 2)
+
+
+def legacy_color_rates(rgb, hsv):  # pylint: disable=unused-argument
+    """
+    Computes the channel rate map as get_color_values did before
+
+    :param rgb: The RGB frame
+    :param hsv: The HSV frame
+    """
+    cv_image = rgb / 256.
+    cv_image = cv2.resize(cv_image, (40, 30))
+    return 5000 ** cv_image / 5000
+
+
+def _preallocated_color_rates():
+    """
+    Creates a function computing the channel rate map into a preallocated array
+    """
+    out = np.empty((30, 40, 3))
+
+    def vectorised_color_rates(rgb, hsv):  # pylint: disable=unused-argument
+        """
+        Computes the channel rate map into a preallocated array
+
+        :param rgb: The RGB frame
+        :param hsv: The HSV frame
+        """
+        return tf_lib.channel_rates(rgb, 40, 30, out=out)
+    return vectorised_color_rates
+
+
+def create_frame(width, height, seed=42):
+    """
+    Creates a random camera frame with a few colored discs on a noisy background
+
+    :param width: The width of the frame
+    :param height: The height of the frame
+    :param seed: The seed of the random generator
+    :return: The RGB and the HSV frame
+    """
+    random = np.random.RandomState(seed)
+    rgb = random.randint(0, 80, (height, width, 3)).astype(np.uint8)
+    for color in [(230, 23, 23), (23, 230, 23), (23, 23, 230)]:
+        radius = random.randint(height // 16, height // 4)
+        center = (random.randint(radius, width - radius), random.randint(radius, height - radius))
+        cv2.circle(rgb, center, radius, color, -1)
+    return rgb, cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+
+
+def _measure(function, rgb, hsv, repetitions):
+    """
+    Measures the mean time of a primitive in microseconds, taking the best of three runs
+
+    :param function: The primitive
+    :param rgb: The RGB frame
+    :param hsv: The HSV frame
+    :param repetitions: The number of calls per run
+    """
+    timer = timeit.Timer(lambda: function(rgb, hsv))
+    return min(timer.repeat(3, repetitions)) / repetitions * 1e6
+
+
+def run_benchmark(args):
+    """
+    Runs the benchmark
+
+    :param args: The benchmark configuration
+    :return: A dictionary with the configuration and the results
+    """
+    primitives = {
+        'centroid': (legacy_centroid, vectorised_centroid),
+        'red_halves': (legacy_red_halves, vectorised_red_halves),
+        'color_rates': (legacy_color_rates, _preallocated_color_rates())
+    }
+    results = {}
+    for size in args.sizes:
+        width, height = [int(value) for value in size.split('x')]
+        rgb, hsv = create_frame(width, height)
+        size_results = {}
+        for name, (legacy, vectorised) in sorted(primitives.items()):
+            legacy_time = _measure(legacy, rgb, hsv, args.repetitions)
+            vectorised_time = _measure(vectorised, rgb, hsv, args.repetitions)
+            size_results[name] = {
+                'legacy_us': legacy_time,
+                'vectorised_us': vectorised_time,
+                'speedup': legacy_time / vectorised_time if vectorised_time > 0 else None
+            }
+        results[size] = size_results
+    return {'configuration': vars(args), 'results': results}
+
+
+def parse_args(argv):
+    """
+    Parses the command line arguments of the benchmark
+
+    :param argv: The command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the tf_lib vision primitives")
+    parser.add_argument('--sizes', nargs='+', default=['320x240', '640x480'],
+                        help="frame sizes as WIDTHxHEIGHT")
+    parser.add_argument('--repetitions', type=int, default=200,
+                        help="number of calls per measurement")
+    parser.add_argument('--output', help="file to write the JSON results to, default stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Runs the benchmark from the command line
+
+    :param argv: The command line arguments, sys.argv if None
+    """
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    return results
+
+
+if __name__ == '__main__':
+    main()